@@ -0,0 +1,254 @@
+"""
+Two-tier cache plus versioned keys.
+
+`TieredCache` puts a small per-process LocMemCache (L1) in front of the
+shared cache alias named in OPTIONS['L2'] (file, database or Redis, see
+settings.CACHES). L1 entries live at most L1_TIMEOUT seconds, so it is
+meant for data that is immutable under its key, which is exactly what
+versioned keys give us: bump a namespace version and every worker starts
+using new keys immediately.
+
+Mutable shared state (mentor messages) should talk to caches['shared']
+directly.
+
+Version bumps and the stampede lock need an atomic add/incr. Redis and the
+database cache give us that; FileBasedCache implements both as a read
+followed by a write, so on it the locks below are lock files created with
+O_EXCL instead.
+"""
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+from config import metrics
+
+# Version namespaces
+SCOREBOARD = 'scoreboard'
+CATALOG = 'catalog'
+
+_MISSING = object()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options.get('L2', 'shared')
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.l1 = LocMemCache(f'tiered-l1-{self._l2_alias}', {
+            'TIMEOUT': self.l1_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000)},
+        })
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _l1_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    def get(self, key, default=None, version=None):
+        value = self.l1.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            metrics.inc('hacklabs_cache_requests_total', cache='default', result='l1_hit')
+            return value
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            metrics.inc('hacklabs_cache_requests_total', cache='default', result='miss')
+            return default
+        metrics.inc('hacklabs_cache_requests_total', cache='default', result='l2_hit')
+        self.l1.set(key, value, self.l1_timeout, version=version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        self.l1.set(key, value, self._l1_timeout(timeout), version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self.l1.set(key, value, self._l1_timeout(timeout), version=version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l1.delete(key, version=version)
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.l1.delete(key, version=version)
+        return self.l2.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.l1.has_key(key, version=version) or self.l2.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.l1.delete(key, version=version)
+        return self.l2.incr(key, delta, version=version)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+
+# --- Locks in the shared tier ---
+
+def _lock_path(shared, key):
+    return os.path.join(shared._dir, hashlib.md5(key.encode()).hexdigest() + '.lock')
+
+
+def _create_lock_file(path):
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+
+def acquire_lock(key, timeout):
+    """
+    Takes the lock `key` without waiting. Returns False if another worker
+    holds it; a lock older than `timeout` seconds is treated as abandoned.
+    """
+    shared = caches['shared']
+    if not isinstance(shared, FileBasedCache):
+        return shared.add(key, 1, timeout)
+    path = _lock_path(shared, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if _create_lock_file(path):
+        return True
+    try:
+        if time.time() - os.path.getmtime(path) < timeout:
+            return False
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    return _create_lock_file(path)
+
+
+def release_lock(key):
+    shared = caches['shared']
+    if not isinstance(shared, FileBasedCache):
+        shared.delete(key)
+        return
+    try:
+        os.remove(_lock_path(shared, key))
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def _serialized(key, timeout=5):
+    # Waits up to `timeout` for the lock, then goes ahead without it rather than failing the request
+    deadline = time.time() + timeout
+    locked = acquire_lock(key, timeout)
+    while not locked and time.time() < deadline:
+        time.sleep(0.01)
+        locked = acquire_lock(key, timeout)
+    try:
+        yield
+    finally:
+        if locked:
+            release_lock(key)
+
+
+# --- Versioned keys ---
+
+def _version_key(namespace):
+    return f'hacklabs:ver:{namespace}'
+
+
+def get_version(namespace):
+    """
+    Current version of a namespace. Always read from the shared tier so
+    a bump is visible to every worker at once.
+    """
+    shared = caches['shared']
+    key = _version_key(namespace)
+    version = shared.get(key)
+    if version is None:
+        with _serialized(f'{key}:lock'):
+            shared.add(key, 1, timeout=None)
+            version = shared.get(key, 1)
+    return version
+
+
+def _bump(shared, key):
+    try:
+        shared.incr(key)
+    except ValueError:
+        # Unknown key (first bump or evicted): anything != the old value works
+        shared.set(key, int(time.time()), timeout=None)
+
+
+def bump_version(*namespaces):
+    shared = caches['shared']
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        if isinstance(shared, RedisCache):
+            _bump(shared, key)
+            continue
+        # Elsewhere incr is a get and a set: two bumps at once could both write v+1
+        with _serialized(f'{key}:lock'):
+            _bump(shared, key)
+
+
+def versioned_key(namespace, *parts):
+    return ':'.join(['hacklabs', namespace, f'v{get_version(namespace)}', *map(str, parts)])
+
+
+# --- Stampede protection ---
+
+def get_or_compute(key, producer, timeout=300, lock_timeout=10, cache_alias='default'):
+    """
+    Returns the cached value for `key`, computing it with `producer()` on a miss.
+
+    Values are stored with a soft expiry. Once it has passed, one worker
+    (whoever grabs the lock in the shared tier) recomputes the value while
+    the others keep serving the stale copy. On a cold miss the losers wait
+    for the winner instead of all hitting the database at once.
+    """
+    cache = caches[cache_alias]
+    lock_key = f'{key}:lock'
+    entry = cache.get(key)
+    now = time.time()
+
+    if entry is not None:
+        value, soft_expiry = entry
+        if now < soft_expiry:
+            return value
+        locked = acquire_lock(lock_key, lock_timeout)
+        if not locked:
+            metrics.inc('hacklabs_cache_requests_total', cache=cache_alias, result='stale')
+            return value
+    else:
+        locked = acquire_lock(lock_key, lock_timeout)
+        if not locked:
+            deadline = now + lock_timeout
+            while time.time() < deadline:
+                time.sleep(0.05)
+                entry = cache.get(key)
+                if entry is not None:
+                    metrics.inc('hacklabs_cache_requests_total', cache=cache_alias, result='lock_wait')
+                    return entry[0]
+            # The winner died or is very slow: compute it ourselves
+
+    try:
+        value = producer()
+        # Keep the stale copy around for a while after the soft expiry
+        cache.set(key, (value, time.time() + timeout), timeout + lock_timeout * 6)
+        return value
+    finally:
+        if locked:
+            release_lock(lock_key)
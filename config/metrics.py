@@ -0,0 +1,218 @@
+"""
+Process-local metrics aggregated across workers through a shared SQLite file.
+
+Each worker accumulates counters and histograms in memory and adds them to
+the store (one UPSERT per series) at most every METRICS_FLUSH_INTERVAL
+seconds. /metrics renders the store in the Prometheus text format, plus
+per-second rates over the last METRICS_RATE_WINDOW seconds, so a live
+lesson can be watched without running Prometheus.
+"""
+import atexit
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.db import OperationalError, connections
+from django.http import HttpResponse
+
+COUNTERS = {
+    'hacklabs_submissions_total': 'Flag submissions by result',
+    'hacklabs_solves_total': 'Solves per challenge',
+    'hacklabs_http_requests_total': 'HTTP requests by URL name and status class',
+    'hacklabs_cache_requests_total': 'Cache lookups by cache and result',
+    'hacklabs_db_lock_waits_total': 'Queries that failed because the database was locked',
+    'hacklabs_jobs_total': 'Background jobs by kind and outcome',
+    'hacklabs_lesson_transitions_total': 'Scheduled lesson state changes by new state',
+}
+
+HISTOGRAMS = {
+    'hacklabs_http_request_duration_seconds': 'Request latency by URL name',
+    'hacklabs_job_seconds': 'Background job run time by kind',
+}
+
+# Counters that also get a per-second rate gauge (<name without _total>_per_second)
+RATE_COUNTERS = ('hacklabs_submissions_total', 'hacklabs_http_requests_total')
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+RATE_SLOT = 10  # seconds per rate bucket
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    return ','.join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()))
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Guards the SQLite connection, shared by the threads of this process
+        self._conn_lock = threading.Lock()
+        self._pending = defaultdict(float)
+        self._rates = defaultdict(float)
+        self._last_flush = time.monotonic()
+        self._conn = None
+
+    # --- recording ---
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._pending[key] += value
+            if name in RATE_COUNTERS:
+                self._rates[key + (int(time.time()) // RATE_SLOT,)] += value
+
+    def observe(self, name, seconds, **labels):
+        with self._lock:
+            for le in BUCKETS:
+                if seconds <= le:
+                    self._pending[(f'{name}_bucket', _labels({**labels, 'le': le}))] += 1
+            self._pending[(f'{name}_bucket', _labels({**labels, 'le': '+Inf'}))] += 1
+            self._pending[(f'{name}_sum', _labels(labels))] += seconds
+            self._pending[(f'{name}_count', _labels(labels))] += 1
+
+    # --- shared store ---
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(settings.METRICS_STORE, timeout=5, check_same_thread=False,
+                                         isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS samples ('
+                               'name TEXT, labels TEXT, value REAL, PRIMARY KEY (name, labels))')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS rates ('
+                               'name TEXT, labels TEXT, slot INTEGER, value REAL, PRIMARY KEY (name, labels, slot))')
+        return self._conn
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if not settings.METRICS_ENABLED:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            rates, self._rates = self._rates, defaultdict(float)
+            self._last_flush = time.monotonic()
+        if not pending and not rates:
+            return
+        # Recording only waits for the swap above, never for SQLite
+        with self._conn_lock:
+            try:
+                conn = self._connection()
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany(
+                    'INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) '
+                    'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value',
+                    [(name, labels, value) for (name, labels), value in pending.items()])
+                conn.executemany(
+                    'INSERT INTO rates (name, labels, slot, value) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (name, labels, slot) DO UPDATE SET value = value + excluded.value',
+                    [(name, labels, slot, value) for (name, labels, slot), value in rates.items()])
+                oldest = int(time.time()) // RATE_SLOT - settings.METRICS_RATE_WINDOW // RATE_SLOT - 1
+                conn.execute('DELETE FROM rates WHERE slot < ?', (oldest,))
+                conn.execute('COMMIT')
+                return
+            except sqlite3.Error:
+                # Metrics must never break a request; keep the data for the next flush
+                if self._conn is not None and self._conn.in_transaction:
+                    self._conn.execute('ROLLBACK')
+        with self._lock:
+            for key, value in pending.items():
+                self._pending[key] += value
+            for key, value in rates.items():
+                self._rates[key] += value
+
+    def render(self):
+        self.flush()
+        window = settings.METRICS_RATE_WINDOW
+        first_slot = int(time.time()) // RATE_SLOT - window // RATE_SLOT
+        with self._conn_lock:
+            conn = self._connection()
+            rows = conn.execute('SELECT name, labels, value FROM samples ORDER BY name, labels').fetchall()
+            rate_rows = conn.execute('SELECT name, labels, SUM(value) FROM rates WHERE slot > ? '
+                                     'GROUP BY name, labels ORDER BY name, labels', (first_slot,)).fetchall()
+
+        series = defaultdict(list)
+        for name, labels, value in rows:
+            series[name].append((labels, value))
+
+        lines = []
+        for name, help_text in COUNTERS.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [_sample(name, labels, value) for labels, value in series.get(name, [])]
+        for name, help_text in HISTOGRAMS.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for suffix in ('_bucket', '_sum', '_count'):
+                lines += [_sample(name + suffix, labels, value) for labels, value in series.get(name + suffix, [])]
+
+        rates = defaultdict(list)
+        for name, labels, value in rate_rows:
+            rates[name].append((labels, value / window))
+        for name in RATE_COUNTERS:
+            gauge = name[:-len('_total')] + '_per_second'
+            lines += [f'# HELP {gauge} Average rate over the last {window}s', f'# TYPE {gauge} gauge']
+            lines += [_sample(gauge, labels, value) for labels, value in rates.get(name, [])]
+
+        return '\n'.join(lines) + '\n'
+
+
+def _sample(name, labels, value):
+    value = int(value) if float(value).is_integer() else round(value, 6)
+    return f'{name}{{{labels}}} {value}' if labels else f'{name} {value}'
+
+
+registry = Registry()
+inc = registry.inc
+observe = registry.observe
+atexit.register(registry.flush)
+
+
+class MetricsMiddleware:
+    """
+    Request counts and latency per URL name, plus database lock errors.
+    Should stay near the top of MIDDLEWARE so the latency covers everything.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    @staticmethod
+    def _count_lock_waits(execute, sql, params, many, context):
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as exc:
+            if 'locked' in str(exc):
+                inc('hacklabs_db_lock_waits_total')
+            raise
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        conn = connections['default']
+        with conn.execute_wrapper(self._count_lock_waits):
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        inc('hacklabs_http_requests_total', view=view, status=f'{response.status_code // 100}xx')
+        observe('hacklabs_http_request_duration_seconds', time.perf_counter() - started, view=view)
+        registry.maybe_flush()
+        return response
+
+
+def metrics_view(request):
+    remote = request.META.get('REMOTE_ADDR')
+    user = request.user
+    is_mentor = user.is_authenticated and (user.is_superuser or user.groups.filter(name='Mentors').exists())
+    if remote not in settings.METRICS_ALLOWED_IPS and not is_mentor:
+        raise PermissionDenied
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
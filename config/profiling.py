@@ -0,0 +1,151 @@
+"""
+Request profiling: DB and template timings in a Server-Timing header,
+a slow-request log with the offending SQL, and optional sampled cProfile
+dumps per URL name.
+
+Enabled with PROFILING_ENABLED (env HACKLABS_PROFILING=1), see settings.py.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('hacklabs.slow_requests')
+
+_current = ContextVar('hacklabs_request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def record_query(self, sql, duration):
+        self.queries.append((duration, sql))
+        self.db_time += duration
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+
+class _TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_time += time.perf_counter() - started
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """
+    Regular Django template backend that reports top-level render time
+    to the profiling middleware. Costs nothing when profiling is off.
+    """
+
+    def from_string(self, template_code):
+        return _TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return _TimedTemplate(template.template, self)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = settings.PROFILING_SLOW_REQUEST_MS
+        self.cprofile_urls = set(settings.PROFILING_CPROFILE_URLS)
+        self.cprofile_rate = settings.PROFILING_CPROFILE_SAMPLE_RATE
+        self.cprofile_dir = settings.PROFILING_CPROFILE_DIR
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+
+        def wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                profile.record_query(sql, time.perf_counter() - started)
+
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+            profiler = getattr(request, '_hacklabs_profiler', None)
+            if profiler is not None:
+                profiler.disable()
+                self._dump_profile(request.resolver_match.url_name, profiler)
+
+        total = profile.total_time
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={profile.db_time * 1000:.1f};desc="{len(profile.queries)} queries"',
+            f'tpl;dur={profile.template_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        if total * 1000 >= self.slow_ms:
+            self._log_slow(request, response, profile, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        if url_name in self.cprofile_urls and random.random() < self.cprofile_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is already active in this thread
+                return None
+            request._hacklabs_profiler = profiler
+        return None
+
+    def _log_slow(self, request, response, profile, total):
+        url_name = request.resolver_match.url_name if request.resolver_match else '-'
+        lines = [
+            f'{request.method} {request.get_full_path()} [{url_name}] -> {response.status_code} '
+            f'total={total * 1000:.1f}ms db={profile.db_time * 1000:.1f}ms/{len(profile.queries)}q '
+            f'tpl={profile.template_time * 1000:.1f}ms'
+        ]
+        for duration, sql in sorted(profile.queries, reverse=True)[:10]:
+            lines.append(f'    {duration * 1000:8.1f}ms  {sql}')
+        logger.warning('\n'.join(lines))
+
+    def _dump_profile(self, url_name, profiler):
+        """
+        Accumulates samples per URL name and writes <dir>/<url_name>.<pid>.prof
+        (merge files with pstats.Stats(*paths) or open one in snakeviz).
+        """
+        with self._stats_lock:
+            stats = self._stats.get(url_name)
+            if stats is None:
+                stats = self._stats[url_name] = pstats.Stats(profiler)
+            else:
+                stats.add(profiler)
+            os.makedirs(self.cprofile_dir, exist_ok=True)
+            stats.dump_stats(os.path.join(self.cprofile_dir, f'{url_name}.{os.getpid()}.prof'))
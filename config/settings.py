@@ -57,6 +57,7 @@ SUMMERNOTE_CONFIG = {
 X_FRAME_OPTIONS = 'SAMEORIGIN'
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,13 +65,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'config.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'config.profiling.ProfiledDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -94,6 +96,39 @@ DATABASES = {
     }
 }
 
+# Cache
+# 'shared' is visible to every worker: a file cache by default, the database
+# with HACKLABS_CACHE=db (run `manage.py createcachetable` once) or Redis with
+# HACKLABS_CACHE=redis://host:6379/0. 'default' adds a per-process L1 in front
+# of it (config/cache.py). Tests can swap 'shared' for a LocMemCache.
+HACKLABS_CACHE = os.environ.get('HACKLABS_CACHE', 'file')
+
+if HACKLABS_CACHE.startswith(('redis://', 'rediss://', 'unix://')):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': HACKLABS_CACHE,
+    }
+elif HACKLABS_CACHE == 'db':
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'hacklabs_cache',
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'config.cache.TieredCache',
+        'TIMEOUT': 300,
+        'OPTIONS': {'L2': 'shared', 'L1_TIMEOUT': 5, 'L1_MAX_ENTRIES': 1000},
+    },
+    'shared': SHARED_CACHE,
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -132,9 +167,76 @@ else:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# --- Scoreboard snapshots (`manage.py snapshot_scoreboard`), served at /spectate/ ---
+SCOREBOARD_SNAPSHOT_DIR = os.environ.get('HACKLABS_SNAPSHOT_DIR', os.path.join(MEDIA_ROOT, 'scoreboard'))
+SCOREBOARD_SNAPSHOT_INTERVAL = 5  # seconds between version checks, also the spectator max-age
+
+# --- Background jobs (mentors/jobs.py) ---
+# With JOBS_IN_PROCESS each web process runs queued jobs in a small thread
+# pool; set HACKLABS_JOBS_IN_PROCESS=0 when `manage.py run_jobs` runs instead.
+JOBS_IN_PROCESS = os.environ.get('HACKLABS_JOBS_IN_PROCESS', '1') == '1'
+JOBS_THREADS = 2
+JOB_ARTIFACT_DIR = os.environ.get('HACKLABS_JOB_ARTIFACT_DIR', os.path.join(BASE_DIR, 'artifacts'))
+JOB_STALE_AFTER = 3600  # seconds before a running job counts as abandoned
+
+# Team mode: members per team (users/views.py); team points count each challenge once
+TEAM_MAX_MEMBERS = int(os.environ.get('HACKLABS_TEAM_MAX_MEMBERS', 4))
+
+# --- Lesson scheduler (mentors/schedule.py) ---
+# With SCHEDULER_IN_PROCESS the process that sets a timer also fires its
+# transitions; run `manage.py run_scheduler` for deployments with many workers.
+SCHEDULER_IN_PROCESS = os.environ.get('HACKLABS_SCHEDULER_IN_PROCESS', '1') == '1'
+
+# Season archives written by the platform reset (mentors/seasons.py)
+SEASON_ARCHIVE_DIR = os.environ.get('HACKLABS_SEASON_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# --- Request profiling (config/profiling.py) ---
+# Adds a Server-Timing header (db / tpl / total) to every response and logs
+# slow requests with their SQL to logs/slow_requests.log.
+PROFILING_ENABLED = os.environ.get('HACKLABS_PROFILING', '0') == '1'
+PROFILING_SLOW_REQUEST_MS = int(os.environ.get('HACKLABS_SLOW_REQUEST_MS', 500))
+# cProfile is opt-in per URL name, e.g. HACKLABS_CPROFILE_URLS=scoreboard,challenges
+PROFILING_CPROFILE_URLS = [u for u in os.environ.get('HACKLABS_CPROFILE_URLS', '').split(',') if u]
+PROFILING_CPROFILE_SAMPLE_RATE = float(os.environ.get('HACKLABS_CPROFILE_SAMPLE_RATE', 0.05))
+PROFILING_CPROFILE_DIR = BASE_DIR / 'profiles'
+
+# --- Metrics (config/metrics.py), served at /metrics ---
+# Workers aggregate through a shared SQLite file, separate from the main DB.
+METRICS_ENABLED = os.environ.get('HACKLABS_METRICS', '1') == '1'
+METRICS_STORE = os.environ.get('HACKLABS_METRICS_STORE', str(BASE_DIR / 'metrics.sqlite3'))
+METRICS_FLUSH_INTERVAL = 1.0  # seconds
+METRICS_RATE_WINDOW = 60  # seconds, for the *_per_second gauges
+# Anyone from these addresses may scrape /metrics; mentors can view it from anywhere
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+LOGS_DIR = BASE_DIR / 'logs'
+if PROFILING_ENABLED:
+    LOGS_DIR.mkdir(exist_ok=True)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': LOGS_DIR / 'slow_requests.log',
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'hacklabs.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
@@ -3,6 +3,7 @@ from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from django.shortcuts import render
+from config.metrics import metrics_view
 
 # --- Custom Error Handlers ---
 def custom_page_not_found_view(request, exception):
@@ -23,6 +24,7 @@ urlpatterns = [
     path('users/', include('users.urls')),
     path('mentors/', include('mentors.urls')),
     path('summernote/', include('django_summernote.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 # Указываем Django использовать наши кастомные view для обработки ошибок
 handler404 = 'config.urls.custom_page_not_found_view'
@@ -0,0 +1,81 @@
+"""
+Opening and hiding challenges in one lesson.
+
+`plan` diffs the wanted challenges against the ones the lesson currently
+shows (LessonSettings.open_challenges) and lists only those that would
+change; `apply` writes exactly those, in one transaction, and bumps the
+catalog version once if anything changed. Re-applying a template that is
+already live writes nothing. The plan doubles as the dry-run preview.
+
+Changes go to the lesson's own challenge set, so other lessons keep
+theirs. A lesson that showed every active challenge gets its own set on
+the first change, starting from what it showed. Opening a challenge that
+is switched off for the whole platform (Challenge.is_active) switches it
+back on; hiding one never touches the flag.
+"""
+from collections import namedtuple
+
+from django.db import transaction
+
+from config.cache import CATALOG, bump_version
+from pages.models import Challenge
+from .models import LessonSettings
+
+EXCLUSIVE = 'exclusive'
+ENABLE = 'enable'
+DISABLE = 'disable'
+ACTIONS = (EXCLUSIVE, ENABLE, DISABLE)
+
+# Stays under SQLite's bound-parameter limit
+BATCH_SIZE = 500
+
+Plan = namedtuple('Plan', 'lesson action enable disable unchanged')
+
+
+def plan_challenges(lesson, challenge_ids, action):
+    """
+    The challenge ids `action` would open and hide in `lesson` (sorted),
+    and how many of `challenge_ids` are already in the wanted state.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f'Unknown template action: {action!r}')
+    wanted = set(challenge_ids)
+    shown = set(lesson.open_challenges().values_list('id', flat=True))
+    enable = wanted - shown if action in (EXCLUSIVE, ENABLE) else set()
+    if action == EXCLUSIVE:
+        disable = shown - wanted
+    elif action == DISABLE:
+        disable = wanted & shown
+    else:
+        disable = set()
+    unchanged = len(wanted) - len(disable if action == DISABLE else enable)
+    return Plan(lesson, action, sorted(enable), sorted(disable), unchanged)
+
+
+def plan(template, action, lesson):
+    return plan_challenges(lesson, template.challenges.values_list('id', flat=True), action)
+
+
+def _batches(ids):
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start:start + BATCH_SIZE]
+
+
+def apply(change):
+    """Writes `change` (a Plan). Returns (opened, hidden) challenge counts."""
+    lesson = change.lesson
+    if not change.enable and not change.disable:
+        return 0, 0
+    with transaction.atomic():
+        if not lesson.own_catalog:
+            lesson.challenges.set(Challenge.objects.filter(is_active=True).values_list('id', flat=True))
+            LessonSettings.objects.filter(pk=lesson.pk).update(own_catalog=True)
+            lesson.own_catalog = True
+        for ids in _batches(change.disable):
+            lesson.challenges.remove(*ids)
+        for ids in _batches(change.enable):
+            lesson.challenges.add(*ids)
+            # Only challenges still switched off are written
+            Challenge.objects.filter(pk__in=ids, is_active=False).update(is_active=True)
+    bump_version(CATALOG)
+    return len(change.enable), len(change.disable)
@@ -0,0 +1,102 @@
+"""
+Live lesson analytics read from the per-lesson, per-minute ActivityBucket
+table.
+
+Both endpoints touch at most one row per minute of the window, however
+many submissions the lesson has seen. Median solve times are read from
+the (lesson, challenge, date) index on Solve.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from pages.models import ActivityBucket, Solve
+from pages.projections import minute_of
+from .models import LessonSettings
+
+METRICS = ('solves', 'wrong_attempts', 'lockouts', 'active_users')
+
+DEFAULT_WINDOW_MINUTES = 60
+MAX_WINDOW_MINUTES = 24 * 60
+
+
+def window(minutes=None, lesson=None):
+    """
+    (start, end) minutes to report on: the last `minutes` if given,
+    otherwise `lesson` (default: the default lesson) from its start_time
+    until the hard deadline or now.
+    """
+    now = minute_of(timezone.now())
+    if minutes:
+        minutes = min(minutes, MAX_WINDOW_MINUTES)
+        return now - timedelta(minutes=minutes - 1), now
+
+    settings = lesson or LessonSettings.get_settings()
+    end = now
+    deadline = settings.hard_deadline or settings.end_time
+    if settings.start_time and deadline and deadline < now:
+        end = minute_of(deadline)
+    start = minute_of(settings.start_time) if settings.start_time else end - timedelta(
+        minutes=DEFAULT_WINDOW_MINUTES - 1)
+    # Keep the payload bounded for multi-day lessons
+    return max(start, end - timedelta(minutes=MAX_WINDOW_MINUTES - 1)), end
+
+
+def sparkline(start, end, lesson):
+    """One value per minute and metric of `lesson`, zeros for quiet minutes."""
+    size = int((end - start).total_seconds() // 60) + 1
+    series = {metric: [0] * size for metric in METRICS}
+    rows = ActivityBucket.objects.filter(lesson=lesson, minute__gte=start, minute__lte=end).values_list(
+        'minute', *METRICS)
+    for minute, *values in rows:
+        index = int((minute - start).total_seconds() // 60)
+        for metric, value in zip(METRICS, values):
+            series[metric][index] = value
+    return {'start': start, 'end': end, 'step_seconds': 60, 'series': series}
+
+
+def histogram(start, end, bins, lesson):
+    """The sparkline folded into `bins` equal-width bins (sums; active_users is a per-minute peak)."""
+    data = sparkline(start, end, lesson)
+    size = len(data['series']['solves'])
+    bins = max(1, min(bins, size))
+    width = size / bins
+    edges = [int(i * width) for i in range(bins)] + [size]
+
+    result = {}
+    for metric, values in data['series'].items():
+        fold = max if metric == 'active_users' else sum
+        result[metric] = [fold(values[edges[i]:edges[i + 1]] or [0]) for i in range(bins)]
+    return {
+        'start': start,
+        'end': end,
+        'edges': [start + timedelta(minutes=edge) for edge in edges],
+        'bins': result,
+    }
+
+
+def median_times_to_solve(lesson, challenge_ids):
+    """
+    {challenge id: median time from `lesson`'s start to a solve} for the
+    given challenges. Only the one or two middle solves of each challenge
+    come back from the database; challenges without solves after the start
+    are left out.
+    """
+    if not lesson.start_time:
+        return {}
+    middle = Solve.objects.filter(
+        lesson=lesson, challenge_id__in=challenge_ids, date__gte=lesson.start_time
+    ).annotate(
+        position=Window(RowNumber(), partition_by=[F('challenge_id')], order_by=[F('date').asc(), F('id').asc()]),
+        total=Window(Count('id'), partition_by=[F('challenge_id')]),
+    ).filter(position__gte=F('total') / 2.0, position__lte=F('total') / 2.0 + 1).values_list('challenge_id', 'date')
+
+    dates = {}
+    for challenge_id, date in middle:
+        dates.setdefault(challenge_id, []).append(date)
+    return {
+        challenge_id: timedelta(seconds=round(sum((d - lesson.start_time).total_seconds() for d in found) / len(found)))
+        for challenge_id, found in dates.items()
+    }
@@ -1,11 +1,19 @@
 from django.contrib import admin
-from .models import LessonSettings
+from . import schedule
+from .models import Job, LessonMembership, LessonSettings, Season
 
 
 @admin.register(LessonSettings)
 class LessonSettingsAdmin(admin.ModelAdmin):
-    list_display = ('id', 'end_time', 'hard_deadline', 'status_display')
-    readonly_fields = ('status_display',)
+    list_display = ('id', 'title', 'join_code', 'state', 'state_until', 'end_time', 'hard_deadline', 'status_display')
+    readonly_fields = ('status_display', 'state', 'state_until')
+    filter_horizontal = ('challenges',)
+
+    def save_model(self, request, obj, form, change):
+        # As in the mentor panel: no challenges selected = every active one
+        obj.own_catalog = bool(form.cleaned_data.get('challenges'))
+        super().save_model(request, obj, form, change)
+        schedule.changed(obj, 'The lesson timer was changed.')
 
     def status_display(self, obj):
         if obj.is_lesson_active():
@@ -16,8 +24,22 @@ class LessonSettingsAdmin(admin.ModelAdmin):
 
     status_display.short_description = "Current Status"
 
-    # Запрещаем создавать больше одной записи (так как настройки глобальные)
-    def has_add_permission(self, request):
-        if self.model.objects.exists():
-            return False
-        return super().has_add_permission(request)
\ No newline at end of file
+
+@admin.register(LessonMembership)
+class LessonMembershipAdmin(admin.ModelAdmin):
+    list_display = ('user', 'lesson', 'joined_at')
+    list_filter = ('lesson',)
+    search_fields = ('user__username',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'cached', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('fingerprint', 'artifact', 'started_at', 'finished_at', 'error')
+
+
+@admin.register(Season)
+class SeasonAdmin(admin.ModelAdmin):
+    list_display = ('label', 'created_at', 'users', 'solves', 'attempts', 'winner', 'top_points')
+    readonly_fields = ('archive', 'size', 'sha256')
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class MentorsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mentors'
+
+    def ready(self):
+        # Keeps LessonTemplate totals in step with its challenges
+        from . import totals  # noqa: F401
+
+        from django.conf import settings
+        if settings.SCHEDULER_IN_PROCESS:
+            # The database is not queried during start-up: the timer is armed on the first request
+            from django.core.signals import request_started
+            from . import schedule
+            request_started.connect(schedule.wake_on_first_request, dispatch_uid=schedule.WAKE_UID)
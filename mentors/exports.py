@@ -0,0 +1,274 @@
+"""
+Streaming result exports.
+
+Reports are generators of rows read with server-side cursors
+(`.iterator(chunk_size=...)`); the writers turn rows into CSV or XLSX
+bytes chunk by chunk. Nothing is materialized, so memory stays flat and
+the first bytes leave as soon as the first rows are read.
+
+The XLSX writer emits a minimal SpreadsheetML package through a
+streaming zipfile (inline strings, no shared-string table), which needs
+no third-party library. The challenge handout (DOCX) needs python-docx.
+"""
+import codecs
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from config.cache import CATALOG, get_or_compute, versioned_key
+from pages.models import Attempt, Challenge, Solve
+from pages.scoreboard import students
+
+# Try to import python-docx, handle gracefully if missing
+try:
+    from docx import Document
+    from docx.shared import Pt, RGBColor
+except ImportError:
+    Document = None
+
+CHUNK_SIZE = 2000
+
+REPORTS = ('ranking', 'matrix')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+# --- Reports ---
+
+def max_possible_points(lesson=None):
+    """
+    Sum of points of the challenges open in `lesson` (all active challenges
+    without one), cached until the catalog changes.
+    """
+    def compute():
+        challenges = lesson.open_challenges() if lesson else Challenge.objects.filter(is_active=True)
+        return challenges.aggregate(total=Sum('points'))['total'] or 0
+
+    return get_or_compute(versioned_key(CATALOG, f"max_points_{lesson.pk if lesson else 'all'}"), compute)
+
+
+def lesson_students(lesson=None):
+    """The students of `lesson` (every student without one), as listed by users_list."""
+    users = students()
+    return users.filter(lesson_memberships__lesson=lesson) if lesson else users
+
+
+def active_challenges():
+    return Challenge.objects.filter(is_active=True).select_related('category').order_by('category__name', 'points')
+
+
+def ranking_rows(lesson=None):
+    max_points = max_possible_points(lesson)
+    yield ['Rank', 'Username', 'Total Score', 'Max Possible Score', 'Completion Percentage']
+    users = lesson_students(lesson).annotate(points=F('score_total__points')).order_by(
+        F('points').desc(nulls_last=True), 'username').values_list('username', 'points')
+    for index, (username, points) in enumerate(users.iterator(chunk_size=CHUNK_SIZE), 1):
+        points = points or 0
+        percentage = (points / max_points) * 100 if max_points > 0 else 0.0
+        yield [index, username, points, max_points, f"{percentage:.2f}%"]
+
+
+def _by_user(rows):
+    """Groups an iterator of (user_id, ...) rows ordered by user_id."""
+    current, group = None, []
+    for row in rows:
+        if row[0] != current:
+            if group:
+                yield current, group
+            current, group = row[0], []
+        group.append(row[1:])
+    if group:
+        yield current, group
+
+
+def matrix_rows(lesson=None):
+    """
+    One row per student of `lesson`: total score, then solve time and
+    attempt count per challenge. Users, solves and attempt counts are three
+    cursors ordered by user id and merged, so only one user's data is in memory.
+    """
+    challenges = list(Challenge.objects.order_by('category__name', 'id').values_list('id', 'title'))
+    column = {challenge_id: i for i, (challenge_id, _) in enumerate(challenges)}
+
+    header = ['Username', 'Total Score', 'Solved']
+    for _, title in challenges:
+        header += [f'{title} (solved at)', f'{title} (attempts)']
+    yield header
+
+    users = lesson_students(lesson).annotate(points=F('score_total__points')).order_by('id').values_list(
+        'id', 'username', 'points')
+    solves = _by_user(Solve.objects.filter(user__in=lesson_students(lesson)).order_by('user_id').values_list(
+        'user_id', 'challenge_id', 'date').iterator(chunk_size=CHUNK_SIZE))
+    attempts = _by_user(Attempt.objects.filter(user__in=lesson_students(lesson)).order_by('user_id').values_list(
+        'user_id', 'challenge_id').annotate(count=Count('id')).iterator(chunk_size=CHUNK_SIZE))
+    next_solves = next(solves, None)
+    next_attempts = next(attempts, None)
+
+    for user_id, username, points in users.iterator(chunk_size=CHUNK_SIZE):
+        cells = [''] * (2 * len(challenges))
+        solved = 0
+        while next_solves and next_solves[0] <= user_id:
+            if next_solves[0] == user_id:
+                for challenge_id, date in next_solves[1]:
+                    cells[2 * column[challenge_id]] = timezone.localtime(date).strftime('%Y-%m-%d %H:%M:%S')
+                    solved += 1
+            next_solves = next(solves, None)
+        while next_attempts and next_attempts[0] <= user_id:
+            if next_attempts[0] == user_id:
+                for challenge_id, count in next_attempts[1]:
+                    cells[2 * column[challenge_id] + 1] = count
+            next_attempts = next(attempts, None)
+        yield [username, points or 0, solved] + cells
+
+
+# --- Writers ---
+
+class _Echo:
+    """File-like object that hands back what was written (for csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    yield codecs.BOM_UTF8
+    writer = csv.writer(_Echo(), delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow(row))
+        if len(batch) >= 100:
+            yield ''.join(batch).encode('utf-8')
+            batch = []
+    if batch:
+        yield ''.join(batch).encode('utf-8')
+
+
+class _Pipe:
+    """Unseekable sink for zipfile; drained after every chunk of rows."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    if value == '' or value is None:
+        return '<c/>'
+    text = escape(_ILLEGAL_XML.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def stream_xlsx(rows, sheet_name='Results'):
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        yield pipe.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                        b'<sheetData>')
+            for number, row in enumerate(rows, 1):
+                cells = ''.join(_xlsx_cell(value) for value in row)
+                sheet.write(f'<row r="{number}">{cells}</row>'.encode('utf-8'))
+                if number % 100 == 0:
+                    yield pipe.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield pipe.drain()
+
+
+def write_challenges_docx(challenges, fileobj):
+    document = Document()
+    main_title = document.add_heading('HackLabs Active Challenges', 0)
+    main_title.alignment = 1
+
+    timestamp = timezone.now().strftime('%Y-%m-%d %H:%M')
+    p_date = document.add_paragraph(f"Exported on: {timestamp}")
+    p_date.alignment = 1
+    document.add_paragraph("-" * 50).alignment = 1
+
+    for challenge in challenges:
+        p = document.add_paragraph()
+        p.space_after = Pt(12)
+
+        def add_line(label, text):
+            run_label = p.add_run(f"{label} ")
+            run_label.bold = True
+            run_label.font.color.rgb = RGBColor(0, 0, 0)
+            p.add_run(f"{text}\n")
+
+        add_line("Title:", challenge.title)
+        add_line("Category:", challenge.category.name if challenge.category else "Uncategorized")
+        add_line("Description:", challenge.description)
+        add_line("Flag:", challenge.flag)
+        add_line("Award:", f"{challenge.points} Pts")
+
+        sep = document.add_paragraph("_" * 30)
+        sep.alignment = 1
+        sep.space_after = Pt(24)
+
+    document.save(fileobj)
+
+
+WRITERS = {'csv': stream_csv, 'xlsx': stream_xlsx}
@@ -6,7 +6,8 @@ from django_summernote.widgets import SummernoteWidget
 class ChallengeForm(forms.ModelForm):
     class Meta:
         model = Challenge
-        fields = ['title', 'category', 'description', 'points', 'difficulty', 'flag', 'max_attempts', 'is_active']
+        fields = ['title', 'category', 'description', 'points', 'difficulty', 'flag', 'max_attempts', 'is_active',
+                  'dynamic', 'minimum_points', 'decay']
         widgets = {
             'title': forms.TextInput(attrs={'class': 'w-full bg-[#13141b] border border-[#2c2f3b] rounded p-2 text-white focus:border-[#9fef00] outline-none'}),
             'category': forms.Select(attrs={'class': 'w-full bg-[#13141b] border border-[#2c2f3b] rounded p-2 text-white focus:border-[#9fef00] outline-none'}),
@@ -16,8 +17,24 @@ class ChallengeForm(forms.ModelForm):
             'flag': forms.TextInput(attrs={'class': 'w-full bg-[#13141b] border border-[#2c2f3b] rounded p-2 text-white focus:border-[#9fef00] outline-none font-mono'}),
             'max_attempts': forms.NumberInput(attrs={'class': 'w-full bg-[#13141b] border border-[#2c2f3b] rounded p-2 text-white focus:border-[#9fef00] outline-none'}),
             'is_active': forms.CheckboxInput(attrs={'class': 'w-4 h-4 bg-[#13141b] border border-[#2c2f3b] rounded focus:ring-[#9fef00]'}),
+            'dynamic': forms.CheckboxInput(attrs={'class': 'w-4 h-4 bg-[#13141b] border border-[#2c2f3b] rounded focus:ring-[#9fef00]'}),
+            'minimum_points': forms.NumberInput(attrs={'class': 'w-full bg-[#13141b] border border-[#2c2f3b] rounded p-2 text-white focus:border-[#9fef00] outline-none'}),
+            'decay': forms.NumberInput(attrs={'class': 'w-full bg-[#13141b] border border-[#2c2f3b] rounded p-2 text-white focus:border-[#9fef00] outline-none'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk and self.instance.dynamic:
+            # For dynamic challenges the Points field edits the starting value
+            self.initial['points'] = self.instance.initial_points
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('dynamic') and cleaned_data.get('points') is not None:
+            if cleaned_data.get('minimum_points', 0) > cleaned_data['points']:
+                self.add_error('minimum_points', 'The minimum cannot exceed the starting value.')
+        return cleaned_data
+
 class CategoryForm(forms.ModelForm):
     class Meta:
         model = Category
@@ -26,6 +43,12 @@ class CategoryForm(forms.ModelForm):
             'name': forms.TextInput(attrs={'class': 'w-full bg-[#13141b] border border-[#2c2f3b] rounded p-2 text-white focus:border-[#9fef00] outline-none', 'placeholder': 'e.g. Web Security'}),
         }
 
+class TemplateChoiceField(forms.ModelChoiceField):
+    def label_from_instance(self, obj):
+        # Stored totals: listing the templates needs no join
+        return f"{obj.title} ({obj.task_count} tasks, {obj.total_points} pts)"
+
+
 class TimerSettingsForm(forms.ModelForm):
     duration_minutes = forms.IntegerField(
         required=False,
@@ -39,14 +62,49 @@ class TimerSettingsForm(forms.ModelForm):
         label="Overtime Delay (minutes)",
         widget=forms.NumberInput(attrs={'class': 'w-full bg-[#13141b] border border-[#2c2f3b] rounded p-2 text-white focus:border-[#9fef00] outline-none', 'placeholder': '10'})
     )
+    start_at = forms.DateTimeField(
+        required=False,
+        label="Start At",
+        input_formats=['%Y-%m-%dT%H:%M'],
+        widget=forms.DateTimeInput(attrs={'type': 'datetime-local', 'class': 'w-full bg-[#13141b] border border-[#2c2f3b] rounded p-2 text-white focus:border-[#9fef00] outline-none'}, format='%Y-%m-%dT%H:%M')
+    )
+    start_template = TemplateChoiceField(
+        queryset=LessonTemplate.objects.order_by('title'),
+        required=False,
+        label="Template at Start",
+        empty_label="Keep current challenges",
+        widget=forms.Select(attrs={'class': 'w-full bg-[#13141b] border border-[#2c2f3b] rounded p-2 text-white focus:border-[#9fef00] outline-none'})
+    )
 
     class Meta:
         model = LessonSettings
         fields = []
 
+class LessonForm(forms.ModelForm):
+    challenges = forms.ModelMultipleChoiceField(
+        # Only used to validate the submitted ids; the picker loads challenges through the search API
+        queryset=Challenge.objects.all(),
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'accent-[#9fef00]'}),
+        required=False,
+        label="Lesson Challenges"
+    )
+
+    class Meta:
+        model = LessonSettings
+        fields = ['title', 'challenges']
+        widgets = {
+            'title': forms.TextInput(attrs={'class': 'w-full bg-[#1a1c23] border border-[#2c2f3b] rounded p-2 text-white focus:border-[#9fef00] focus:outline-none'}),
+        }
+
+    def save(self, commit=True):
+        # Picking no challenges here opens every active one again
+        self.instance.own_catalog = bool(self.cleaned_data['challenges'])
+        return super().save(commit)
+
 class LessonTemplateForm(forms.ModelForm):
     challenges = forms.ModelMultipleChoiceField(
-        queryset=Challenge.objects.all().order_by('category__name', 'points'),
+        # Only used to validate the submitted ids; the picker loads challenges through the search API
+        queryset=Challenge.objects.all(),
         widget=forms.CheckboxSelectMultiple(attrs={'class': 'accent-[#9fef00]'}),
         required=False,
         label="Select Challenges"
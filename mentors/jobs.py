@@ -0,0 +1,273 @@
+"""
+Background jobs without a broker.
+
+A job is a mentors.Job row. `enqueue` stores one and, with
+JOBS_IN_PROCESS, wakes a small thread pool in the current process;
+`manage.py run_jobs` is a dedicated worker. Both can run at once: a job
+is claimed with a conditional UPDATE, so it runs exactly once.
+
+Export handlers declare a fingerprint, the rows their artifact is built
+from. Artifacts are stored under the sha256 of those rows, so an export
+whose inputs did not change is finished at enqueue time.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from config import metrics
+from config.cache import SCOREBOARD, bump_version
+from pages.events import replay
+from pages.models import Challenge, SubmissionEvent
+from . import exports, seasons
+from .models import Job, LessonSettings
+
+logger = logging.getLogger('hacklabs.jobs')
+
+HANDLERS = {}
+
+
+class Handler:
+    def __init__(self, kind, label, run, fingerprint=None, filename=None):
+        self.kind = kind
+        self.label = label
+        self.run = run
+        self.fingerprint = fingerprint
+        self.filename = filename
+
+    @property
+    def has_artifact(self):
+        return self.fingerprint is not None
+
+
+def register(kind, label, fingerprint=None, filename=None):
+    """
+    Registers a job handler. Plain handlers are called as `run(params)`;
+    handlers with a `fingerprint(params)` (an iterable of rows) produce an
+    artifact and are called as `run(params, fileobj)`. `filename(params)`
+    is the download name. Handlers return a short message for the UI.
+    """
+    def decorator(run):
+        HANDLERS[kind] = Handler(kind, label, run, fingerprint, filename)
+        return run
+    return decorator
+
+
+def artifact_path(name):
+    return os.path.join(settings.JOB_ARTIFACT_DIR, name)
+
+
+def _digest(kind, params, rows):
+    digest = hashlib.sha256(json.dumps([kind, params], sort_keys=True).encode())
+    for row in rows:
+        digest.update(repr(row).encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def _artifact_name(job):
+    return job.fingerprint + os.path.splitext(job.filename)[1]
+
+
+def enqueue(kind, params=None, user=None):
+    """
+    Creates a job. If its artifact already exists the job is returned
+    finished; otherwise it is queued and the in-process pool is woken
+    once the surrounding transaction commits.
+    """
+    handler = HANDLERS[kind]
+    job = Job(kind=kind, params=params or {}, created_by=user)
+    if handler.has_artifact:
+        job.filename = handler.filename(job.params)
+        job.fingerprint = _digest(kind, job.params, handler.fingerprint(job.params))
+        name = _artifact_name(job)
+        if os.path.exists(artifact_path(name)):
+            job.status = Job.DONE
+            job.cached = True
+            job.artifact = name
+            job.started_at = job.finished_at = timezone.now()
+            metrics.inc('hacklabs_jobs_total', kind=kind, status='cached')
+    job.save()
+
+    if job.status == Job.QUEUED and settings.JOBS_IN_PROCESS:
+        transaction.on_commit(_wake)
+    return job
+
+
+def claim():
+    """Marks the oldest queued job running and returns it, or None."""
+    queued = Job.objects.filter(status=Job.QUEUED).order_by('created_at', 'id').values_list('pk', flat=True)
+    for pk in queued[:10]:
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(status=Job.RUNNING, started_at=timezone.now()):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def _write_artifact(handler, job):
+    """Runs an artifact handler into a temp file, then moves it into place."""
+    name = _artifact_name(job)
+    path = artifact_path(name)
+    if os.path.exists(path):
+        job.cached = True
+        return name, ''
+
+    os.makedirs(settings.JOB_ARTIFACT_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=settings.JOB_ARTIFACT_DIR, prefix='.job-')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            message = handler.run(job.params, fh)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return name, message
+
+
+def execute(job):
+    """Runs a claimed job and records the outcome on it."""
+    started = time.perf_counter()
+    try:
+        handler = HANDLERS[job.kind]
+        if handler.has_artifact:
+            job.artifact, message = _write_artifact(handler, job)
+        else:
+            message = handler.run(job.params)
+        job.message = (message or '')[:255]
+        job.status = Job.DONE
+    except Exception:
+        logger.exception('Job %s failed', job)
+        job.status = Job.FAILED
+        job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'artifact', 'cached', 'message', 'error', 'finished_at'])
+
+    metrics.inc('hacklabs_jobs_total', kind=job.kind, status=job.status)
+    metrics.observe('hacklabs_job_seconds', time.perf_counter() - started, kind=job.kind)
+    return job
+
+
+def run_pending():
+    """Runs queued jobs until none are left. Returns how many ran."""
+    count = 0
+    while (job := claim()) is not None:
+        execute(job)
+        count += 1
+    return count
+
+
+def fail_stale(older_than=None):
+    """Fails jobs left running by a worker that went away."""
+    older_than = older_than or timedelta(seconds=settings.JOB_STALE_AFTER)
+    return Job.objects.filter(status=Job.RUNNING, started_at__lt=timezone.now() - older_than).update(
+        status=Job.FAILED, finished_at=timezone.now(), error='The worker stopped before the job finished.')
+
+
+def prune(days):
+    """Deletes finished jobs older than `days` and artifacts no job refers to."""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], created_at__lt=cutoff).delete()
+
+    removed = 0
+    if os.path.isdir(settings.JOB_ARTIFACT_DIR):
+        referenced = set(Job.objects.exclude(artifact='').values_list('artifact', flat=True))
+        for name in os.listdir(settings.JOB_ARTIFACT_DIR):
+            if name not in referenced and not name.startswith('.'):
+                os.unlink(artifact_path(name))
+                removed += 1
+    return deleted, removed
+
+
+# --- In-process pool ---
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _drain():
+    try:
+        # No `run_jobs` process sweeps up after a crashed in-process worker
+        fail_stale()
+        run_pending()
+    except Exception:
+        logger.exception('Job pool crashed')
+    finally:
+        connection.close()
+
+
+def _wake():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=settings.JOBS_THREADS, thread_name_prefix='hacklabs-job')
+    _pool.submit(_drain)
+
+
+# --- Handlers ---
+
+def _stamp():
+    return timezone.localtime().strftime('%Y-%m-%d_%H-%M')
+
+
+def _catalog_rows(params):
+    return exports.active_challenges().values_list('id', 'title', 'category__name', 'description', 'flag', 'points')
+
+
+def _report_lesson(params):
+    # Jobs queued before exports were per lesson cover every student
+    return LessonSettings.objects.filter(pk=params['lesson']).first() if params.get('lesson') else None
+
+
+def _results_rows(params):
+    """Everything the result exports read: the event log head, the lesson's students and the catalog."""
+    lesson = _report_lesson(params)
+    events = SubmissionEvent.objects.aggregate(count=Count('id'), last=Max('id'))
+    yield settings.TIME_ZONE
+    yield events['count'], events['last']
+    yield from exports.lesson_students(lesson).order_by('id').values_list('id', 'username').iterator(
+        chunk_size=exports.CHUNK_SIZE)
+    yield from Challenge.objects.order_by('id').values_list('id', 'title', 'points', 'is_active', 'category__name')
+    if lesson is not None:
+        yield lesson.own_catalog, list(lesson.challenges.order_by('id').values_list('id', flat=True))
+
+
+@register('export_docx', 'Challenges (DOCX)', fingerprint=_catalog_rows,
+          filename=lambda params: f"challenges_export_{_stamp()}.docx")
+def export_docx(params, fileobj):
+    challenges = list(exports.active_challenges())
+    exports.write_challenges_docx(challenges, fileobj)
+    return f'{len(challenges)} challenges'
+
+
+@register('export_report', 'Results export', fingerprint=_results_rows,
+          filename=lambda params: f"hacklabs_{params['report']}_{_stamp()}.{params['fmt']}")
+def export_report(params, fileobj):
+    lesson = _report_lesson(params)
+    rows = exports.ranking_rows(lesson) if params['report'] == 'ranking' else exports.matrix_rows(lesson)
+    for chunk in exports.WRITERS[params['fmt']](rows):
+        fileobj.write(chunk)
+    return f"{params['report']} as {params['fmt']}"
+
+
+@register('reset_platform', 'Platform reset')
+def reset_platform(params):
+    season, deleted_count = seasons.reset(params.get('label'))
+    return f'Archived "{season.label}" and removed {deleted_count} users and all progress.'
+
+
+@register('rebuild_projections', 'Rebuild projections')
+def rebuild_projections(params):
+    events, seconds = replay()
+    bump_version(SCOREBOARD)
+    return f'Replayed {events} events in {seconds:.1f}s.'
@@ -0,0 +1,95 @@
+"""
+Lessons (classrooms) sharing one instance.
+
+Every student belongs to one lesson through LessonMembership; the lesson
+decides their timer, their open challenges, whose solves they see, the
+scoreboard they are ranked on and the broadcasts they receive. Mentors
+see every lesson and pick the one they work in, kept in the session.
+Students without a membership (created in the admin, before lessons
+existed) are enrolled into the default lesson the first time it is needed.
+
+Submission activity is recorded per lesson. Scores (UserScore,
+ScoreTimeline) are per user, though: a student who moves to another
+lesson brings their points along onto its scoreboard.
+"""
+from django.core.cache import caches
+from django.db import transaction
+
+from users.models import User
+from .models import LessonMembership, LessonSettings
+
+SESSION_KEY = 'mentor_lesson_id'
+
+BROADCAST_LIMIT = 20
+BROADCAST_TIMEOUT = 120
+
+
+def default_lesson():
+    return LessonSettings.get_settings()
+
+
+def is_mentor(user):
+    return user.is_superuser or user.groups.filter(name='Mentors').exists()
+
+
+def enroll(user, lesson):
+    """Moves `user` into `lesson`, leaving any other lesson."""
+    with transaction.atomic():
+        LessonMembership.objects.filter(user=user).exclude(lesson=lesson).delete()
+        LessonMembership.objects.get_or_create(user=user, lesson=lesson)
+    user._lesson = lesson
+
+
+def lesson_for(user):
+    """The lesson `user` studies in (the default one for anonymous users and mentors)."""
+    if hasattr(user, '_lesson'):
+        return user._lesson
+    lesson = None
+    if user.is_authenticated:
+        membership = LessonMembership.objects.select_related('lesson').filter(user=user).first()
+        if membership is not None:
+            lesson = membership.lesson
+        elif not is_mentor(user):
+            enroll(user, default_lesson())
+            return user._lesson
+    lesson = lesson or default_lesson()
+    user._lesson = lesson
+    return lesson
+
+
+def current_lesson(request):
+    """The lesson a request works in: the one a mentor picked, otherwise the user's own."""
+    user = request.user
+    if user.is_authenticated and is_mentor(user):
+        pk = request.session.get(SESSION_KEY)
+        lesson = LessonSettings.objects.filter(pk=pk).first() if pk else None
+        return lesson or default_lesson()
+    return lesson_for(user)
+
+
+def select(request, lesson):
+    """Makes `lesson` the mentor's working lesson."""
+    request.session[SESSION_KEY] = lesson.pk
+
+
+def members(lesson):
+    """Students enrolled in `lesson`, through the (lesson, user) membership index."""
+    return User.objects.filter(lesson_memberships__lesson=lesson)
+
+
+def _broadcasts_key(lesson):
+    return f'hacklabs_broadcasts_{lesson.pk}'
+
+
+def broadcasts(lesson):
+    """Recent broadcasts of `lesson`; clients poll them and skip ids they have seen."""
+    return caches['shared'].get(_broadcasts_key(lesson), [])
+
+
+def broadcast(lesson, message):
+    """Adds `message` (a dict with a unique 'id') to the lesson's broadcasts."""
+    cache = caches['shared']
+    key = _broadcasts_key(lesson)
+    items = cache.get(key, [])
+    items.append(message)
+    cache.set(key, items[-BROADCAST_LIMIT:], timeout=BROADCAST_TIMEOUT)
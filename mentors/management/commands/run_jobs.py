@@ -0,0 +1,61 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from mentors import jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (exports, resets, rebuilds) in a thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, help='Worker threads (default: JOBS_THREADS)')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds between queue checks when idle')
+        parser.add_argument('--once', action='store_true', help='Run what is queued and exit')
+        parser.add_argument('--prune', type=int, metavar='DAYS',
+                            help='Delete finished jobs older than DAYS and unreferenced artifacts, then exit')
+
+    def handle(self, *args, **options):
+        if options['prune'] is not None:
+            deleted, removed = jobs.prune(options['prune'])
+            self.stdout.write(f'Deleted {deleted} jobs and {removed} artifacts.')
+            return
+
+        stale = jobs.fail_stale()
+        if stale:
+            self.stdout.write(self.style.WARNING(f'Marked {stale} abandoned jobs as failed.'))
+
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self._work, args=(stop, options['poll'], options['once']), daemon=True)
+            for _ in range(options['threads'] or settings.JOBS_THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            self.stdout.write('Stopping after the running jobs finish...')
+            for thread in threads:
+                thread.join()
+
+    def _work(self, stop, poll, once):
+        try:
+            while not stop.is_set():
+                job = jobs.claim()
+                if job is None:
+                    if once:
+                        return
+                    stop.wait(poll)
+                    continue
+                started = time.perf_counter()
+                jobs.execute(job)
+                self.stdout.write(f'{job} in {time.perf_counter() - started:.2f}s {job.message}')
+        finally:
+            connection.close()
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from mentors import schedule
+
+
+class Command(BaseCommand):
+    help = 'Fires lesson state transitions (start, end, hard deadline) at their scheduled times'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=float, default=30.0,
+                            help='Longest sleep, so timers set by other processes are noticed')
+        parser.add_argument('--once', action='store_true', help='Fire what is due and exit')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                fired = schedule.run_due()
+                if fired:
+                    self.stdout.write(f'{timezone.localtime():%H:%M:%S} fired {fired} transition(s)')
+                if options['once']:
+                    return
+                when = schedule.next_due()
+                delay = options['poll']
+                if when is not None:
+                    delay = min(max((when - timezone.now()).total_seconds(), 0), delay)
+                time.sleep(delay)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
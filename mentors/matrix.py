@@ -0,0 +1,83 @@
+"""
+Class-wide user x challenge state matrix.
+
+One grouped query over the submission log yields (user_id, challenge_id,
+state) triples. They are packed 2 bits per cell (4 cells per byte) into
+one row per user and shipped base64-encoded, so a 500 x 200 class is a
+~25 KB payload instead of 100k JSON objects.
+"""
+import base64
+
+from django.db.models import Case, F, IntegerField, Max, Value, When
+
+from config.cache import CATALOG, SCOREBOARD, get_or_compute, get_version, versioned_key
+from pages.models import Challenge, SubmissionEvent
+from pages.scoreboard import students
+
+# Cell states, a higher value wins when several apply
+NONE = 0
+ATTEMPTED = 1
+LOCKED = 2
+SOLVED = 3
+
+CELLS_PER_BYTE = 4
+
+# Wrong attempts don't bump the scoreboard version, so don't keep it long
+CACHE_TIMEOUT = 15
+
+
+def _cell_states():
+    return SubmissionEvent.objects.order_by().values_list('user_id', 'challenge_id').annotate(
+        state=Max(Case(
+            When(kind=SubmissionEvent.CORRECT, then=Value(SOLVED)),
+            When(kind=SubmissionEvent.LOCKOUT, then=Value(LOCKED)),
+            default=Value(ATTEMPTED),
+            output_field=IntegerField(),
+        ))
+    )
+
+
+def build_matrix():
+    users = list(students().order_by(F('score_total__points').desc(nulls_last=True), 'username').values_list(
+        'id', 'username'))
+    challenges = list(Challenge.objects.order_by('category__name', 'id').values_list(
+        'id', 'title', 'category__name', 'is_active'))
+
+    row_bytes = (len(challenges) + CELLS_PER_BYTE - 1) // CELLS_PER_BYTE
+    cells = bytearray(row_bytes * len(users))
+    user_row = {user_id: i * row_bytes for i, (user_id, _) in enumerate(users)}
+    column = {challenge[0]: i for i, challenge in enumerate(challenges)}
+
+    for user_id, challenge_id, state in _cell_states().iterator(chunk_size=10000):
+        row = user_row.get(user_id)
+        if row is None:
+            # Mentors and staff
+            continue
+        col = column[challenge_id]
+        cells[row + col // CELLS_PER_BYTE] |= state << (2 * (col % CELLS_PER_BYTE))
+
+    return {
+        'users': users,
+        'challenges': challenges,
+        'row_bytes': row_bytes,
+        'cells': base64.b64encode(bytes(cells)).decode('ascii'),
+    }
+
+
+def cached_matrix():
+    # Challenge titles and is_active come from the catalog
+    key = versioned_key(SCOREBOARD, 'matrix', f'c{get_version(CATALOG)}')
+    return get_or_compute(key, build_matrix, timeout=CACHE_TIMEOUT)
+
+
+def unpack(matrix):
+    """Decodes a payload back to {(user_id, challenge_id): state}, for scripts and debugging."""
+    cells = base64.b64decode(matrix['cells'])
+    states = {}
+    for i, (user_id, _) in enumerate(matrix['users']):
+        row = i * matrix['row_bytes']
+        for col, challenge in enumerate(matrix['challenges']):
+            state = (cells[row + col // CELLS_PER_BYTE] >> (2 * (col % CELLS_PER_BYTE))) & 3
+            if state:
+                states[(user_id, challenge[0])] = state
+    return states
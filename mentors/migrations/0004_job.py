@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0003_lessontemplate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=32)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('fingerprint', models.CharField(blank=True, help_text='sha256 of the inputs', max_length=64)),
+                ('artifact', models.CharField(blank=True, help_text='File name under JOB_ARTIFACT_DIR', max_length=100)),
+                ('filename', models.CharField(blank=True, help_text='Download name', max_length=200)),
+                ('cached', models.BooleanField(default=False, help_text='The artifact already existed')),
+                ('message', models.CharField(blank=True, max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='mentors_job_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0004_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Season',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, help_text='Lesson start time at the reset', null=True)),
+                ('users', models.PositiveIntegerField(default=0)),
+                ('solves', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('winner', models.CharField(blank=True, max_length=150)),
+                ('top_points', models.IntegerField(default=0)),
+                ('archive', models.CharField(help_text='File name under SEASON_ARCHIVE_DIR', max_length=100)),
+                ('size', models.PositiveBigIntegerField(default=0, help_text='Archive size in bytes')),
+                ('sha256', models.CharField(max_length=64)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:12
+
+import django.db.models.deletion
+import django.utils.timezone
+import mentors.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0005_season'),
+        ('pages', '0020_team_scores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='lessonsettings',
+            options={'ordering': ['pk']},
+        ),
+        migrations.AddField(
+            model_name='lessonsettings',
+            name='challenges',
+            field=models.ManyToManyField(blank=True, help_text='Limit the lesson to these challenges (empty = every active one)', related_name='lessons', to='pages.challenge'),
+        ),
+        migrations.AddField(
+            model_name='lessonsettings',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='lessonsettings',
+            name='join_code',
+            field=models.CharField(default=mentors.models._join_code, max_length=16, unique=True),
+        ),
+        migrations.AddField(
+            model_name='lessonsettings',
+            name='title',
+            field=models.CharField(default='Main lesson', max_length=100, verbose_name='Lesson Title'),
+        ),
+        migrations.CreateModel(
+            name='LessonMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='mentors.lessonsettings')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lesson_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'lesson'], name='mentors_membership_user_idx')],
+                'unique_together': {('lesson', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:12
+
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    """Everyone who was a student so far studies in the default lesson."""
+    LessonSettings = apps.get_model('mentors', 'LessonSettings')
+    LessonMembership = apps.get_model('mentors', 'LessonMembership')
+    User = apps.get_model('users', 'User')
+
+    lesson, _ = LessonSettings.objects.get_or_create(pk=1)
+    students = User.objects.filter(is_superuser=False).exclude(groups__name='Mentors').values_list('pk', flat=True)
+    LessonMembership.objects.bulk_create(
+        (LessonMembership(lesson=lesson, user_id=pk) for pk in students.iterator(chunk_size=2000)),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0006_lessons'),
+        ('users', '0003_team_user_team'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
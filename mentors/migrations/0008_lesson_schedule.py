@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0007_backfill_lesson_memberships'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonsettings',
+            name='start_template',
+            field=models.ForeignKey(blank=True, help_text='Applied to the lesson when it starts', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mentors.lessontemplate'),
+        ),
+        migrations.AddField(
+            model_name='lessonsettings',
+            name='state',
+            field=models.CharField(default='idle', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='lessonsettings',
+            name='state_until',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:15
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill(apps, schema_editor):
+    """Puts lessons with a running timer into their current phase (same rules as schedule.evaluate)."""
+    LessonSettings = apps.get_model('mentors', 'LessonSettings')
+    now = timezone.now()
+    for lesson in LessonSettings.objects.exclude(start_time=None, end_time=None):
+        hard = lesson.hard_deadline or lesson.end_time
+        if lesson.start_time is not None and now < lesson.start_time:
+            lesson.state, lesson.state_until = 'scheduled', lesson.start_time
+        elif lesson.end_time is None:
+            lesson.state, lesson.state_until = 'running', None
+        elif now < lesson.end_time:
+            lesson.state, lesson.state_until = 'running', lesson.end_time
+        elif now < hard:
+            lesson.state, lesson.state_until = 'overtime', hard
+        else:
+            lesson.state, lesson.state_until = 'closed', None
+        lesson.save(update_fields=['state', 'state_until'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0008_lesson_schedule'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
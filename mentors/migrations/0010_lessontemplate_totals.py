@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0009_backfill_lesson_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessontemplate',
+            name='task_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lessontemplate',
+            name='total_points',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:19
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill(apps, schema_editor):
+    """Stores every template's current task count and point total."""
+    LessonTemplate = apps.get_model('mentors', 'LessonTemplate')
+    for template in LessonTemplate.objects.annotate(n=Count('challenges'), points=Sum('challenges__points')):
+        LessonTemplate.objects.filter(pk=template.pk).update(task_count=template.n, total_points=template.points or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0010_lessontemplate_totals'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0011_backfill_lessontemplate_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonsettings',
+            name='own_catalog',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:48
+
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    """Lessons that already limit their challenges keep their own set."""
+    LessonSettings = apps.get_model('mentors', 'LessonSettings')
+    LessonSettings.objects.filter(challenges__isnull=False).update(own_catalog=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0012_lessonsettings_own_catalog'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,6 @@
+import secrets
+
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 from pages.models import Challenge
@@ -9,38 +12,64 @@ class LessonTemplate(models.Model):
     challenges = models.ManyToManyField(Challenge, related_name='templates', verbose_name="Challenges")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Stored totals of `challenges`, kept current by mentors/totals.py
+    task_count = models.PositiveIntegerField(default=0, editable=False)
+    total_points = models.IntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
 
     @property
     def challenges_count(self):
-        return self.challenges.count()
+        return self.task_count
+
+def _join_code():
+    return secrets.token_hex(4)
 
-    @property
-    def total_points(self):
-        return self.challenges.aggregate(total=models.Sum('points'))['total'] or 0
 
 class LessonSettings(models.Model):
     """
-    Global settings for the current lesson/session.
-    Usually implies only one record exists.
+    One lesson (classroom): its timer, join code and, optionally, its own
+    set of challenges. Students belong to a lesson through LessonMembership;
+    pk=1 is the default lesson (see mentors/lessons.py).
     """
+    DEFAULT_PK = 1
+
+    title = models.CharField(max_length=100, default='Main lesson', verbose_name="Lesson Title")
+    join_code = models.CharField(max_length=16, unique=True, default=_join_code)
+    challenges = models.ManyToManyField(Challenge, blank=True, related_name='lessons',
+                                        help_text="Limit the lesson to these challenges (empty = every active one)")
+    # Set once the lesson keeps its own challenge set, which may then be empty (a lockdown)
+    own_catalog = models.BooleanField(default=False, editable=False)
+    created_at = models.DateTimeField(default=timezone.now)
     start_time = models.DateTimeField(null=True, blank=True, help_text="Time when the lesson started")
     end_time = models.DateTimeField(null=True, blank=True, help_text="Time when the main lesson ends")
     hard_deadline = models.DateTimeField(null=True, blank=True, help_text="Final blocking time (including delay)")
+    start_template = models.ForeignKey(LessonTemplate, on_delete=models.SET_NULL, null=True, blank=True,
+                                       related_name='+', help_text="Applied to the lesson when it starts")
+    # Maintained by mentors/schedule.py: the current phase and when the next one begins
+    state = models.CharField(max_length=10, default='idle')
+    state_until = models.DateTimeField(null=True, blank=True, db_index=True)
 
-    def save(self, *args, **kwargs):
-        # Ensure only one instance exists
-        if not self.pk and LessonSettings.objects.exists():
-            self.pk = LessonSettings.objects.first().pk
-        super(LessonSettings, self).save(*args, **kwargs)
+    class Meta:
+        ordering = ['pk']
+
+    def __str__(self):
+        return self.title
 
     @classmethod
     def get_settings(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
+        """The default lesson."""
+        obj, created = cls.objects.get_or_create(pk=cls.DEFAULT_PK)
         return obj
 
+    def open_challenges(self):
+        """Active challenges, narrowed to the lesson's own set if it has one."""
+        challenges = Challenge.objects.filter(is_active=True)
+        if self.own_catalog:
+            challenges = challenges.filter(lessons=self)
+        return challenges
+
     def is_lesson_active(self):
         if not self.end_time:
             return True  # If timer is not set, lesson is active
@@ -51,4 +80,94 @@ class LessonSettings(models.Model):
             # If hard_deadline is not set, rely on end_time
             # If end_time is also not set, then no deadline
             return False if not self.end_time else timezone.now() > self.end_time
-        return timezone.now() > self.hard_deadline
\ No newline at end of file
+        return timezone.now() > self.hard_deadline
+
+
+class LessonMembership(models.Model):
+    """A student's lesson. Students are in one lesson at a time (mentors/lessons.py:enroll)."""
+    lesson = models.ForeignKey(LessonSettings, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='lesson_memberships')
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('lesson', 'user')
+        indexes = [models.Index(fields=['user', 'lesson'], name='mentors_membership_user_idx')]
+
+    def __str__(self):
+        return f"{self.user_id} in {self.lesson_id}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work (see mentors/jobs.py). Exports leave an
+    artifact file named after the fingerprint of their inputs.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=32)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    fingerprint = models.CharField(max_length=64, blank=True, help_text="sha256 of the inputs")
+    artifact = models.CharField(max_length=100, blank=True, help_text="File name under JOB_ARTIFACT_DIR")
+    filename = models.CharField(max_length=200, blank=True, help_text="Download name")
+    cached = models.BooleanField(default=False, help_text="The artifact already existed")
+    message = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='mentors_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    @property
+    def duration(self):
+        if self.started_at and self.finished_at:
+            return self.finished_at - self.started_at
+        return None
+
+
+class Season(models.Model):
+    """
+    A finished season archived by the platform reset (mentors/seasons.py).
+    The rows live in a gzipped JSON file under SEASON_ARCHIVE_DIR.
+    """
+    label = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, help_text="Lesson start time at the reset")
+    users = models.PositiveIntegerField(default=0)
+    solves = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    winner = models.CharField(max_length=150, blank=True)
+    top_points = models.IntegerField(default=0)
+    archive = models.CharField(max_length=100, help_text="File name under SEASON_ARCHIVE_DIR")
+    size = models.PositiveBigIntegerField(default=0, help_text="Archive size in bytes")
+    sha256 = models.CharField(max_length=64)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.label
@@ -0,0 +1,201 @@
+"""
+Scheduled lesson state transitions.
+
+A lesson moves through idle -> scheduled -> running -> overtime -> closed
+at its start_time, end_time and hard_deadline. The current phase is kept
+on LessonSettings.state with `state_until`, the moment of the next
+change, so requests read a column of the row they already loaded instead
+of comparing deadlines.
+
+`fire` makes a transition with a conditional UPDATE: whichever process
+gets there first applies the lesson's start template (also when a missed
+start takes the lesson straight to overtime or closed) and emits the one
+lesson event clients receive through their message poll; the others
+update zero rows. `manage.py run_scheduler` sleeps until the next
+transition; with SCHEDULER_IN_PROCESS the web process also arms a timer
+thread on its first request and whenever a timer is set. If neither
+runs, `state()` fires an overdue transition on the next request, which
+the message poll of every open page makes within seconds.
+"""
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from config import metrics
+from . import activation, lessons
+from .models import LessonSettings
+
+logger = logging.getLogger('hacklabs.schedule')
+
+IDLE = 'idle'
+SCHEDULED = 'scheduled'
+RUNNING = 'running'
+OVERTIME = 'overtime'
+CLOSED = 'closed'
+
+# States in which flags are accepted
+OPEN_STATES = (IDLE, RUNNING, OVERTIME)
+
+# Leaving these for one of those is the lesson's start
+NOT_STARTED_STATES = (IDLE, SCHEDULED)
+STARTED_STATES = (RUNNING, OVERTIME, CLOSED)
+
+
+def evaluate(lesson, now=None):
+    """(state, until) of `lesson` at `now` from its timer fields alone."""
+    now = now or timezone.now()
+    # A hard deadline closes the lesson whichever other fields are set
+    hard = lesson.hard_deadline or lesson.end_time
+    if hard is not None and now >= hard:
+        return CLOSED, None
+    if lesson.start_time is None and lesson.end_time is None:
+        return IDLE, hard
+    if lesson.start_time is not None and now < lesson.start_time:
+        return SCHEDULED, lesson.start_time
+    if lesson.end_time is None:
+        return RUNNING, hard
+    if now < lesson.end_time:
+        return RUNNING, lesson.end_time
+    return OVERTIME, hard
+
+
+def status(lesson):
+    """The lesson event payload, also returned by lesson_status_api."""
+    return {
+        'state': lesson.state,
+        'is_hard_deadline': lesson.state == CLOSED,
+        'hard_deadline': lesson.hard_deadline.isoformat() if lesson.hard_deadline else None,
+        'soft_deadline': lesson.end_time.isoformat() if lesson.end_time else None,
+        'start_time': lesson.start_time.isoformat() if lesson.start_time else None,
+    }
+
+
+MESSAGES = {
+    IDLE: 'The lesson timer was removed.',
+    SCHEDULED: 'The lesson is scheduled.',
+    RUNNING: 'The lesson has started!',
+    OVERTIME: 'Main time is over: overtime until the hard deadline.',
+    CLOSED: 'Lesson time is over! Submissions closed.',
+}
+
+
+def _emit(lesson, text=None):
+    lessons.broadcast(lesson, dict(
+        status(lesson),
+        id=str(uuid.uuid4()),
+        type='lesson',
+        text=text or MESSAGES[lesson.state],
+        timestamp=timezone.now().timestamp(),
+    ))
+
+
+def apply_template(template, lesson):
+    """Opens exactly the template's challenges in `lesson`."""
+    activation.apply(activation.plan(template, activation.EXCLUSIVE, lesson))
+
+
+def fire(lesson, now=None):
+    """
+    Moves `lesson` to its state at `now`. Returns True if this call made
+    the transition (and so applied the start template and emitted the event).
+    """
+    new, until = evaluate(lesson, now)
+    with transaction.atomic():
+        rows = LessonSettings.objects.filter(pk=lesson.pk)
+        # A missed start (scheduled straight to overtime or closed) still opens the template
+        started = new in STARTED_STATES and rows.filter(state__in=NOT_STARTED_STATES).update(
+            state=new, state_until=until)
+        won = started or rows.exclude(state=new).update(state=new, state_until=until)
+        rows.filter(state=new).update(state_until=until)
+        lesson.state, lesson.state_until = new, until
+        if started and lesson.start_template_id:
+            apply_template(lesson.start_template, lesson)
+            LessonSettings.objects.filter(pk=lesson.pk).update(start_template=None)
+            lesson.start_template = None
+    if won:
+        _emit(lesson)
+        metrics.inc('hacklabs_lesson_transitions_total', state=new)
+    return bool(won)
+
+
+def state(lesson):
+    """The lesson's state, firing a transition that is overdue."""
+    if lesson.state_until is not None and lesson.state_until <= timezone.now():
+        fire(lesson)
+    return lesson.state
+
+
+def changed(lesson, text):
+    """
+    Call after a mentor edits the timer: re-evaluates the state, tells
+    clients about the new deadlines and re-arms the in-process timer.
+    """
+    if not fire(lesson):
+        _emit(lesson, text)
+    transaction.on_commit(wake)
+
+
+def next_due():
+    return LessonSettings.objects.aggregate(next=Min('state_until'))['next']
+
+
+def run_due(now=None):
+    """Fires every transition that is due. Returns how many this process made."""
+    now = now or timezone.now()
+    return sum(fire(lesson, now) for lesson in LessonSettings.objects.filter(
+        state_until__lte=now).select_related('start_template'))
+
+
+# --- In-process timer ---
+
+_timer = None
+_timer_lock = threading.Lock()
+
+WAKE_UID = 'hacklabs-schedule-wake'
+
+
+def _tick():
+    try:
+        run_due()
+        wake()
+    except Exception:
+        # Not re-armed: the next request or run_scheduler picks the transition up
+        logger.exception('Scheduled lesson transition failed')
+    finally:
+        connection.close()
+
+
+def wake_on_first_request(**kwargs):
+    """
+    request_started receiver (see MentorsConfig.ready): arms the timer once
+    per process, so transitions set before a restart still fire on time.
+    """
+    request_started.disconnect(dispatch_uid=WAKE_UID)
+    try:
+        wake()
+    except DatabaseError:
+        # Not migrated yet: the first timer a mentor sets arms it
+        logger.exception('Could not arm the lesson timer')
+
+
+def wake():
+    """(Re)arms this process's timer thread for the next transition."""
+    global _timer
+    if not settings.SCHEDULER_IN_PROCESS:
+        return
+    with _timer_lock:
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+        when = next_due()
+        if when is None:
+            return
+        _timer = threading.Timer(max((when - timezone.now()).total_seconds(), 0), _tick)
+        _timer.daemon = True
+        _timer.start()
@@ -0,0 +1,163 @@
+"""
+Season archive and the fast platform reset.
+
+`reset` first writes the season (scores, solves, per-challenge attempt
+summaries) to a gzipped JSON file, reading everything with server-side
+cursors. Then it empties the hot tables with the backend's flush SQL
+(TRUNCATE on PostgreSQL/MySQL, a bare DELETE that SQLite truncates) and
+removes student accounts in small batches, each in its own transaction.
+No step holds a lock for long, and the cost barely grows with the class.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+
+from config.cache import SCOREBOARD, bump_version
+from pages.events import log_models
+from pages.models import Attempt, Challenge, Solve
+from users.models import Team, User
+from .models import LessonSettings, Season
+
+CHUNK_SIZE = 5000
+DELETE_BATCH = 500
+
+
+def resettable_users():
+    return User.objects.filter(is_superuser=False, is_staff=False).exclude(groups__name='Mentors')
+
+
+def archive_path(name):
+    return os.path.join(settings.SEASON_ARCHIVE_DIR, name)
+
+
+def _write_array(fh, key, rows):
+    """Writes `,"key": [row, ...]` one row at a time. Returns the row count."""
+    fh.write(',' + json.dumps(key) + ':[')
+    count = 0
+    for row in rows:
+        fh.write((',' if count else '') + json.dumps(row, cls=DjangoJSONEncoder))
+        count += 1
+    fh.write(']')
+    return count
+
+
+def _season_rows():
+    users = resettable_users().annotate(
+        points=F('score_total__points'), solved=F('score_total__solves'),
+        attempts=F('score_total__attempts'), wrong_attempts=F('score_total__wrong_attempts'),
+        last_solve_at=F('score_total__last_solve_at'), team_name=F('team__name'),
+    ).order_by(F('points').desc(nulls_last=True), 'id').values(
+        'id', 'username', 'email', 'date_joined', 'team_name', 'points', 'solved', 'attempts', 'wrong_attempts',
+        'last_solve_at')
+    solves = Solve.objects.order_by('date', 'id').values_list('user_id', 'challenge_id', 'date')
+    attempts = Attempt.objects.order_by().values_list('user_id', 'challenge_id').annotate(
+        total=Count('id'), wrong=Count('id', filter=Q(is_correct=False)),
+        first=Min('timestamp'), last=Max('timestamp'))
+    challenges = Challenge.objects.order_by('id').values_list('id', 'title', 'category__name', 'points')
+    return {
+        'challenges': challenges.iterator(chunk_size=CHUNK_SIZE),
+        'users': users.iterator(chunk_size=CHUNK_SIZE),
+        'solves': solves.iterator(chunk_size=CHUNK_SIZE),
+        'attempts': attempts.iterator(chunk_size=CHUNK_SIZE),
+    }
+
+
+def archive_season(label=None):
+    """Writes the current season to SEASON_ARCHIVE_DIR and returns its Season row."""
+    now = timezone.now()
+    label = label or f"Season {timezone.localtime(now):%Y-%m-%d %H:%M}"
+    lesson_settings = LessonSettings.get_settings()
+    attempts = Attempt.objects.count()
+    leader = resettable_users().filter(score_total__points__gt=0).order_by(
+        '-score_total__points', 'score_total__last_solve_at').values_list('username', 'score_total__points').first()
+
+    os.makedirs(settings.SEASON_ARCHIVE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=settings.SEASON_ARCHIVE_DIR, prefix='.season-')
+    counts = {}
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', compresslevel=6, encoding='utf-8') as fh:
+            fh.write('{"season":' + json.dumps({
+                'label': label,
+                'archived_at': now,
+                'start_time': lesson_settings.start_time,
+                'end_time': lesson_settings.end_time,
+            }, cls=DjangoJSONEncoder))
+            for key, rows in _season_rows().items():
+                counts[key] = _write_array(fh, key, rows)
+            fh.write('}')
+        digest = hashlib.sha256()
+        with open(tmp, 'rb') as fh:
+            for block in iter(lambda: fh.read(1 << 20), b''):
+                digest.update(block)
+        digest = digest.hexdigest()
+        name = f"season_{timezone.localtime(now):%Y%m%d_%H%M%S}_{digest[:12]}.json.gz"
+        os.replace(tmp, archive_path(name))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+    return Season.objects.create(
+        label=label[:100],
+        started_at=lesson_settings.start_time,
+        users=counts['users'],
+        solves=counts['solves'],
+        attempts=attempts,
+        winner=leader[0] if leader else '',
+        top_points=leader[1] if leader else 0,
+        archive=name,
+        size=os.path.getsize(archive_path(name)),
+        sha256=digest,
+    )
+
+
+def flush(models):
+    """Empties whole tables with the backend's flush SQL instead of row deletes."""
+    tables = [model._meta.db_table for model in models]
+    statements = connection.ops.sql_flush(no_style(), tables)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def delete_in_batches(queryset, batch_size=DELETE_BATCH):
+    """Deletes in short transactions of `batch_size` rows. Returns the row count."""
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            queryset.model.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+def reset(label=None):
+    """
+    Archives the season, then clears progress, the timer, student
+    accounts and the teams they leave empty. Returns (season, deleted user count).
+    """
+    season = archive_season(label)
+
+    # Nothing references these tables, so TRUNCATE needs no CASCADE
+    flush([Solve, Attempt] + log_models())
+
+    # Every lesson stays, with its timer stopped; memberships go with the students
+    LessonSettings.objects.update(start_time=None, end_time=None, hard_deadline=None, start_template=None,
+                                  state='idle', state_until=None)
+    bump_version(SCOREBOARD)
+
+    # With the progress tables empty, each batch is a handful of single DELETEs
+    deleted = delete_in_batches(resettable_users())
+    Team.objects.filter(members__isnull=True).delete()
+    bump_version(SCOREBOARD)
+    return season, deleted
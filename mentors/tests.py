@@ -1,3 +1,431 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from pages.events import log_models, record_submission
+from pages.models import Attempt, Category, Challenge, Solve
+from pages.tests import TEST_CACHES
+from users.models import Team, User
+from . import activation, activity, exports, lessons, schedule, seasons
+from .models import LessonSettings, LessonTemplate, Season
+
+
+class CatalogMixin:
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Crypto')
+        cls.challenges = [Challenge.objects.create(title=f'Task {i}', category=category, description='-', flag='f',
+                                                   points=100 * (i + 1), is_active=i < 2)
+                          for i in range(4)]
+        # Tasks 1 and 2: one already active, one hidden
+        cls.template = LessonTemplate.objects.create(title='Week 1')
+        cls.template.challenges.set(cls.challenges[1:3])
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_ENABLED=False, SCHEDULER_IN_PROCESS=False)
+class ScheduleTests(CatalogMixin, TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.lesson = LessonSettings.objects.create(
+            title='Timed', start_time=self.now + timedelta(hours=1), end_time=self.now + timedelta(hours=2),
+            hard_deadline=self.now + timedelta(hours=3), start_template=self.template)
+
+    def at(self, hours):
+        return self.now + timedelta(hours=hours)
+
+    def assertTemplateOpened(self):
+        self.lesson.refresh_from_db()
+        self.assertIsNone(self.lesson.start_template)
+        self.assertEqual(set(self.lesson.challenges.all()), set(self.challenges[1:3]))
+        self.assertTrue(all(c.is_active for c in self.lesson.challenges.all()))
+
+    def test_evaluate(self):
+        self.assertEqual(schedule.evaluate(self.lesson, self.at(0)), (schedule.SCHEDULED, self.lesson.start_time))
+        self.assertEqual(schedule.evaluate(self.lesson, self.at(1.5)), (schedule.RUNNING, self.lesson.end_time))
+        self.assertEqual(schedule.evaluate(self.lesson, self.at(2.5)), (schedule.OVERTIME, self.lesson.hard_deadline))
+        self.assertEqual(schedule.evaluate(self.lesson, self.at(3.5)), (schedule.CLOSED, None))
+        self.assertEqual(schedule.evaluate(LessonSettings(title='No timer')), (schedule.IDLE, None))
+
+    def test_hard_deadline_without_end_time(self):
+        lesson = LessonSettings(title='Deadline only', hard_deadline=self.at(1))
+        self.assertEqual(schedule.evaluate(lesson, self.at(0)), (schedule.IDLE, lesson.hard_deadline))
+        self.assertEqual(schedule.evaluate(lesson, self.at(2)), (schedule.CLOSED, None))
+
+    def test_start_and_hard_deadline_without_end_time(self):
+        lesson = LessonSettings(title='No main time', start_time=self.at(1), hard_deadline=self.at(2))
+        self.assertEqual(schedule.evaluate(lesson, self.at(0)), (schedule.SCHEDULED, lesson.start_time))
+        self.assertEqual(schedule.evaluate(lesson, self.at(1.5)), (schedule.RUNNING, lesson.hard_deadline))
+        self.assertEqual(schedule.evaluate(lesson, self.at(3)), (schedule.CLOSED, None))
+
+    def test_transitions(self):
+        self.assertTrue(schedule.fire(self.lesson, self.at(0)))
+        self.assertEqual(self.lesson.state, schedule.SCHEDULED)
+        self.assertEqual(self.lesson.state_until, self.lesson.start_time)
+
+        self.assertTrue(schedule.fire(self.lesson, self.at(1.5)))
+        self.assertEqual(self.lesson.state, schedule.RUNNING)
+        self.assertTemplateOpened()
+
+        for hours, state in ((2.5, schedule.OVERTIME), (3.5, schedule.CLOSED)):
+            self.assertTrue(schedule.fire(self.lesson, self.at(hours)))
+            self.lesson.refresh_from_db()
+            self.assertEqual(self.lesson.state, state)
+
+    def test_only_one_caller_wins(self):
+        schedule.fire(self.lesson, self.at(0))
+        other = LessonSettings.objects.get(pk=self.lesson.pk)
+        self.assertTrue(schedule.fire(self.lesson, self.at(1.5)))
+        self.assertFalse(schedule.fire(other, self.at(1.5)))
+
+    def test_missed_start_still_applies_template(self):
+        schedule.fire(self.lesson, self.at(0))
+        self.assertTrue(schedule.fire(self.lesson, self.at(2.5)))
+        self.assertEqual(self.lesson.state, schedule.OVERTIME)
+        self.assertTemplateOpened()
+
+    def test_missed_lesson_goes_straight_to_closed(self):
+        schedule.fire(self.lesson, self.at(0))
+        self.assertTrue(schedule.fire(self.lesson, self.at(4)))
+        self.assertEqual(self.lesson.state, schedule.CLOSED)
+        self.assertTemplateOpened()
+
+    def test_state_fires_overdue_transition(self):
+        schedule.fire(self.lesson, self.at(0))
+        LessonSettings.objects.filter(pk=self.lesson.pk).update(start_time=self.at(-1), state_until=self.at(-1))
+        self.lesson.refresh_from_db()
+        self.assertEqual(schedule.state(self.lesson), schedule.RUNNING)
+        self.assertTemplateOpened()
+
+    def test_message_poll_fires_overdue_transition(self):
+        schedule.fire(self.lesson, self.at(0))
+        LessonSettings.objects.filter(pk=self.lesson.pk).update(start_time=self.at(-1), state_until=self.at(-1))
+        student = User.objects.create_user('student', password='pw')
+        lessons.enroll(student, self.lesson)
+        self.client.force_login(student)
+        response = self.client.get(reverse('mentors:check_messages'))
+        self.assertIn(schedule.RUNNING, [m.get('state') for m in response.json()['messages']])
+        self.assertTemplateOpened()
+        self.assertEqual(self.lesson.state, schedule.RUNNING)
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_ENABLED=False, SCHEDULER_IN_PROCESS=False)
+class LessonScopingTests(CatalogMixin, TestCase):
+    def setUp(self):
+        self.default = LessonSettings.get_settings()
+        # Its own set: Task 1 (active) and Task 2 (switched off for the platform)
+        self.lesson = LessonSettings.objects.create(title='Group B', own_catalog=True)
+        self.lesson.challenges.set(self.challenges[1:3])
+        self.student = User.objects.create_user('student', password='pw')
+
+    def test_open_challenges(self):
+        self.assertEqual(set(self.default.open_challenges()), set(self.challenges[:2]))
+        self.assertEqual(set(self.lesson.open_challenges()), {self.challenges[1]})
+
+    def test_membership(self):
+        # Students without a membership land in the default lesson, mentors are never enrolled
+        self.assertEqual(lessons.lesson_for(self.student), self.default)
+        self.assertEqual(set(lessons.members(self.default)), {self.student})
+        mentor = User.objects.create_superuser('mentor', password='pw')
+        self.assertEqual(lessons.lesson_for(mentor), self.default)
+        self.assertNotIn(mentor, lessons.members(self.default))
+
+        lessons.enroll(self.student, self.lesson)
+        self.assertEqual(list(lessons.members(self.default)), [])
+        self.assertEqual(list(lessons.members(self.lesson)), [self.student])
+        self.assertEqual(lessons.lesson_for(User.objects.get(pk=self.student.pk)), self.lesson)
+
+    def test_student_dashboard_counts_only_open_challenges(self):
+        lessons.enroll(self.student, self.lesson)
+        # Task 0 was solved in the default lesson and is not open in Group B
+        Solve.objects.create(user=self.student, challenge=self.challenges[0], lesson=self.default)
+        Solve.objects.create(user=self.student, challenge=self.challenges[1], lesson=self.lesson)
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual((response.context['owned_flags'], response.context['total_flags']), (1, 1))
+        self.assertEqual(response.context['progress_percent'], 100)
+
+    def test_mentor_dashboard_totals_follow_the_selected_lesson(self):
+        lessons.enroll(self.student, self.lesson)
+        other = User.objects.create_user('other', password='pw')
+        lessons.enroll(other, self.default)
+        Solve.objects.create(user=self.student, challenge=self.challenges[1], lesson=self.lesson)
+        Solve.objects.create(user=other, challenge=self.challenges[0], lesson=self.default)
+        Solve.objects.create(user=other, challenge=self.challenges[1], lesson=self.default)
+
+        self.client.force_login(User.objects.create_superuser('mentor', password='pw'))
+        response = self.client.get(reverse('mentors:dashboard'))
+        self.assertEqual((response.context['total_users'], response.context['total_solves']), (1, 2))
+        self.client.post(reverse('mentors:lesson_select', args=[self.lesson.pk]))
+        response = self.client.get(reverse('mentors:dashboard'))
+        self.assertEqual((response.context['total_users'], response.context['total_solves']), (1, 1))
+
+    def test_closed_challenge_cannot_be_submitted(self):
+        lessons.enroll(self.student, self.lesson)
+        self.client.force_login(self.student)
+        response = self.client.post(reverse('submit_flag'), {'challenge_id': self.challenges[0].pk, 'flag': 'f'},
+                                    content_type='application/json')
+        self.assertEqual(response.json()['status'], 'error')
+        self.assertFalse(Solve.objects.exists())
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_ENABLED=False)
+class MedianTimeToSolveTests(CatalogMixin, TestCase):
+    def setUp(self):
+        self.start = timezone.now() - timedelta(hours=1)
+        self.lesson = LessonSettings.objects.create(title='Timed', start_time=self.start)
+        self.other = LessonSettings.objects.create(title='Other', start_time=self.start)
+        self.users = [User.objects.create_user(f'student{i}', password='pw') for i in range(4)]
+
+    def solve(self, user, challenge, minutes, lesson=None):
+        solve = Solve.objects.create(user=user, challenge=challenge, lesson=lesson or self.lesson)
+        Solve.objects.filter(pk=solve.pk).update(date=self.start + timedelta(minutes=minutes))
+
+    def test_median_per_challenge_and_lesson(self):
+        odd, even, unsolved = self.challenges[:3]
+        for user, minutes in zip(self.users, (5, 1, 30)):
+            self.solve(user, odd, minutes)
+        for user, minutes in zip(self.users, (10, 2, 40, 4)):
+            self.solve(user, even, minutes)
+        # Solves in another lesson or before the start do not count
+        self.solve(self.users[3], odd, 1, lesson=self.other)
+        self.solve(self.users[0], unsolved, -5)
+
+        medians = activity.median_times_to_solve(self.lesson, [c.pk for c in self.challenges])
+        self.assertEqual(medians, {odd.pk: timedelta(minutes=5), even.pk: timedelta(minutes=7)})
+        self.assertEqual(activity.median_times_to_solve(LessonSettings(title='No timer'), [odd.pk]), {})
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_ENABLED=False)
+class TemplateApplyTests(CatalogMixin, TestCase):
+    def setUp(self):
+        # The mentor works in the default lesson; `other` must never change
+        self.lesson = LessonSettings.get_settings()
+        self.other = LessonSettings.objects.create(title='Other')
+
+    def shown(self, lesson=None):
+        lesson = LessonSettings.objects.get(pk=(lesson or self.lesson).pk)
+        return set(lesson.open_challenges().values_list('pk', flat=True))
+
+    def ids(self, *indexes):
+        return [self.challenges[i].pk for i in indexes]
+
+    def test_plan(self):
+        self.assertEqual(activation.plan(self.template, activation.EXCLUSIVE, self.lesson),
+                         activation.Plan(self.lesson, activation.EXCLUSIVE, self.ids(2), self.ids(0), 1))
+        self.assertEqual(activation.plan(self.template, activation.ENABLE, self.lesson),
+                         activation.Plan(self.lesson, activation.ENABLE, self.ids(2), [], 1))
+        self.assertEqual(activation.plan(self.template, activation.DISABLE, self.lesson),
+                         activation.Plan(self.lesson, activation.DISABLE, [], self.ids(1), 1))
+        with self.assertRaises(ValueError):
+            activation.plan(self.template, 'everything', self.lesson)
+
+    def test_apply_writes_only_changes(self):
+        self.assertEqual(activation.apply(activation.plan(self.template, activation.EXCLUSIVE, self.lesson)), (1, 1))
+        self.assertEqual(self.shown(), set(self.ids(1, 2)))
+        again = activation.plan(self.template, activation.EXCLUSIVE, self.lesson)
+        self.assertEqual((again.enable, again.disable, again.unchanged), ([], [], 2))
+        self.assertEqual(activation.apply(again), (0, 0))
+
+    def test_apply_only_changes_the_lesson(self):
+        activation.apply(activation.plan(self.template, activation.EXCLUSIVE, self.lesson))
+        # Opening Task 2 switched it on for the platform, hiding Task 0 did not switch it off
+        self.assertEqual(self.shown(self.other), set(self.ids(0, 1, 2)))
+        activation.apply(activation.plan(self.template, activation.DISABLE, self.lesson))
+        self.assertEqual(self.shown(), set())
+        self.assertEqual(self.shown(self.other), set(self.ids(0, 1, 2)))
+
+    def test_preview_and_apply_views(self):
+        self.client.force_login(User.objects.create_superuser('mentor', password='pw'))
+        url = reverse('mentors:template_apply', args=[self.template.pk])
+
+        response = self.client.get(url, {'action': activation.EXCLUSIVE})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['enable_titles'], ['Task 2'])
+        self.assertEqual(response.context['disable_titles'], ['Task 0'])
+        # The preview is a dry run
+        self.assertEqual(self.shown(), set(self.ids(0, 1)))
+
+        response = self.client.post(url, {'action': activation.EXCLUSIVE})
+        self.assertRedirects(response, reverse('mentors:templates_list'), fetch_redirect_response=False)
+        self.assertEqual(self.shown(), set(self.ids(1, 2)))
+
+    def test_lockdown_hides_only_the_current_lesson(self):
+        self.client.force_login(User.objects.create_superuser('mentor', password='pw'))
+        self.client.post(reverse('mentors:disable_all_challenges'), {'confirm': 'CONFIRM_DISABLE'})
+        self.assertEqual(self.shown(), set())
+        self.assertEqual(self.shown(self.other), set(self.ids(0, 1)))
+
+    def test_bulk_actions_change_only_the_current_lesson(self):
+        self.client.force_login(User.objects.create_superuser('mentor', password='pw'))
+        url = reverse('mentors:bulk_challenges_action')
+        self.client.post(url, {'action': 'disable_selected', 'challenge_ids': self.ids(0)})
+        self.assertEqual(self.shown(), set(self.ids(1)))
+        self.assertEqual(self.shown(self.other), set(self.ids(0, 1)))
+        self.client.post(url, {'action': 'enable_selected', 'challenge_ids': self.ids(0, 3)})
+        self.assertEqual(self.shown(), set(self.ids(0, 1, 3)))
+
+    def test_lesson_form_without_challenges_opens_everything(self):
+        activation.apply(activation.plan_challenges(self.lesson, [], activation.EXCLUSIVE))
+        self.client.force_login(User.objects.create_superuser('mentor', password='pw'))
+        self.client.post(reverse('mentors:lesson_edit', args=[self.lesson.pk]), {'title': 'Main lesson'})
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.shown(), set(self.ids(0, 1)))
+
+    def test_unknown_action(self):
+        self.client.force_login(User.objects.create_superuser('mentor', password='pw'))
+        response = self.client.post(reverse('mentors:template_apply', args=[self.template.pk]), {'action': 'all'})
+        self.assertRedirects(response, reverse('mentors:templates_list'), fetch_redirect_response=False)
+        self.assertEqual(self.shown(), set(self.ids(0, 1)))
+
+    def test_mentors_only(self):
+        self.client.force_login(User.objects.create_user('student', password='pw'))
+        response = self.client.get(reverse('mentors:template_apply', args=[self.template.pk]),
+                                   {'action': activation.ENABLE})
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_ENABLED=False, SCHEDULER_IN_PROCESS=False)
+class SeasonResetTests(CatalogMixin, TestCase):
+    def setUp(self):
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir)
+        archive_settings = override_settings(SEASON_ARCHIVE_DIR=archive_dir)
+        archive_settings.enable()
+        self.addCleanup(archive_settings.disable)
+
+        self.lesson = LessonSettings.get_settings()
+        self.lesson.start_time = timezone.now() - timedelta(hours=1)
+        self.lesson.end_time = timezone.now() + timedelta(hours=1)
+        self.lesson.save()
+        self.team = Team.objects.create(name='Red')
+        self.winner = User.objects.create_user('winner', password='pw', team=self.team)
+        self.student = User.objects.create_user('student', password='pw')
+        self.mentor = User.objects.create_user('mentor', password='pw')
+        self.mentor.groups.add(Group.objects.create(name='Mentors'))
+        self.admin = User.objects.create_superuser('admin', password='pw')
+
+        challenge = self.challenges[0]
+        Attempt.objects.create(user=self.winner, challenge=challenge, flag_input='x', is_correct=False)
+        record_submission(self.winner, challenge, False, lesson=self.lesson)
+        Attempt.objects.create(user=self.winner, challenge=challenge, flag_input='f', is_correct=True)
+        Solve.objects.create(user=self.winner, challenge=challenge, lesson=self.lesson)
+        record_submission(self.winner, challenge, True, lesson=self.lesson)
+
+    def test_archive(self):
+        season = seasons.archive_season('Spring')
+        self.assertEqual((season.label, season.users, season.solves, season.attempts), ('Spring', 2, 1, 2))
+        self.assertEqual((season.winner, season.top_points), ('winner', 100))
+
+        with open(seasons.archive_path(season.archive), 'rb') as fh:
+            raw = fh.read()
+        self.assertEqual(hashlib.sha256(raw).hexdigest(), season.sha256)
+        self.assertEqual(len(raw), season.size)
+        data = json.loads(gzip.decompress(raw))
+        self.assertEqual(data['season']['label'], 'Spring')
+        # Mentors and admins are not part of the season
+        self.assertEqual([u['username'] for u in data['users']], ['winner', 'student'])
+        self.assertEqual(data['users'][0]['points'], 100)
+        self.assertEqual(len(data['challenges']), len(self.challenges))
+        self.assertEqual(data['attempts'][0][2:4], [2, 1])
+        # Nothing half-written is left next to the archive
+        self.assertEqual(os.listdir(os.path.dirname(seasons.archive_path(season.archive))), [season.archive])
+
+    def test_reset(self):
+        season, deleted = seasons.reset('Spring')
+        self.assertEqual(deleted, 2)
+        self.assertEqual(Season.objects.get(), season)
+        for model in [Solve, Attempt] + log_models():
+            self.assertFalse(model.objects.exists(), model.__name__)
+        self.assertEqual(set(User.objects.all()), {self.mentor, self.admin})
+        self.assertFalse(Team.objects.exists())
+
+        self.lesson.refresh_from_db()
+        self.assertIsNone(self.lesson.start_time)
+        self.assertIsNone(self.lesson.end_time)
+        self.assertEqual(self.lesson.state, schedule.IDLE)
+        # The catalog stays
+        self.assertEqual(Challenge.objects.count(), len(self.challenges))
+
+    def test_download(self):
+        season = seasons.archive_season()
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('mentors:season_download', args=[season.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content))[:10], b'{"season":')
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_ENABLED=False, SCHEDULER_IN_PROCESS=False)
+class ExportTests(CatalogMixin, TestCase):
+    SHEET = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+    def setUp(self):
+        self.lesson = LessonSettings.get_settings()
+        other = LessonSettings.objects.create(title='Other')
+        self.alice, self.bob, carol = [User.objects.create_user(name, password='pw')
+                                       for name in ('alice', 'bob', 'carol')]
+        lessons.enroll(self.alice, self.lesson)
+        lessons.enroll(self.bob, self.lesson)
+        lessons.enroll(carol, other)
+        self.solve(self.alice, self.challenges[0], wrong=1)
+        self.solve(carol, self.challenges[1])
+        self.client.force_login(User.objects.create_superuser('mentor', password='pw'))
+
+    def solve(self, user, challenge, wrong=0):
+        for _ in range(wrong):
+            Attempt.objects.create(user=user, challenge=challenge, flag_input='x', is_correct=False)
+            record_submission(user, challenge, False, lesson=lessons.lesson_for(user))
+        Attempt.objects.create(user=user, challenge=challenge, flag_input='f', is_correct=True)
+        Solve.objects.create(user=user, challenge=challenge, lesson=lessons.lesson_for(user))
+        record_submission(user, challenge, True, lesson=lessons.lesson_for(user))
+
+    def download(self, report, fmt):
+        response = self.client.get(reverse('mentors:export_report', args=[report, fmt]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], exports.CONTENT_TYPES[fmt])
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def csv_rows(self, report):
+        return list(csv.reader(io.StringIO(self.download(report, 'csv').decode('utf-8-sig')), delimiter=';'))
+
+    def xlsx_rows(self, report):
+        with zipfile.ZipFile(io.BytesIO(self.download(report, 'xlsx'))) as archive:
+            self.assertIn('xl/workbook.xml', archive.namelist())
+            sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        return [[cell.findtext(f'{self.SHEET}v') or cell.findtext(f'{self.SHEET}is/{self.SHEET}t') or ''
+                 for cell in row] for row in sheet.iter(f'{self.SHEET}row')]
+
+    def test_ranking_covers_the_current_lesson(self):
+        rows = self.csv_rows('ranking')
+        self.assertEqual(rows[0], ['Rank', 'Username', 'Total Score', 'Max Possible Score', 'Completion Percentage'])
+        self.assertEqual(rows[1:], [['1', 'alice', '100', '300', '33.33%'], ['2', 'bob', '0', '300', '0.00%']])
+        self.assertEqual(self.xlsx_rows('ranking'), rows)
+
+    def test_matrix(self):
+        Challenge.objects.filter(pk=self.challenges[1].pk).update(title='R&D <1>')
+        rows = self.csv_rows('matrix')
+        self.assertEqual(rows[0][:5], ['Username', 'Total Score', 'Solved', 'Task 0 (solved at)', 'Task 0 (attempts)'])
+        self.assertEqual(rows[0][5], 'R&D <1> (solved at)')
+        self.assertEqual(len(rows[0]), 3 + 2 * len(self.challenges))
+        alice, bob = rows[1:]
+        self.assertEqual(alice[:3] + alice[4:], ['alice', '100', '1', '2'] + [''] * 6)
+        self.assertRegex(alice[3], r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')
+        self.assertEqual(bob, ['bob', '0', '0'] + [''] * 8)
+        self.assertEqual(self.xlsx_rows('matrix'), rows)
+
+    def test_unknown_report_or_format(self):
+        for args in (('ranking', 'pdf'), ('grades', 'csv')):
+            self.assertEqual(self.client.get(reverse('mentors:export_report', args=args)).status_code, 404)
@@ -0,0 +1,59 @@
+"""
+Stored LessonTemplate totals (task_count, total_points).
+
+Changes through the M2M manager (form, admin, shell) send `m2m_changed`,
+which recounts the templates involved; code that bulk-inserts through
+rows (users/synthetic.py) must call `refresh` itself. Point changes arrive from pages.events.rescore as deltas and
+are added in one UPDATE per challenge; challenges about to be deleted are
+subtracted when pages.events.discard_challenges announces them. Reads
+(template lists, the start-template picker) then need no join.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from pages.events import challenges_discarded, points_changed
+from .models import LessonTemplate
+
+Membership = LessonTemplate.challenges.through
+
+
+def refresh(templates, exclude_challenges=()):
+    """Recounts `templates` (a queryset) in one UPDATE, leaving out `exclude_challenges`."""
+    rows = Membership.objects.filter(lessontemplate_id=OuterRef('pk')).exclude(
+        challenge_id__in=exclude_challenges).order_by().values('lessontemplate_id')
+    return templates.update(
+        task_count=Coalesce(Subquery(rows.annotate(n=Count('id')).values('n')), Value(0)),
+        total_points=Coalesce(Subquery(rows.annotate(n=Sum('challenge__points')).values('n'),
+                                       output_field=IntegerField()), Value(0)),
+    )
+
+
+@receiver(m2m_changed, sender=Membership)
+def challenges_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # challenge.templates.add/remove/clear: `instance` is a Challenge
+        if action == 'pre_clear':
+            instance._cleared_templates = list(instance.templates.values_list('pk', flat=True))
+            return
+        if action == 'post_clear':
+            pk_set = getattr(instance, '_cleared_templates', [])
+        elif action not in ('post_add', 'post_remove'):
+            return
+        refresh(LessonTemplate.objects.filter(pk__in=pk_set))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        refresh(LessonTemplate.objects.filter(pk=instance.pk))
+        instance.refresh_from_db(fields=['task_count', 'total_points'])
+
+
+@receiver(points_changed)
+def add_point_deltas(sender, deltas, **kwargs):
+    for challenge_id, delta in deltas.items():
+        LessonTemplate.objects.filter(challenges=challenge_id).update(total_points=F('total_points') + delta)
+
+
+@receiver(challenges_discarded)
+def subtract_discarded(sender, challenge_ids, **kwargs):
+    members = Membership.objects.filter(challenge_id__in=challenge_ids).values('lessontemplate_id')
+    refresh(LessonTemplate.objects.filter(pk__in=members), exclude_challenges=challenge_ids)
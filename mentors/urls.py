@@ -7,10 +7,13 @@ app_name = 'mentors'
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('activity/sparkline/', views.activity_sparkline_api, name='activity_sparkline_api'),
+    path('activity/histogram/', views.activity_histogram_api, name='activity_histogram_api'),
 
     # Challenges
     path('challenges/', views.challenges_list, name='challenges_list'),
     path('challenges/new/', views.challenge_create, name='challenge_create'),
+    path('challenges/search/', views.challenge_search_api, name='challenge_search_api'),
     path('challenges/bulk_action/', views.bulk_challenges_action, name='bulk_challenges_action'),
     path('challenges/disable_all/', views.disable_all_challenges, name='disable_all_challenges'),
     path('challenges/export/docx/', views.export_challenges_docx, name='export_challenges_docx'),
@@ -28,7 +31,25 @@ urlpatterns = [
     # Users & System Control
     path('users/', views.users_list, name='users_list'),
     path('users/export/', views.export_users_csv, name='export_users_csv'),
+    path('users/export/<slug:report>.<slug:fmt>', views.export_report, name='export_report'),
+    path('users/matrix/', views.solve_matrix, name='solve_matrix'),
+    path('users/matrix/data/', views.solve_matrix_api, name='solve_matrix_api'),
     path('system/reset/', views.reset_platform, name='reset_platform'),
+    path('system/seasons/', views.seasons_list, name='seasons_list'),
+    path('system/seasons/<int:pk>/download/', views.season_download, name='season_download'),
+
+    # Lessons (classrooms)
+    path('lessons/', views.lessons_list, name='lessons_list'),
+    path('lessons/new/', views.lesson_create, name='lesson_create'),
+    path('lessons/<int:pk>/edit/', views.lesson_edit, name='lesson_edit'),
+    path('lessons/<int:pk>/select/', views.lesson_select, name='lesson_select'),
+
+    # Background jobs
+    path('jobs/', views.jobs_list, name='jobs_list'),
+    path('jobs/export/', views.export_report_job, name='export_report_job'),
+    path('jobs/rebuild/', views.rebuild_projections, name='rebuild_projections'),
+    path('jobs/<int:pk>/', views.job_status, name='job_status'),
+    path('jobs/<int:pk>/download/', views.job_download, name='job_download'),
 
     # Messaging System
     path('messages/send/', views.send_message, name='send_message'),
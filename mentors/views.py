@@ -1,32 +1,43 @@
-import csv
-import codecs
 import uuid
 from django import forms
-from django.core.cache import cache
-from django.http import HttpResponse, JsonResponse
+from django.core.cache import caches
+from config import metrics
+from config.cache import CATALOG, SCOREBOARD, bump_version
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.decorators.http import require_POST
-from django.db.models import Count, Sum
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
 from django.db.models.functions import Coalesce
 from django.db import transaction
 from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
 from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.text import Truncator
 from datetime import timedelta
 from .models import LessonTemplate
 from .forms import  LessonTemplateForm
-# Try to import python-docx, handle gracefully if missing
-try:
-    from docx import Document
-    from docx.shared import Pt, RGBColor
-except ImportError:
-    Document = None
-
-from pages.models import Challenge, Solve, Category, Attempt
+from pages.models import Challenge, ChallengeStats, Solve, Category, Attempt
+from pages import scoring
+from pages.search import search
+from pages.events import discard_challenges, rescore
+from pages.scoreboard import parse_as_of, timeline_at
 from users.models import User
-from .models import LessonSettings
-from .forms import ChallengeForm, CategoryForm, TimerSettingsForm
+from .models import Job, LessonSettings, Season
+from .lessons import current_lesson, members
+from .matrix import cached_matrix
+from . import activation, activity, exports, jobs, lessons, schedule, seasons
+from .forms import ChallengeForm, CategoryForm, LessonForm, TimerSettingsForm
+
+# Challenge titles listed per side on the template apply preview
+PREVIEW_LIMIT = 50
+
+CHALLENGES_PER_PAGE = 50
+SEARCH_PAGE_SIZE = 30
 
 
 # --- Custom Decorator ---
@@ -56,14 +67,22 @@ class MentorMessageForm(forms.Form):
 @login_required
 @mentor_required
 def dashboard(request):
-    total_users = User.objects.filter(is_superuser=False).exclude(groups__name='Mentors').count()
+    # Timer and counters of the lesson the mentor works in
+    lesson_settings = current_lesson(request)
+
+    total_users = members(lesson_settings).count()
     total_challenges = Challenge.objects.count()
-    total_solves = Solve.objects.count()
+    total_solves = Solve.objects.filter(lesson=lesson_settings).count()
 
-    recent_solves = Solve.objects.select_related('user', 'challenge').order_by('-date')[:10]
+    recent_solves = Solve.objects.filter(lesson=lesson_settings).select_related(
+        'user', 'challenge').order_by('-date')[:10]
 
-    # Timer logic
-    lesson_settings = LessonSettings.get_settings()
+    # Busiest challenges, straight from the stats table
+    challenge_stats = list(ChallengeStats.objects.select_related('challenge', 'first_blood_user').order_by(
+        '-attempters', '-solves')[:10])
+    medians = activity.median_times_to_solve(lesson_settings, [stats.challenge_id for stats in challenge_stats])
+    for stats in challenge_stats:
+        stats.median_tts = medians.get(stats.challenge_id)
 
     initial_data = {}
     if lesson_settings.start_time and lesson_settings.end_time:
@@ -84,6 +103,7 @@ def dashboard(request):
         if timer_form.is_valid():
             minutes = timer_form.cleaned_data.get('duration_minutes')
             delay = timer_form.cleaned_data.get('delay_minutes') or 0
+            start_at = timer_form.cleaned_data.get('start_at')
 
             if minutes:
                 now = timezone.now()
@@ -92,12 +112,20 @@ def dashboard(request):
                     lesson_settings.end_time = lesson_settings.start_time + timedelta(minutes=minutes)
                     action_msg = f"Timer updated. Total duration: {minutes} min."
                 else:
-                    lesson_settings.start_time = now
-                    lesson_settings.end_time = now + timedelta(minutes=minutes)
-                    action_msg = f"Timer started for {minutes} minutes."
+                    # A future start is fired by the scheduler, which also applies the template
+                    start = start_at if start_at and start_at > now else now
+                    lesson_settings.start_time = start
+                    lesson_settings.end_time = start + timedelta(minutes=minutes)
+                    lesson_settings.start_template = timer_form.cleaned_data.get('start_template')
+                    if start > now:
+                        action_msg = f"Lesson scheduled for {timezone.localtime(start):%d.%m %H:%M}, {minutes} minutes."
+                    else:
+                        action_msg = f"Timer started for {minutes} minutes."
 
                 lesson_settings.hard_deadline = lesson_settings.end_time + timedelta(minutes=delay)
-                lesson_settings.save()
+                with transaction.atomic():
+                    lesson_settings.save()
+                    schedule.changed(lesson_settings, action_msg)
                 messages.success(request, f'{action_msg} Hard stop delay: {delay} min.')
             return redirect('mentors:dashboard')
 
@@ -105,7 +133,10 @@ def dashboard(request):
         lesson_settings.start_time = None
         lesson_settings.end_time = None
         lesson_settings.hard_deadline = None
-        lesson_settings.save()
+        lesson_settings.start_template = None
+        with transaction.atomic():
+            lesson_settings.save()
+            schedule.changed(lesson_settings, 'The lesson timer was removed.')
         messages.success(request, 'Timer stopped.')
         return redirect('mentors:dashboard')
 
@@ -114,7 +145,15 @@ def dashboard(request):
         'total_challenges': total_challenges,
         'total_solves': total_solves,
         'recent_solves': recent_solves,
+        'challenge_stats': challenge_stats,
+        'activity_metrics': [
+            ('solves', 'Solves', '#9fef00'),
+            ('wrong_attempts', 'Wrong Attempts', '#ffe600'),
+            ('lockouts', 'Lockouts', '#ef4444'),
+            ('active_users', 'Active Now', '#00d2ff'),
+        ],
         'lesson_settings': lesson_settings,
+        'lesson_state': schedule.state(lesson_settings),
         'timer_form': timer_form,
     }
     return render(request, 'mentors/dashboard.html', context)
@@ -126,10 +165,14 @@ def dashboard(request):
 @mentor_required
 def send_message(request):
     """
-    View for mentors to send ephemeral messages via Cache.
+    View for mentors to send ephemeral messages via Cache. Broadcasts go
+    to the mentor's current lesson only.
     """
-    # Fetch ALL active users (Students, Mentors, Admins)
-    users_list = User.objects.filter(is_active=True).order_by('username')
+    lesson = current_lesson(request)
+    # Students of the lesson plus staff
+    users_list = User.objects.filter(is_active=True).filter(
+        Q(lesson_memberships__lesson=lesson) | Q(is_superuser=True) | Q(groups__name='Mentors')
+    ).distinct().order_by('username')
 
     if request.method == 'POST':
         form = MentorMessageForm(request.POST)
@@ -137,6 +180,7 @@ def send_message(request):
             recipient = form.cleaned_data['recipient']
             content = form.cleaned_data['message']
             msg_id = str(uuid.uuid4())
+            cache = caches['shared']
 
             message_data = {
                 'id': msg_id,
@@ -146,12 +190,8 @@ def send_message(request):
             }
 
             if recipient == 'all':
-                broadcasts = cache.get('hacklabs_broadcasts', [])
-                broadcasts.append(message_data)
-                if len(broadcasts) > 20:
-                    broadcasts = broadcasts[-20:]
-                cache.set('hacklabs_broadcasts', broadcasts, timeout=120)
-                messages.success(request, "Broadcast sent to ALL users!")
+                lessons.broadcast(lesson, message_data)
+                messages.success(request, f"Broadcast sent to {lesson.title}!")
             else:
                 user_key = f'hacklabs_msgs_{recipient}'
                 user_msgs = cache.get(user_key, [])
@@ -167,6 +207,7 @@ def send_message(request):
     return render(request, 'mentors/message_form.html', {
         'form': form,
         'title': 'Send Message',
+        'lesson': lesson,
         'users_list': users_list  # Renamed from 'students' to 'users_list'
     })
 
@@ -177,9 +218,11 @@ def check_messages(request):
         return JsonResponse({'messages': []})
 
     new_messages = []
+    cache = caches['shared']
 
     user_key = f'hacklabs_msgs_{request.user.id}'
     personal_msgs = cache.get(user_key, [])
+    metrics.inc('hacklabs_cache_requests_total', cache='messages', result='hit' if personal_msgs else 'miss')
 
     if personal_msgs:
         for msg in personal_msgs:
@@ -187,14 +230,47 @@ def check_messages(request):
             new_messages.append(msg)
         cache.delete(user_key)
 
-    broadcasts = cache.get('hacklabs_broadcasts', [])
+    lesson = current_lesson(request)
+    # Every page polls here, so an overdue transition fires even if nobody opens the challenges
+    schedule.state(lesson)
+    broadcasts = lessons.broadcasts(lesson)
+    metrics.inc('hacklabs_cache_requests_total', cache='broadcasts', result='hit' if broadcasts else 'miss')
     for msg in broadcasts:
-        msg['type'] = 'broadcast'
+        # Lesson state events (mentors/schedule.py) keep their own type
+        msg.setdefault('type', 'broadcast')
         new_messages.append(msg)
 
     return JsonResponse({'messages': new_messages})
 
 
+def _int_param(request, name, default=None):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return default
+
+
+@login_required
+@mentor_required
+def activity_sparkline_api(request):
+    """
+    Per-minute solves / wrong attempts / lockouts / active users over the
+    lesson window (or the last ?minutes=N).
+    """
+    lesson = current_lesson(request)
+    start, end = activity.window(_int_param(request, 'minutes'), lesson)
+    return JsonResponse(activity.sparkline(start, end, lesson))
+
+
+@login_required
+@mentor_required
+def activity_histogram_api(request):
+    """Same window as the sparkline, folded into ?bins=N bins (default 20)."""
+    lesson = current_lesson(request)
+    start, end = activity.window(_int_param(request, 'minutes'), lesson)
+    return JsonResponse(activity.histogram(start, end, _int_param(request, 'bins', 20), lesson))
+
+
 # --- CHALLENGES ---
 
 @login_required
@@ -202,11 +278,14 @@ def check_messages(request):
 def challenges_list(request):
     sort_by = request.GET.get('sort', 'newest')
     category_filter = request.GET.get('category')
+    query = request.GET.get('q', '').strip()
 
     challenges = Challenge.objects.select_related('category')
 
     if category_filter:
         challenges = challenges.filter(category__name=category_filter)
+    if query:
+        challenges = search(challenges, query)
 
     if sort_by == 'category':
         challenges = challenges.order_by('category__name', 'title')
@@ -223,65 +302,77 @@ def challenges_list(request):
 
     categories = Category.objects.all().order_by('name')
 
+    # Stats and medians are only worked out for the rows on the page
+    page = Paginator(challenges.select_related('stats', 'stats__first_blood_user'),
+                     CHALLENGES_PER_PAGE).get_page(request.GET.get('page'))
+    lesson = current_lesson(request)
+    page_ids = [c.pk for c in page]
+    open_ids = set(lesson.open_challenges().filter(pk__in=page_ids).values_list('id', flat=True))
+    medians = activity.median_times_to_solve(lesson, page_ids)
+    for challenge in page:
+        challenge.median_tts = medians.get(challenge.pk)
+        challenge.open_in_lesson = challenge.pk in open_ids
+
+    params = request.GET.copy()
+    params.pop('page', None)
     context = {
-        'challenges': challenges,
+        'challenges': page,
+        'page_obj': page,
+        'page_query': params.urlencode(),
         'categories': categories,
         'current_sort': sort_by,
-        'current_category': category_filter
+        'current_category': category_filter,
+        'query': query,
+        'lesson': lesson,
     }
     return render(request, 'mentors/challenges_list.html', context)
 
 
 @login_required
 @mentor_required
+def challenge_search_api(request):
+    """
+    One page of the catalog for the challenge pickers: ?q= full-text
+    search, ?category=<id>, ?page=<n>. Fetches one row past the page
+    instead of counting the matches.
+    """
+    challenges = search(Challenge.objects.select_related('category'), request.GET.get('q', ''))
+    category = _int_param(request, 'category', 0)
+    if category:
+        challenges = challenges.filter(category_id=category)
+    page = max(_int_param(request, 'page', 1), 1)
+    offset = (page - 1) * SEARCH_PAGE_SIZE
+    rows = list(challenges.order_by('category__name', 'points', 'id')
+                .only('id', 'title', 'points', 'is_active', 'description', 'category__name')
+                [offset:offset + SEARCH_PAGE_SIZE + 1])
+    return JsonResponse({
+        'results': [{
+            'id': ch.id,
+            'title': ch.title,
+            'category': ch.category.name if ch.category else 'Uncategorized',
+            'points': ch.points,
+            'is_active': ch.is_active,
+            'summary': Truncator(strip_tags(ch.description)).chars(120),
+        } for ch in rows[:SEARCH_PAGE_SIZE]],
+        'page': page,
+        'has_more': len(rows) > SEARCH_PAGE_SIZE,
+    })
+
+
+@login_required
+@mentor_required
+@require_POST
 def export_challenges_docx(request):
-    if Document is None:
+    if exports.Document is None:
         messages.error(request,
                        "Library 'python-docx' is missing. Please install it on the server: pip install python-docx")
         return redirect('mentors:challenges_list')
 
-    challenges = Challenge.objects.filter(is_active=True).select_related('category').order_by('category__name',
-                                                                                              'points')
-
-    if not challenges.exists():
+    if not exports.active_challenges().exists():
         messages.warning(request, "No active challenges to export.")
         return redirect('mentors:challenges_list')
 
-    document = Document()
-    main_title = document.add_heading('HackLabs Active Challenges', 0)
-    main_title.alignment = 1
-
-    timestamp = timezone.now().strftime('%Y-%m-%d %H:%M')
-    p_date = document.add_paragraph(f"Exported on: {timestamp}")
-    p_date.alignment = 1
-    document.add_paragraph("-" * 50).alignment = 1
-
-    for challenge in challenges:
-        p = document.add_paragraph()
-        p.space_after = Pt(12)
-
-        def add_line(label, text):
-            run_label = p.add_run(f"{label} ")
-            run_label.bold = True
-            run_label.font.color.rgb = RGBColor(0, 0, 0)
-            p.add_run(f"{text}\n")
-
-        add_line("Title:", challenge.title)
-        add_line("Category:", challenge.category.name if challenge.category else "Uncategorized")
-        add_line("Description:", challenge.description)
-        add_line("Flag:", challenge.flag)
-        add_line("Award:", f"{challenge.points} Pts")
-
-        sep = document.add_paragraph("_" * 30)
-        sep.alignment = 1
-        sep.space_after = Pt(24)
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-    filename = f"challenges_export_{timezone.now().strftime('%Y%m%d')}.docx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-    document.save(response)
-    return response
+    return _start_job(request, 'export_docx')
 
 
 @login_required
@@ -295,12 +386,15 @@ def bulk_challenges_action(request):
         messages.warning(request, 'No challenges selected.')
         return redirect('mentors:challenges_list')
 
+    # Only the mentor's current lesson changes, other lessons keep their challenges
+    lesson = current_lesson(request)
+    ids = Challenge.objects.filter(id__in=challenge_ids).values_list('id', flat=True)
     if action == 'enable_selected':
-        count = Challenge.objects.filter(id__in=challenge_ids).update(is_active=True)
-        messages.success(request, f'Enabled {count} challenges.')
+        enabled, _ = activation.apply(activation.plan_challenges(lesson, ids, activation.ENABLE))
+        messages.success(request, f'Opened {enabled} challenges in "{lesson.title}".')
     elif action == 'disable_selected':
-        count = Challenge.objects.filter(id__in=challenge_ids).update(is_active=False)
-        messages.success(request, f'Disabled {count} challenges.')
+        _, disabled = activation.apply(activation.plan_challenges(lesson, ids, activation.DISABLE))
+        messages.success(request, f'Hid {disabled} challenges in "{lesson.title}".')
 
     return redirect('mentors:challenges_list')
 
@@ -313,7 +407,9 @@ def challenge_create(request):
         if form.is_valid():
             challenge = form.save(commit=False)
             challenge.author = request.user.username
+            scoring.set_points(challenge, form.cleaned_data['points'])
             challenge.save()
+            bump_version(CATALOG)
             messages.success(request, 'Challenge created successfully!')
             return redirect('mentors:challenges_list')
     else:
@@ -329,7 +425,14 @@ def challenge_edit(request, pk):
     if request.method == 'POST':
         form = ChallengeForm(request.POST, instance=challenge)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                old_points = Challenge.objects.select_for_update().values_list('points', flat=True).get(pk=pk)
+                challenge = form.save(commit=False)
+                scoring.set_points(challenge, form.cleaned_data['points'])
+                challenge.save()
+                # Only this challenge's solvers carry the old value
+                rescore({challenge.pk: challenge.points - old_points})
+            bump_version(CATALOG)
             messages.success(request, 'Challenge updated successfully!')
             return redirect('mentors:challenges_list')
     else:
@@ -343,7 +446,10 @@ def challenge_edit(request, pk):
 def challenge_delete(request, pk):
     challenge = get_object_or_404(Challenge, pk=pk)
     if request.method == 'POST':
-        challenge.delete()
+        with transaction.atomic():
+            discard_challenges([challenge.pk])
+            challenge.delete()
+        bump_version(CATALOG, SCOREBOARD)
         messages.success(request, 'Challenge deleted!')
         return redirect('mentors:challenges_list')
     return render(request, 'mentors/challenge_confirm_delete.html', {'object': challenge, 'type': 'Challenge'})
@@ -356,6 +462,7 @@ def challenge_toggle_active(request, pk):
     challenge = get_object_or_404(Challenge, pk=pk)
     challenge.is_active = not challenge.is_active
     challenge.save()
+    bump_version(CATALOG)
     messages.success(request, f'Challenge "{challenge.title}" is now {"Active" if challenge.is_active else "Hidden"}')
     return redirect('mentors:challenges_list')
 
@@ -368,9 +475,10 @@ def disable_all_challenges(request):
         messages.error(request, 'Confirmation failed. Type CONFIRM_DISABLE exactly.')
         return redirect('mentors:challenges_list')
 
-    updated_count = Challenge.objects.update(is_active=False)
+    lesson = current_lesson(request)
+    _, hidden = activation.apply(activation.plan_challenges(lesson, [], activation.EXCLUSIVE))
 
-    messages.success(request, f'Lockdown initiated! {updated_count} challenges hidden.')
+    messages.success(request, f'Lockdown initiated! {hidden} challenges hidden in "{lesson.title}".')
     return redirect('mentors:challenges_list')
 
 
@@ -405,6 +513,7 @@ def category_edit(request, pk):
         form = CategoryForm(request.POST, instance=category)
         if form.is_valid():
             form.save()
+            bump_version(CATALOG)
             messages.success(request, 'Category updated!')
             return redirect('mentors:categories_list')
     else:
@@ -417,7 +526,10 @@ def category_edit(request, pk):
 def category_delete(request, pk):
     category = get_object_or_404(Category, pk=pk)
     if request.method == 'POST':
-        category.delete()
+        with transaction.atomic():
+            discard_challenges(category.challenges.values_list('pk', flat=True))
+            category.delete()
+        bump_version(CATALOG, SCOREBOARD)
         messages.success(request, 'Category deleted!')
         return redirect('mentors:categories_list')
     return render(request, 'mentors/category_confirm_delete.html', {'object': category, 'type': 'Category'})
@@ -428,13 +540,29 @@ def category_delete(request, pk):
 @login_required
 @mentor_required
 def users_list(request):
-    max_points_data = Challenge.objects.filter(is_active=True).aggregate(total=Sum('points'))
-    max_possible_points = max_points_data['total'] if max_points_data['total'] is not None else 0
-
-    users_qs = User.objects.filter(is_superuser=False).exclude(groups__name='Mentors').annotate(
-        total_points=Coalesce(Sum('solves__challenge__points'), 0),
-        solved_count=Count('solves')
-    ).order_by('-total_points')
+    lesson = current_lesson(request)
+    max_possible_points = exports.max_possible_points(lesson)
+
+    try:
+        as_of = parse_as_of(request.GET.get('as_of'), lesson)
+    except ValueError as e:
+        messages.warning(request, str(e))
+        as_of = None
+
+    users_qs = exports.lesson_students(lesson)
+    if as_of is None:
+        users_qs = users_qs.annotate(
+            total_points=Coalesce(Sum('solves__challenge__points'), 0),
+            solved_count=Count('solves')
+        )
+    else:
+        # Point-in-time totals from the score timeline
+        row = timeline_at(as_of).filter(user=OuterRef('pk'))
+        users_qs = users_qs.annotate(
+            total_points=Coalesce(Subquery(row.values('points')[:1]), 0),
+            solved_count=Coalesce(Subquery(row.values('solves')[:1]), 0)
+        )
+    users_qs = users_qs.order_by('-total_points')
 
     users = []
     for user in users_qs:
@@ -446,39 +574,39 @@ def users_list(request):
 
     context = {
         'users': users,
-        'max_possible_points': max_possible_points
+        'max_possible_points': max_possible_points,
+        'as_of': as_of,
+        'lesson': lesson,
+        'lesson_end': lesson.end_time,
     }
     return render(request, 'mentors/users_list.html', context)
 
 
-@login_required
-@mentor_required
-def export_users_csv(request):
-    response = HttpResponse(content_type='text/csv')
+def _export_response(rows, fmt, name):
+    response = StreamingHttpResponse(exports.WRITERS[fmt](rows), content_type=exports.CONTENT_TYPES[fmt])
     timestamp = timezone.now().strftime('%Y-%m-%d_%H-%M')
-    response['Content-Disposition'] = f'attachment; filename="hacklabs_results_{timestamp}.csv"'
-
-    response.write(codecs.BOM_UTF8)
-    writer = csv.writer(response, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-    writer.writerow(['Rank', 'Username', 'Total Score', 'Max Possible Score', 'Completion Percentage'])
+    response['Content-Disposition'] = f'attachment; filename="hacklabs_{name}_{timestamp}.{fmt}"'
+    return response
 
-    max_points_data = Challenge.objects.filter(is_active=True).aggregate(total=Sum('points'))
-    max_possible_points = max_points_data['total'] if max_points_data['total'] is not None else 0
 
-    users = User.objects.filter(is_superuser=False).exclude(groups__name='Mentors').annotate(
-        total_points=Coalesce(Sum('solves__challenge__points'), 0)
-    ).order_by('-total_points')
+@login_required
+@mentor_required
+def export_users_csv(request):
+    return _export_response(exports.ranking_rows(current_lesson(request)), 'csv', 'results')
 
-    for index, user in enumerate(users, 1):
-        user_points = user.total_points
-        if max_possible_points > 0:
-            percentage = (user_points / max_possible_points) * 100
-        else:
-            percentage = 0.0
-        percentage_str = f"{percentage:.2f}%"
-        writer.writerow([index, user.username, user_points, max_possible_points, percentage_str])
 
-    return response
+@login_required
+@mentor_required
+def export_report(request, report, fmt):
+    """
+    Streaming exports: `report` is ranking or matrix (user x challenge solve
+    times and attempt counts) of the current lesson, as csv or xlsx.
+    """
+    if fmt not in exports.WRITERS or report not in exports.REPORTS:
+        raise Http404
+    lesson = current_lesson(request)
+    rows = exports.ranking_rows(lesson) if report == 'ranking' else exports.matrix_rows(lesson)
+    return _export_response(rows, fmt, report)
 
 
 @login_required
@@ -489,26 +617,167 @@ def reset_platform(request):
         messages.error(request, 'Confirmation failed. Type CONFIRM_RESET exactly.')
         return redirect('mentors:users_list')
 
-    with transaction.atomic():
-        Solve.objects.all().delete()
-        Attempt.objects.all().delete()
+    label = request.POST.get('label', '').strip()[:100]
+    return _start_job(request, 'reset_platform', {'label': label} if label else None)
 
-        lesson_settings = LessonSettings.get_settings()
-        lesson_settings.start_time = None
-        lesson_settings.end_time = None
-        lesson_settings.hard_deadline = None
-        lesson_settings.save()
 
-        deleted_count, _ = User.objects.filter(
-            is_superuser=False,
-            is_staff=False
-        ).exclude(
-            groups__name='Mentors'
-        ).delete()
+@login_required
+@mentor_required
+def seasons_list(request):
+    return render(request, 'mentors/seasons_list.html', {'seasons': Season.objects.all()})
+
+
+@login_required
+@mentor_required
+def season_download(request, pk):
+    season = get_object_or_404(Season, pk=pk)
+    try:
+        fh = open(seasons.archive_path(season.archive), 'rb')
+    except FileNotFoundError:
+        raise Http404('The archive file is missing.')
+    return FileResponse(fh, as_attachment=True, filename=season.archive, content_type='application/gzip')
+
+
+# --- LESSONS ---
+
+@login_required
+@mentor_required
+def lessons_list(request):
+    lessons_qs = LessonSettings.objects.annotate(
+        students=Count('memberships', distinct=True),
+        limited_to=Count('challenges', distinct=True),
+    )
+    return render(request, 'mentors/lessons_list.html', {
+        'lessons': lessons_qs,
+        'current': current_lesson(request),
+    })
+
 
-        messages.success(request, f'Platform Reset Complete! Removed {deleted_count} users and all progress.')
+def _lesson_form(request, form, title):
+    return render(request, 'mentors/lesson_form.html', {
+        'form': form,
+        'selected_challenges': _selected_challenges(form),
+        'categories': Category.objects.order_by('name'),
+        'title': title,
+    })
 
-    return redirect('mentors:users_list')
+
+@login_required
+@mentor_required
+def lesson_create(request):
+    form = LessonForm(request.POST or None)
+    if request.method == 'POST' and form.is_valid():
+        lesson = form.save()
+        lessons.select(request, lesson)
+        messages.success(request, f'Lesson "{lesson.title}" created. Students join it with code {lesson.join_code}.')
+        return redirect('mentors:lessons_list')
+    return _lesson_form(request, form, 'Create Lesson')
+
+
+@login_required
+@mentor_required
+def lesson_edit(request, pk):
+    lesson = get_object_or_404(LessonSettings, pk=pk)
+    form = LessonForm(request.POST or None, instance=lesson)
+    if request.method == 'POST' and form.is_valid():
+        form.save()
+        bump_version(CATALOG)
+        messages.success(request, f'Lesson "{lesson.title}" updated!')
+        return redirect('mentors:lessons_list')
+    return _lesson_form(request, form, 'Edit Lesson')
+
+
+@login_required
+@mentor_required
+@require_POST
+def lesson_select(request, pk):
+    lesson = get_object_or_404(LessonSettings, pk=pk)
+    lessons.select(request, lesson)
+    messages.success(request, f'Now working in "{lesson.title}".')
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()},
+                                                    require_https=request.is_secure()):
+        return redirect(next_url)
+    return redirect('mentors:dashboard')
+
+
+# --- Background jobs ---
+
+def _start_job(request, kind, params=None):
+    job = jobs.enqueue(kind, params, user=request.user)
+    if job.cached:
+        messages.success(request, f'{jobs.HANDLERS[kind].label}: nothing changed since the last export, ready to download.')
+    else:
+        messages.info(request, f'{jobs.HANDLERS[kind].label} queued.')
+    return redirect('mentors:jobs_list')
+
+
+@login_required
+@mentor_required
+@require_POST
+def export_report_job(request):
+    report, fmt = request.POST.get('report'), request.POST.get('fmt')
+    if fmt not in exports.WRITERS or report not in exports.REPORTS:
+        messages.error(request, 'Unknown export.')
+        return redirect('mentors:users_list')
+    return _start_job(request, 'export_report', {'report': report, 'fmt': fmt, 'lesson': current_lesson(request).pk})
+
+
+@login_required
+@mentor_required
+@require_POST
+def rebuild_projections(request):
+    return _start_job(request, 'rebuild_projections')
+
+
+@login_required
+@mentor_required
+def jobs_list(request):
+    recent = Job.objects.select_related('created_by')[:50]
+    for job in recent:
+        job.label = jobs.HANDLERS[job.kind].label if job.kind in jobs.HANDLERS else job.kind
+    return render(request, 'mentors/jobs_list.html', {'jobs': recent})
+
+
+@login_required
+@mentor_required
+def job_status(request, pk):
+    job = get_object_or_404(Job, pk=pk)
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'finished': job.is_finished,
+        'message': job.message,
+        'download': reverse('mentors:job_download', args=[job.pk]) if job.artifact else None,
+    })
+
+
+@login_required
+@mentor_required
+def job_download(request, pk):
+    job = get_object_or_404(Job, pk=pk, status=Job.DONE)
+    if not job.artifact:
+        raise Http404
+    try:
+        fh = open(jobs.artifact_path(job.artifact), 'rb')
+    except FileNotFoundError:
+        raise Http404('The artifact was pruned, run the job again.')
+    return FileResponse(fh, as_attachment=True, filename=job.filename)
+
+
+@login_required
+@mentor_required
+def solve_matrix(request):
+    return render(request, 'mentors/solve_matrix.html')
+
+
+@login_required
+@mentor_required
+def solve_matrix_api(request):
+    """
+    Packed user x challenge states, see mentors/matrix.py for the format.
+    """
+    return JsonResponse(cached_matrix())
 
 
 # --- LESSON TEMPLATES (NEW) ---
@@ -519,10 +788,7 @@ def templates_list(request):
     """
     Shows all created lesson templates.
     """
-    templates = LessonTemplate.objects.annotate(
-        task_count=Count('challenges'),
-        total_score=Coalesce(Sum('challenges__points'), 0)
-    ).order_by('-created_at')
+    templates = LessonTemplate.objects.order_by('-created_at')
 
     return render(request, 'mentors/lesson_templates_list.html', {'templates': templates})
 
@@ -539,18 +805,10 @@ def template_create(request):
     else:
         form = LessonTemplateForm()
 
-    # Categorize challenges for the view to render grouped checkboxes
-    challenges_by_category = {}
-    challenges = Challenge.objects.all().select_related('category').order_by('category__name', 'points')
-    for ch in challenges:
-        cat_name = ch.category.name if ch.category else 'Uncategorized'
-        if cat_name not in challenges_by_category:
-            challenges_by_category[cat_name] = []
-        challenges_by_category[cat_name].append(ch)
-
     return render(request, 'mentors/lesson_template_form.html', {
         'form': form,
-        'challenges_by_category': challenges_by_category,
+        'selected_challenges': _selected_challenges(form),
+        'categories': Category.objects.order_by('name'),
         'title': 'Create Lesson Template'
     })
 
@@ -568,23 +826,31 @@ def template_edit(request, pk):
     else:
         form = LessonTemplateForm(instance=template)
 
-    # Categorize challenges for display
-    challenges_by_category = {}
-    challenges = Challenge.objects.all().select_related('category').order_by('category__name', 'points')
-    for ch in challenges:
-        cat_name = ch.category.name if ch.category else 'Uncategorized'
-        if cat_name not in challenges_by_category:
-            challenges_by_category[cat_name] = []
-        challenges_by_category[cat_name].append(ch)
-
     return render(request, 'mentors/lesson_template_form.html', {
         'form': form,
-        'challenges_by_category': challenges_by_category,
+        'selected_challenges': _selected_challenges(form),
+        'categories': Category.objects.order_by('name'),
         'title': 'Edit Lesson Template',
         'template': template
     })
 
 
+def _selected_challenges(form):
+    """
+    The challenges ticked in the picker: the submitted ones when a POST is
+    re-rendered, otherwise the lesson's or template's own. The rest of the
+    catalog is loaded page by page through challenge_search_api.
+    """
+    if form.is_bound:
+        ids = [pk for pk in form.data.getlist('challenges') if pk.isdigit()]
+        challenges = Challenge.objects.filter(pk__in=ids)
+    elif form.instance.pk:
+        challenges = form.instance.challenges.all()
+    else:
+        return []
+    return challenges.select_related('category').order_by('category__name', 'points')
+
+
 @login_required
 @mentor_required
 @require_POST
@@ -597,34 +863,47 @@ def template_delete(request, pk):
 
 @login_required
 @mentor_required
-@require_POST
 def template_apply(request, pk):
     """
-    Core Logic: Applies the challenges from the template to the live platform.
+    Applies the challenges from the template to the mentor's current lesson.
     Action types:
-    - 'exclusive': Disable ALL other challenges, enable ONLY template challenges.
-    - 'enable': Enable template challenges (others remain unchanged).
-    - 'disable': Disable template challenges.
+    - 'exclusive': Hide ALL other challenges in the lesson, open ONLY template challenges.
+    - 'enable': Open template challenges (others remain unchanged).
+    - 'disable': Hide template challenges.
+    Only challenges whose state changes are written. GET shows the same
+    diff as a dry run, with a button to apply it.
     """
     template = get_object_or_404(LessonTemplate, pk=pk)
-    action = request.POST.get('action')
-
-    with transaction.atomic():
-        template_challenges = template.challenges.all()
-
-        if action == 'exclusive':
-            # Hide EVERYTHING first
-            Challenge.objects.update(is_active=False)
-            # Enable template items
-            count = template_challenges.update(is_active=True)
-            messages.success(request, f'LESSON STARTED: "{template.title}". Enabled {count} tasks. All others hidden.')
-
-        elif action == 'enable':
-            count = template_challenges.update(is_active=True)
-            messages.success(request, f'Enabled {count} tasks from "{template.title}".')
-
-        elif action == 'disable':
-            count = template_challenges.update(is_active=False)
-            messages.success(request, f'Disabled {count} tasks from "{template.title}".')
+    action = request.POST.get('action') if request.method == 'POST' else request.GET.get('action')
+    if action not in activation.ACTIONS:
+        messages.error(request, 'Unknown template action.')
+        return redirect('mentors:templates_list')
+
+    lesson = current_lesson(request)
+    change = activation.plan(template, action, lesson)
+
+    if request.method != 'POST':
+        shown_enable = change.enable[:PREVIEW_LIMIT]
+        shown_disable = change.disable[:PREVIEW_LIMIT]
+        titles = dict(Challenge.objects.filter(pk__in=shown_enable + shown_disable).values_list('pk', 'title'))
+        return render(request, 'mentors/template_apply_preview.html', {
+            'template': template,
+            'lesson': lesson,
+            'plan': change,
+            'enable_titles': [titles[pk] for pk in shown_enable],
+            'disable_titles': [titles[pk] for pk in shown_disable],
+            'preview_limit': PREVIEW_LIMIT,
+        })
+
+    enabled, disabled = activation.apply(change)
+    if action == activation.EXCLUSIVE:
+        messages.success(request, f'LESSON STARTED: "{template.title}" in "{lesson.title}". '
+                                  f'Enabled {enabled} tasks, hid {disabled} others.')
+    elif action == activation.ENABLE:
+        messages.success(request, f'Enabled {enabled} tasks from "{template.title}" in "{lesson.title}" '
+                                  f'({change.unchanged} already open).')
+    else:
+        messages.success(request, f'Disabled {disabled} tasks from "{template.title}" in "{lesson.title}" '
+                                  f'({change.unchanged} already hidden).')
 
-    return redirect('mentors:templates_list')
\ No newline at end of file
+    return redirect('mentors:templates_list')
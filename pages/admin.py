@@ -1,20 +1,108 @@
 from django.contrib import admin
-from .models import Category, Challenge, Solve, Attempt
+from django.db import transaction
+
+from config.cache import CATALOG, SCOREBOARD, bump_version
+from . import scoring
+from .events import discard_challenges, rescore
+from .models import Category, Challenge, Solve, Attempt, SubmissionEvent, UserScore
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """
+    Progress rows come from submissions (events.record_submission) and the
+    derived tables are rebuilt from the log, so editing them here would
+    make the scoreboards disagree. Use the mentor panel or a replay instead;
+    wrongly credited solves are taken back with the Solve list's revoke action.
+    """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class ProgressDeleteMixin:
+    """Deleting challenges or users takes their (read-only) progress rows and events with them."""
+
+    def get_deleted_objects(self, objs, request):
+        deleted, model_count, perms_needed, protected = super().get_deleted_objects(objs, request)
+        return deleted, model_count, set(), protected
+
+
+def _discard_and_delete(queryset, challenge_ids):
+    # Same path as the mentor panel: projections first, while the events still exist
+    with transaction.atomic():
+        discard_challenges(challenge_ids)
+        queryset.delete()
+    bump_version(CATALOG, SCOREBOARD)
+
 
 @admin.register(Challenge)
-class ChallengeAdmin(admin.ModelAdmin):
+class ChallengeAdmin(ProgressDeleteMixin, admin.ModelAdmin):
     list_display = ('title', 'category', 'points', 'difficulty', 'max_attempts')
     list_filter = ('category', 'difficulty')
     search_fields = ('title', 'description')
+    readonly_fields = ('initial_points',)
+
+    def save_model(self, request, obj, form, change):
+        # Same as mentors.views.challenge_edit: Points is the mentor's value, solvers are rescored
+        old_points = None
+        if change:
+            old_points = Challenge.objects.select_for_update().values_list('points', flat=True).get(pk=obj.pk)
+        scoring.set_points(obj, form.cleaned_data['points'])
+        super().save_model(request, obj, form, change)
+        if old_points is not None:
+            rescore({obj.pk: obj.points - old_points})
+        transaction.on_commit(lambda: bump_version(CATALOG))
+
+    def delete_model(self, request, obj):
+        _discard_and_delete(Challenge.objects.filter(pk=obj.pk), [obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        _discard_and_delete(queryset, list(queryset.values_list('pk', flat=True)))
+
+
+@admin.register(Category)
+class CategoryAdmin(ProgressDeleteMixin, admin.ModelAdmin):
+    def delete_model(self, request, obj):
+        _discard_and_delete(Category.objects.filter(pk=obj.pk), list(obj.challenges.values_list('pk', flat=True)))
+
+    def delete_queryset(self, request, queryset):
+        _discard_and_delete(queryset, list(Challenge.objects.filter(category__in=queryset).values_list('pk', flat=True)))
+
 
 @admin.register(Solve)
-class SolveAdmin(admin.ModelAdmin):
-    list_display = ('user', 'challenge', 'date')
+class SolveAdmin(ReadOnlyAdmin):
+    list_display = ('user', 'challenge', 'lesson', 'date')
     list_filter = ('challenge__category', 'date')
+    actions = ['revoke']
+
+    def has_revoke_permission(self, request):
+        return request.user.is_superuser
+
+    @admin.action(description='Revoke selected solves and rescore', permissions=['revoke'])
+    def revoke(self, request, queryset):
+        with transaction.atomic():
+            count = scoring.revoke_solves(queryset)
+        bump_version(CATALOG, SCOREBOARD)
+        self.message_user(request, f'{count} solve(s) revoked, scores rebuilt from the event log.')
 
 @admin.register(Attempt)
-class AttemptAdmin(admin.ModelAdmin):
+class AttemptAdmin(ReadOnlyAdmin):
     list_display = ('user', 'challenge', 'flag_input', 'is_correct', 'timestamp')
     list_filter = ('is_correct', 'challenge')
 
-admin.site.register(Category)
\ No newline at end of file
+# The log is append-only, derived tables are rebuilt from it
+@admin.register(SubmissionEvent)
+class SubmissionEventAdmin(ReadOnlyAdmin):
+    list_display = ('timestamp', 'user', 'challenge', 'kind')
+    list_filter = ('kind',)
+
+@admin.register(UserScore)
+class UserScoreAdmin(ReadOnlyAdmin):
+    list_display = ('user', 'points', 'solves', 'attempts', 'wrong_attempts', 'last_solve_at')
+    ordering = ('-points',)
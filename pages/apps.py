@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PagesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pages'
+
+    def ready(self):
+        # Registers the derived tables maintained from the submission log
+        from . import projections  # noqa: F401
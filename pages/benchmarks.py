@@ -0,0 +1,154 @@
+"""
+Micro-benchmarks for the view and aggregation hot paths.
+
+Each case runs against a scratch test database seeded by the synthetic
+classroom generator, through the Django test client, so the numbers
+include URL routing, middleware and template rendering.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_databases, setup_test_environment, \
+    teardown_databases, teardown_test_environment
+
+from config.cache import SCOREBOARD, bump_version
+from pages.loadtest import percentile
+
+CASES = {}
+
+
+def case(name):
+    """
+    Registers a benchmark. The decorated function receives the Fixture and
+    returns the callable that is timed.
+    """
+    def decorator(func):
+        CASES[name] = func
+        return func
+    return decorator
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """
+    Creates the test database(s), yields, then destroys them.
+    The development database is never touched.
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity=verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=verbosity)
+        teardown_test_environment()
+
+
+class Fixture:
+    """
+    Logged-in clients and handy objects shared by all cases.
+    """
+
+    def __init__(self):
+        from django.db.models import Count, Q
+        from pages.models import Challenge
+        from users.models import User
+
+        self.mentor = User.objects.create_superuser('bench_mentor', 'mentor@hacklabs.local', 'bench')
+        # Busiest student: the one with the most wrong guesses on limited challenges
+        self.student = User.objects.filter(is_superuser=False).annotate(
+            fails=Count('attempt', filter=Q(attempt__is_correct=False, attempt__challenge__max_attempts__gt=0))
+        ).order_by('-fails', 'id').first()
+        self.challenge = Challenge.objects.filter(is_active=True, max_attempts=0).order_by('id').first()
+
+        self.student_client = Client()
+        self.student_client.force_login(self.student)
+        self.mentor_client = Client()
+        self.mentor_client.force_login(self.mentor)
+
+
+@case('scoreboard')
+def bench_scoreboard(fx):
+    def run():
+        # A new scoreboard version each time: this times building the board, not a cache hit
+        bump_version(SCOREBOARD)
+        return fx.student_client.get('/scoreboard/')
+    return run
+
+
+@case('challenges_view')
+def bench_challenges_view(fx):
+    return lambda: fx.student_client.get('/challenges/')
+
+
+@case('dashboard')
+def bench_dashboard(fx):
+    return lambda: fx.student_client.get('/dashboard/')
+
+
+@case('users_list')
+def bench_users_list(fx):
+    return lambda: fx.mentor_client.get('/mentors/users/')
+
+
+@case('submit_flag')
+def bench_submit_flag(fx):
+    payload = '{"challenge_id": %d, "flag": "CTF{bench}"}' % fx.challenge.pk
+    return lambda: fx.student_client.post('/api/submit_flag/', payload, content_type='application/json')
+
+
+@case('user_score')
+def bench_user_score(fx):
+    return lambda: fx.student.score
+
+
+def run_case(func, iterations, warmup):
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    with CaptureQueriesContext(connection) as ctx:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'iterations': iterations,
+        'queries': len(ctx.captured_queries) // iterations,
+        'min_ms': round(timings[0] * 1000, 3),
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+    }
+
+
+def run_benchmarks(names, iterations=20, warmup=3, log=None):
+    """
+    Runs the selected cases against the current database. Returns {name: result}.
+    """
+    log = log or (lambda msg: None)
+    fx = Fixture()
+    results = {}
+    for name in names:
+        results[name] = run_case(CASES[name](fx), iterations, warmup)
+        log(f"{name:<20}{results[name]['median_ms']:>10.2f} ms{results[name]['queries']:>8} queries")
+    return results
+
+
+def compare(baseline, current, threshold):
+    """
+    Yields (case, old median, new median, change %, is_regression).
+    A case regresses when its median grows by more than `threshold` percent
+    or when it issues more queries than before.
+    """
+    for name, result in current['cases'].items():
+        previous = baseline['cases'].get(name)
+        if not previous:
+            continue
+        before, after = previous['median_ms'], result['median_ms']
+        change = ((after - before) / before * 100) if before else 0.0
+        regressed = change > threshold or result['queries'] > previous['queries']
+        yield name, before, after, change, regressed
@@ -0,0 +1,183 @@
+"""
+Submission event log and the projection registry.
+
+submit_flag appends SubmissionEvents through `record_submission`, which also
+applies every registered projection (derived table) inside the same
+transaction. `replay` rebuilds all projections from the log in one
+streaming pass: events are read with a server-side iterator and each
+projection keeps at most one row per entity it owns (user, challenge, ...)
+plus a write buffer, so memory does not grow with the length of the log.
+"""
+import time
+from collections import namedtuple
+
+from django.db import connection, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from config.cache import CATALOG, SCOREBOARD, bump_version
+from .models import Challenge, SubmissionEvent
+
+# What replay hands to projections; the live path passes real SubmissionEvents
+# which have the same attributes.
+EventRow = namedtuple('EventRow', 'id user_id challenge_id team_id lesson_id kind timestamp')
+
+PROJECTIONS = []
+
+# For tables derived from the catalog rather than the log (mentors/totals.py):
+# sent with challenge_ids= before challenges are deleted, and with
+# deltas={challenge_id: new - old} once their points changed.
+challenges_discarded = Signal()
+points_changed = Signal()
+
+
+def register(cls):
+    """
+    Class decorator adding a Projection to the registry (order matters: a
+    projection may rely on the ones registered before it).
+    """
+    PROJECTIONS.append(cls)
+    return cls
+
+
+class Projection:
+    """
+    A derived table maintained from SubmissionEvents.
+
+    `apply` is the live path (one event, already saved, inside the request
+    transaction). `replay_start` / `replay` / `replay_finish` rebuild the
+    table from scratch; `replay` must buffer and flush in chunks.
+    """
+    models = ()
+
+    def __init__(self, chunk_size=5000):
+        self.chunk_size = chunk_size
+
+    def apply(self, event, challenge):
+        raise NotImplementedError
+
+    def discard_challenges(self, challenge_ids):
+        """Called before challenges (and their events) are deleted."""
+
+    def rescore(self, challenge_id, delta):
+        """Called when a challenge's points changed by `delta`."""
+
+    def clear(self):
+        for model in self.models:
+            model.objects.all().delete()
+
+    def replay_start(self):
+        pass
+
+    def replay(self, event, challenge):
+        raise NotImplementedError
+
+    def replay_finish(self):
+        pass
+
+
+def record_submission(user, challenge, is_correct, locked=False, timestamp=None, lesson=None):
+    """
+    Appends the events for one submission and updates every projection.
+    Must be called inside the transaction that stores the Attempt/Solve.
+    """
+    timestamp = timestamp or timezone.now()
+    kinds = [SubmissionEvent.CORRECT if is_correct else SubmissionEvent.INCORRECT]
+    if locked:
+        kinds.append(SubmissionEvent.LOCKOUT)
+
+    projections = [cls() for cls in PROJECTIONS]
+    for kind in kinds:
+        event = SubmissionEvent.objects.create(user=user, challenge=challenge, team_id=user.team_id, lesson=lesson,
+                                               kind=kind, timestamp=timestamp)
+        for p in projections:
+            p.apply(event, challenge)
+
+
+def discard_challenges(challenge_ids):
+    """
+    Takes challenges out of every derived table. Call it right before
+    deleting challenges (or a category) while their events still exist.
+    """
+    challenge_ids = list(challenge_ids)
+    if not challenge_ids:
+        return
+    for cls in PROJECTIONS:
+        cls().discard_challenges(challenge_ids)
+    challenges_discarded.send(sender=Challenge, challenge_ids=challenge_ids)
+
+
+def rescore(deltas):
+    """
+    Applies point changes ({challenge_id: new - old}) to every projection.
+    Each projection issues one set-based UPDATE per challenge that touches
+    only its solvers' rows. Call it inside the transaction that saves the
+    new points; the scoreboard and catalog versions move on commit.
+    """
+    deltas = {challenge_id: delta for challenge_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    projections = [cls() for cls in PROJECTIONS]
+    for challenge_id, delta in deltas.items():
+        for p in projections:
+            p.rescore(challenge_id, delta)
+    points_changed.send(sender=Challenge, deltas=deltas)
+    transaction.on_commit(lambda: bump_version(SCOREBOARD, CATALOG))
+
+
+def clear_all():
+    """Empties the log and every derived table (platform reset)."""
+    for cls in PROJECTIONS:
+        cls().clear()
+    SubmissionEvent.objects.all().delete()
+
+
+def log_models():
+    """Every projection table plus the log itself, the tables `clear_all` empties."""
+    return [model for cls in PROJECTIONS for model in cls.models] + [SubmissionEvent]
+
+
+def _lock_log():
+    """
+    Holds off new submissions until the surrounding transaction ends, so
+    no event lands in the log (or a projection) behind the replay's back.
+    Reads stay possible. SQLite allows one writer at a time, and the replay
+    takes the write lock with its first DELETE; on PostgreSQL an EXCLUSIVE
+    table lock blocks the INSERTs of record_submission.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {connection.ops.quote_name(SubmissionEvent._meta.db_table)} IN EXCLUSIVE MODE')
+
+
+def replay(chunk_size=5000, log=None):
+    """
+    Rebuilds every projection from the event log. Returns (events, seconds).
+    """
+    log = log or (lambda msg: None)
+    started = time.perf_counter()
+    count = 0
+
+    with transaction.atomic():
+        _lock_log()
+        projections = [cls(chunk_size=chunk_size) for cls in PROJECTIONS]
+        for p in projections:
+            p.clear()
+            p.replay_start()
+
+        challenges = Challenge.objects.in_bulk()
+        rows = SubmissionEvent.objects.order_by('timestamp', 'id').values_list(*EventRow._fields)
+        for row in rows.iterator(chunk_size=chunk_size):
+            event = EventRow(*row)
+            challenge = challenges[event.challenge_id]
+            for p in projections:
+                p.replay(event, challenge)
+            count += 1
+            if count % 100000 == 0:
+                log(f'{count} events replayed...')
+
+        for p in projections:
+            p.replay_finish()
+
+    bump_version(SCOREBOARD)
+    return count, time.perf_counter() - started
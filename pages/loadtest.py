@@ -0,0 +1,332 @@
+"""
+Classroom traffic simulator used by the `loadtest` management command.
+
+Every virtual student logs in, opens the challenges page and then behaves
+like the real frontend: polls messages, lesson status, the open challenge's
+solves and the scoreboard every few seconds, submits flags in bursts and
+reloads the challenges page from time to time.
+
+Two transports are available: plain HTTP against a running server
+(runserver, gunicorn, uvicorn...) and in-process calls into the ASGI app.
+"""
+import asyncio
+import http.client
+import json
+import math
+import random
+import re
+import subprocess
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+CSRF_INPUT_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+LOGIN_PATH = '/users/accounts/login/'
+
+
+@dataclass
+class LoadProfile:
+    students: int = 20
+    duration: float = 60.0
+    poll_interval: float = 5.0
+    submit_every: float = 30.0
+    submit_burst: int = 3
+    page_every: float = 60.0
+    correct_ratio: float = 0.1
+    seed: int = 0
+
+
+@dataclass
+class Response:
+    status: int
+    headers: list
+    body: bytes
+
+    def cookies(self):
+        jar = {}
+        for name, value in self.headers:
+            if name.lower() == 'set-cookie':
+                parsed = SimpleCookie()
+                parsed.load(value)
+                for key, morsel in parsed.items():
+                    jar[key] = morsel.value
+        return jar
+
+
+class HttpTransport:
+    """
+    Blocking http.client keep-alive connections run in a thread pool.
+    Each student owns a small pool, like a browser firing parallel fetches.
+    """
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.prefix = parts.path.rstrip('/')
+        self.origin = f'{parts.scheme}://{parts.netloc}'
+
+    def open(self):
+        return []
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=30)
+
+    def _request(self, conn, method, path, headers, body):
+        try:
+            conn.request(method, self.prefix + path, body=body, headers=headers)
+            resp = conn.getresponse()
+            return Response(resp.status, resp.getheaders(), resp.read())
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            raise
+
+    async def request(self, pool, method, path, headers, body=None):
+        conn = pool.pop() if pool else self._connect()
+        loop = asyncio.get_running_loop()
+        resp = await loop.run_in_executor(None, self._request, conn, method, path, headers, body)
+        pool.append(conn)
+        return resp
+
+
+class AsgiTransport:
+    """
+    Calls config.asgi.application directly, no sockets involved.
+    """
+
+    origin = 'http://testserver'
+
+    def __init__(self):
+        from config.asgi import application
+        self.app = application
+
+    def open(self):
+        return None
+
+    async def request(self, conn, method, path, headers, body=None):
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80),
+        }
+        sent = False
+        disconnect = asyncio.Event()
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': body or b'', 'more_body': False}
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        status, resp_headers, chunks = 500, [], []
+
+        async def send(message):
+            nonlocal status, resp_headers
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                resp_headers = [(k.decode('latin-1'), v.decode('latin-1')) for k, v in message.get('headers', [])]
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+
+        await self.app(scope, receive, send)
+        disconnect.set()
+        return Response(status, resp_headers, b''.join(chunks))
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, elapsed, ok):
+        self.latencies[name].append(elapsed)
+        if not ok:
+            self.errors[name] += 1
+
+    def summary(self, duration):
+        endpoints = {}
+        for name in sorted(self.latencies):
+            samples = sorted(self.latencies[name])
+            endpoints[name] = {
+                'requests': len(samples),
+                'errors': self.errors[name],
+                'throughput_rps': round(len(samples) / duration, 2) if duration else 0.0,
+                'mean_ms': round(sum(samples) / len(samples) * 1000, 2),
+                'p50_ms': round(percentile(samples, 50) * 1000, 2),
+                'p95_ms': round(percentile(samples, 95) * 1000, 2),
+                'p99_ms': round(percentile(samples, 99) * 1000, 2),
+                'max_ms': round(samples[-1] * 1000, 2),
+            }
+        return endpoints
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_samples)) - 1, 0)
+    return sorted_samples[min(rank, len(sorted_samples) - 1)]
+
+
+class Student:
+    def __init__(self, username, password, transport, challenges, profile, stats, rng):
+        self.username = username
+        self.password = password
+        self.transport = transport
+        self.challenges = challenges
+        self.profile = profile
+        self.stats = stats
+        self.rng = rng
+        self.conn = transport.open()
+        self.cookies = {}
+        self.open_challenge = None
+
+    def _headers(self, extra=None):
+        headers = {'Host': urlsplit(self.transport.origin).netloc, 'User-Agent': 'hacklabs-loadtest'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        headers.update(extra or {})
+        return headers
+
+    async def call(self, name, method, path, body=None, extra_headers=None, record=True):
+        started = time.perf_counter()
+        try:
+            resp = await self.transport.request(self.conn, method, path, self._headers(extra_headers), body)
+            ok = resp.status < 400
+        except Exception:
+            resp, ok = None, False
+        if record:
+            self.stats.record(name, time.perf_counter() - started, ok)
+        if resp is not None:
+            self.cookies.update(resp.cookies())
+        return resp
+
+    async def login(self):
+        page = await self.call('login', 'GET', LOGIN_PATH, record=False)
+        match = CSRF_INPUT_RE.search(page.body.decode('utf-8', 'ignore')) if page else None
+        if not match:
+            return False
+        body = urlencode({
+            'csrfmiddlewaretoken': match.group(1),
+            'username': self.username,
+            'password': self.password,
+        }).encode()
+        resp = await self.call('login', 'POST', LOGIN_PATH, body=body, extra_headers={
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Referer': self.transport.origin + LOGIN_PATH,
+        }, record=False)
+        return resp is not None and resp.status == 302 and 'sessionid' in self.cookies
+
+    async def poll(self):
+        calls = [
+            self.call('check_messages', 'GET', '/mentors/messages/check/'),
+            self.call('lesson_status_api', 'GET', '/api/lesson/status/'),
+            self.call('scoreboard_api', 'GET', '/api/scoreboard/'),
+        ]
+        if self.open_challenge:
+            calls.append(self.call('challenge_solves_api', 'GET', f'/api/challenge/{self.open_challenge[0]}/solves/'))
+        await asyncio.gather(*calls)
+
+    async def submit_burst(self):
+        for _ in range(self.profile.submit_burst):
+            challenge_id, flag = self.rng.choice(self.challenges)
+            self.open_challenge = (challenge_id, flag)
+            if self.rng.random() >= self.profile.correct_ratio:
+                flag = f'CTF{{loadtest_{self.rng.getrandbits(32):08x}}}'
+            await self.call('submit_flag', 'POST', '/api/submit_flag/',
+                            body=json.dumps({'challenge_id': challenge_id, 'flag': flag}).encode(),
+                            extra_headers={
+                                'Content-Type': 'application/json',
+                                'X-CSRFToken': self.cookies.get('csrftoken', ''),
+                                'Referer': self.transport.origin + '/challenges/',
+                            })
+
+    async def run(self, deadline):
+        p = self.profile
+        # Spread students over one polling period so they don't hit the server in lockstep
+        await asyncio.sleep(self.rng.uniform(0, p.poll_interval))
+        await self.call('challenges_view', 'GET', '/challenges/')
+        if self.challenges:
+            self.open_challenge = self.rng.choice(self.challenges)
+
+        now = time.monotonic()
+        next_poll = now
+        next_submit = now + self.rng.uniform(0, p.submit_every)
+        next_page = now + p.page_every
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if now >= next_poll:
+                await self.poll()
+                next_poll += p.poll_interval
+            if self.challenges and now >= next_submit:
+                await self.submit_burst()
+                next_submit = now + self.rng.uniform(0.5, 1.5) * p.submit_every
+            if now >= next_page:
+                await self.call('challenges_view', 'GET', '/challenges/')
+                next_page = now + p.page_every
+            await asyncio.sleep(max(min(next_poll, next_submit, next_page, deadline) - time.monotonic(), 0))
+
+
+async def run_load(transport, credentials, challenges, profile, log=None):
+    """
+    Runs the simulation and returns (stats, wall-clock duration in seconds).
+    """
+    log = log or (lambda msg: None)
+    rng = random.Random(profile.seed)
+    stats = Stats()
+    students = [
+        Student(username, password, transport, challenges, profile, stats, random.Random(rng.getrandbits(64)))
+        for username, password in credentials
+    ]
+
+    logged_in = await asyncio.gather(*(s.login() for s in students))
+    active = [s for s, ok in zip(students, logged_in) if ok]
+    log(f'{len(active)}/{len(students)} students logged in')
+    if not active:
+        return stats, 0.0
+
+    started = time.monotonic()
+    deadline = started + profile.duration
+    await asyncio.gather(*(s.run(deadline) for s in active))
+    return stats, time.monotonic() - started
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(old, new):
+    """
+    Yields (endpoint, metric, old, new, change %) for metrics present in both results.
+    """
+    for name, current in new['endpoints'].items():
+        previous = old.get('endpoints', {}).get(name)
+        if not previous:
+            continue
+        for metric in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            before, after = previous[metric], current[metric]
+            change = ((after - before) / before * 100) if before else 0.0
+            yield name, metric, before, after, change
@@ -0,0 +1,54 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from pages.benchmarks import CASES, scratch_database, run_benchmarks
+from pages.loadtest import git_revision
+from users.synthetic import ClassroomSpec, generate_classroom
+
+
+class Command(BaseCommand):
+    help = 'Runs the view and aggregation micro-benchmarks on a seeded scratch database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('cases', nargs='*', help=f"Cases to run (default: all of {', '.join(CASES)})")
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--challenges', type=int, default=100)
+        parser.add_argument('--solves', type=int, default=10000)
+        parser.add_argument('--attempts', type=int, default=30000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output', help='Write the JSON result (e.g. benchmarks/baseline.json)')
+
+    def handle(self, *args, **options):
+        names = options['cases'] or list(CASES)
+        unknown = [name for name in names if name not in CASES]
+        if unknown:
+            raise CommandError(f"Unknown case(s): {', '.join(unknown)}")
+
+        spec = ClassroomSpec(
+            users=options['users'],
+            challenges=options['challenges'],
+            solves=options['solves'],
+            attempts=options['attempts'],
+            seed=options['seed'],
+        )
+
+        with scratch_database():
+            self.stdout.write(f'Seeding {spec.users} users / {spec.attempts} attempts (seed={spec.seed})...')
+            generate_classroom(spec)
+            results = run_benchmarks(names, options['iterations'], options['warmup'], log=self.stdout.write)
+
+        result = {
+            'meta': {
+                'revision': git_revision(),
+                'created_at': timezone.now().isoformat(),
+                'dataset': spec.__dict__,
+                'iterations': options['iterations'],
+            },
+            'cases': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(result, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Result written to {options['output']}"))
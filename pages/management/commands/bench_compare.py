@@ -0,0 +1,35 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from pages.benchmarks import compare
+
+
+class Command(BaseCommand):
+    help = 'Compares two bench results and fails if a case regressed above the threshold'
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', help='Stored baseline JSON (e.g. benchmarks/baseline.json)')
+        parser.add_argument('current', help='Fresh result produced by `bench --output`')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Allowed median slowdown in percent (default: 10)')
+
+    def handle(self, *args, **options):
+        with open(options['baseline']) as fh:
+            baseline = json.load(fh)
+        with open(options['current']) as fh:
+            current = json.load(fh)
+
+        if baseline['meta'].get('dataset') != current['meta'].get('dataset'):
+            self.stdout.write(self.style.WARNING('Datasets differ, numbers are not directly comparable.'))
+
+        regressions = []
+        for name, before, after, change, regressed in compare(baseline, current, options['threshold']):
+            line = f'{name:<20}{before:>10.2f} -> {after:<10.2f} ms {change:+7.1f}%'
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f'{line}  REGRESSION'))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS('No regressions.'))
@@ -0,0 +1,92 @@
+import asyncio
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from pages.loadtest import (
+    AsgiTransport, HttpTransport, LoadProfile, run_load, git_revision, compare_results
+)
+from pages.models import Challenge
+from users.models import User
+from users.synthetic import DEFAULT_PASSWORD
+
+
+class Command(BaseCommand):
+    help = 'Simulates a classroom of students against the dev server or the ASGI app and reports latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Base URL of a running server (ignored with --asgi)')
+        parser.add_argument('--asgi', action='store_true', help='Call config.asgi.application in-process')
+        parser.add_argument('--students', type=int, default=20)
+        parser.add_argument('--duration', type=float, default=60.0, help='Seconds of traffic')
+        parser.add_argument('--poll-interval', type=float, default=5.0)
+        parser.add_argument('--submit-every', type=float, default=30.0,
+                            help='Average seconds between submission bursts')
+        parser.add_argument('--submit-burst', type=int, default=3, help='Submissions per burst')
+        parser.add_argument('--page-every', type=float, default=60.0, help='Seconds between challenges page reloads')
+        parser.add_argument('--correct-ratio', type=float, default=0.1, help='Share of submissions with the right flag')
+        parser.add_argument('--password', default=DEFAULT_PASSWORD,
+                            help='Password of the student accounts (see populate_db)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON result to this file')
+        parser.add_argument('--compare', help='Previous JSON result to compare against')
+
+    def handle(self, *args, **options):
+        students = list(
+            User.objects.filter(is_superuser=False, is_staff=False, is_active=True)
+            .exclude(groups__name='Mentors')
+            .order_by('id')
+            .values_list('username', flat=True)[:options['students']]
+        )
+        if not students:
+            raise CommandError('No student accounts found. Run populate_db first.')
+
+        challenges = list(Challenge.objects.filter(is_active=True).values_list('id', 'flag'))
+        profile = LoadProfile(
+            students=len(students),
+            duration=options['duration'],
+            poll_interval=options['poll_interval'],
+            submit_every=options['submit_every'],
+            submit_burst=options['submit_burst'],
+            page_every=options['page_every'],
+            correct_ratio=options['correct_ratio'],
+            seed=options['seed'],
+        )
+        transport = AsgiTransport() if options['asgi'] else HttpTransport(options['url'])
+        target = 'asgi' if options['asgi'] else options['url']
+
+        self.stdout.write(f'Simulating {len(students)} students against {target} for {profile.duration:.0f}s...')
+        credentials = [(username, options['password']) for username in students]
+        stats, elapsed = asyncio.run(run_load(transport, credentials, challenges, profile, log=self.stdout.write))
+        if not elapsed:
+            raise CommandError('No student could log in. Check --password and the target URL.')
+
+        result = {
+            'meta': {
+                'revision': git_revision(),
+                'created_at': timezone.now().isoformat(),
+                'target': target,
+                'profile': profile.__dict__,
+                'elapsed_s': round(elapsed, 2),
+            },
+            'endpoints': stats.summary(elapsed),
+        }
+
+        self.stdout.write(f"\n{'endpoint':<24}{'reqs':>7}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+        for name, row in result['endpoints'].items():
+            self.stdout.write(
+                f"{name:<24}{row['requests']:>7}{row['errors']:>6}{row['throughput_rps']:>9.2f}"
+                f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(result, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Result written to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                previous = json.load(fh)
+            self.stdout.write(f"\nCompared to {previous['meta'].get('revision') or options['compare']}:")
+            for name, metric, before, after, change in compare_results(previous, result):
+                self.stdout.write(f'{name:<24}{metric:<16}{before:>10.2f} -> {after:<10.2f}{change:+.1f}%')
@@ -0,0 +1,47 @@
+import resource
+import sys
+from django.core.management.base import BaseCommand
+from pages import events
+from pages.benchmarks import scratch_database
+from users.synthetic import ClassroomSpec, generate_classroom
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds every derived table (scores, counters, timelines) from the submission event log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Events fetched per round trip and rows per bulk write')
+        parser.add_argument('--benchmark', type=int, metavar='EVENTS',
+                            help='Replay a generated log of about EVENTS events on a scratch database instead')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            self._benchmark(options['benchmark'], options['chunk_size'], options['seed'])
+            return
+
+        count, seconds = events.replay(chunk_size=options['chunk_size'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed {count} events in {seconds:.1f}s ({count / max(seconds, 1e-9):.0f} events/s).'))
+
+    def _benchmark(self, size, chunk_size, seed):
+        users = max(size // 100, 10)
+        spec = ClassroomSpec(users=users, challenges=100, solves=size // 4, attempts=size, seed=seed)
+
+        with scratch_database():
+            self.stdout.write(f'Generating {spec.attempts} attempts for {spec.users} users (seed={seed})...')
+            generate_classroom(spec)
+            rss_before = _peak_rss_mb()
+            count, seconds = events.replay(chunk_size=chunk_size, log=self.stdout.write)
+            rss_after = _peak_rss_mb()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed {count} events in {seconds:.1f}s ({count / max(seconds, 1e-9):.0f} events/s), '
+            f'peak RSS {rss_after:.0f} MB (+{rss_after - rss_before:.0f} MB during replay).'))
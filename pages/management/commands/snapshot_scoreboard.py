@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from pages import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Renders the scoreboard to static files for /spectate/ whenever it changes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Seconds between version checks (default: settings)')
+        parser.add_argument('--output-dir', help='Where to write the files (default: SCOREBOARD_SNAPSHOT_DIR)')
+        parser.add_argument('--once', action='store_true', help='Write one snapshot and exit')
+
+    def handle(self, *args, **options):
+        try:
+            snapshots.run(options['interval'], options['output_dir'], options['once'], log=self.stdout.write)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0007_alter_challenge_description_and_more'),
+        ('users', '0002_user_bio_user_country'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('correct', 'Correct flag'), ('incorrect', 'Incorrect flag'), ('lockout', 'Challenge locked')], max_length=10)),
+                ('timestamp', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('challenge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_events', to='pages.challenge')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['timestamp', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserScore',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_total', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('points', models.IntegerField(default=0)),
+                ('solves', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('wrong_attempts', models.PositiveIntegerField(default=0)),
+                ('last_solve_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-points', '-solves'], name='pages_score_rank_idx')],
+            },
+        ),
+    ]
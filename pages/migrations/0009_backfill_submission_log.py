@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:35
+
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    """
+    Rebuilds the event log from existing Attempts (a lockout follows the
+    wrong attempt that used up max_attempts) and the score table from it.
+    """
+    Attempt = apps.get_model('pages', 'Attempt')
+    Challenge = apps.get_model('pages', 'Challenge')
+    SubmissionEvent = apps.get_model('pages', 'SubmissionEvent')
+    UserScore = apps.get_model('pages', 'UserScore')
+
+    challenges = {c.pk: c for c in Challenge.objects.all()}
+    counts = {}
+    totals = {}
+    batch = []
+
+    attempts = Attempt.objects.order_by('timestamp', 'id').values_list(
+        'user_id', 'challenge_id', 'is_correct', 'timestamp')
+    for user_id, challenge_id, is_correct, timestamp in attempts.iterator(chunk_size=5000):
+        challenge = challenges[challenge_id]
+        key = (user_id, challenge_id)
+        counts[key] = counts.get(key, 0) + 1
+
+        row = totals.setdefault(user_id, [0, 0, 0, 0, None])
+        row[2] += 1
+        if is_correct:
+            row[0] += challenge.points
+            row[1] += 1
+            row[4] = timestamp
+            batch.append(SubmissionEvent(user_id=user_id, challenge_id=challenge_id, kind='correct',
+                                         timestamp=timestamp))
+        else:
+            row[3] += 1
+            batch.append(SubmissionEvent(user_id=user_id, challenge_id=challenge_id, kind='incorrect',
+                                         timestamp=timestamp))
+            if challenge.max_attempts > 0 and counts[key] == challenge.max_attempts:
+                batch.append(SubmissionEvent(user_id=user_id, challenge_id=challenge_id, kind='lockout',
+                                             timestamp=timestamp))
+        if len(batch) >= 5000:
+            SubmissionEvent.objects.bulk_create(batch)
+            batch = []
+    SubmissionEvent.objects.bulk_create(batch)
+
+    UserScore.objects.bulk_create([
+        UserScore(user_id=user_id, points=p, solves=s, attempts=a, wrong_attempts=w, last_solve_at=last)
+        for user_id, (p, s, a, w, last) in totals.items()
+    ], batch_size=5000)
+
+
+def unfill(apps, schema_editor):
+    apps.get_model('pages', 'UserScore').objects.all().delete()
+    apps.get_model('pages', 'SubmissionEvent').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0008_submission_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, unfill),
+    ]
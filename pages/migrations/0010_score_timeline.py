@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0009_backfill_submission_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreTimeline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.IntegerField()),
+                ('solves', models.PositiveIntegerField()),
+                ('valid_from', models.DateTimeField()),
+                ('valid_to', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'valid_from'],
+                'indexes': [models.Index(fields=['valid_from', 'valid_to'], name='pages_timeline_range_idx'), models.Index(fields=['user', 'valid_from'], name='pages_timeline_user_idx')],
+            },
+        ),
+    ]
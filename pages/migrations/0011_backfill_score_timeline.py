@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:42
+
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    """Builds the score intervals from the correct submissions in the event log."""
+    Challenge = apps.get_model('pages', 'Challenge')
+    SubmissionEvent = apps.get_model('pages', 'SubmissionEvent')
+    ScoreTimeline = apps.get_model('pages', 'ScoreTimeline')
+
+    points_of = dict(Challenge.objects.values_list('id', 'points'))
+    open_rows = {}
+    closed = []
+
+    solves = SubmissionEvent.objects.filter(kind='correct').order_by('timestamp', 'id').values_list(
+        'user_id', 'challenge_id', 'timestamp')
+    for user_id, challenge_id, timestamp in solves.iterator(chunk_size=5000):
+        points, count, valid_from = open_rows.get(user_id, (0, 0, None))
+        if valid_from is not None:
+            closed.append(ScoreTimeline(user_id=user_id, points=points, solves=count,
+                                        valid_from=valid_from, valid_to=timestamp))
+        open_rows[user_id] = (points + points_of[challenge_id], count + 1, timestamp)
+        if len(closed) >= 5000:
+            ScoreTimeline.objects.bulk_create(closed)
+            closed = []
+
+    closed.extend(
+        ScoreTimeline(user_id=user_id, points=points, solves=count, valid_from=valid_from)
+        for user_id, (points, count, valid_from) in open_rows.items()
+    )
+    ScoreTimeline.objects.bulk_create(closed, batch_size=5000)
+
+
+def unfill(apps, schema_editor):
+    apps.get_model('pages', 'ScoreTimeline').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0010_score_timeline'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, unfill),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0011_backfill_score_timeline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lockout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('locked_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-locked_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='solve',
+            index=models.Index(fields=['user', '-date'], name='pages_solve_recent_idx'),
+        ),
+        migrations.AddField(
+            model_name='lockout',
+            name='challenge',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lockouts', to='pages.challenge'),
+        ),
+        migrations.AddField(
+            model_name='lockout',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lockouts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='lockout',
+            index=models.Index(fields=['user', '-locked_at'], name='pages_lockout_recent_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='lockout',
+            constraint=models.UniqueConstraint(fields=('user', 'challenge'), name='pages_lockout_unique'),
+        ),
+    ]
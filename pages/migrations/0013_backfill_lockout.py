@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:46
+
+from django.db import migrations
+from django.db.models import Min
+
+
+def backfill(apps, schema_editor):
+    SubmissionEvent = apps.get_model('pages', 'SubmissionEvent')
+    Lockout = apps.get_model('pages', 'Lockout')
+
+    locks = SubmissionEvent.objects.filter(kind='lockout').order_by().values(
+        'user_id', 'challenge_id').annotate(locked_at=Min('timestamp'))
+    Lockout.objects.bulk_create([Lockout(**row) for row in locks.iterator()], batch_size=5000)
+
+
+def unfill(apps, schema_editor):
+    apps.get_model('pages', 'Lockout').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0012_lockout'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, unfill),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0013_backfill_lockout'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChallengeStats',
+            fields=[
+                ('challenge', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='pages.challenge')),
+                ('solves', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('wrong_attempts', models.PositiveIntegerField(default=0)),
+                ('attempters', models.PositiveIntegerField(default=0)),
+                ('first_blood_at', models.DateTimeField(blank=True, null=True)),
+                ('median_solve_at', models.DateTimeField(blank=True, null=True)),
+                ('solve_times', models.JSONField(default=list)),
+                ('first_blood_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='first_bloods', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Challenge stats',
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:47
+
+import statistics
+from datetime import datetime, timezone
+
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    SubmissionEvent = apps.get_model('pages', 'SubmissionEvent')
+    ChallengeStats = apps.get_model('pages', 'ChallengeStats')
+
+    stats = {}
+    seen = set()
+    events = SubmissionEvent.objects.exclude(kind='lockout').order_by('timestamp', 'id').values_list(
+        'user_id', 'challenge_id', 'kind', 'timestamp')
+    for user_id, challenge_id, kind, timestamp in events.iterator(chunk_size=5000):
+        row = stats.get(challenge_id)
+        if row is None:
+            row = stats[challenge_id] = ChallengeStats(challenge_id=challenge_id, solve_times=[])
+        row.attempts += 1
+        if (user_id, challenge_id) not in seen:
+            seen.add((user_id, challenge_id))
+            row.attempters += 1
+        if kind == 'correct':
+            row.solves += 1
+            if row.first_blood_at is None:
+                row.first_blood_user_id = user_id
+                row.first_blood_at = timestamp
+            row.solve_times.append(timestamp.timestamp())
+        else:
+            row.wrong_attempts += 1
+
+    for row in stats.values():
+        if row.solve_times:
+            row.median_solve_at = datetime.fromtimestamp(statistics.median(row.solve_times), tz=timezone.utc)
+    ChallengeStats.objects.bulk_create(stats.values(), batch_size=5000)
+
+
+def unfill(apps, schema_editor):
+    apps.get_model('pages', 'ChallengeStats').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0014_challenge_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, unfill),
+    ]
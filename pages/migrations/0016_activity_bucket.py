@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0015_backfill_challenge_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minute', models.DateTimeField(unique=True)),
+                ('solves', models.PositiveIntegerField(default=0)),
+                ('wrong_attempts', models.PositiveIntegerField(default=0)),
+                ('lockouts', models.PositiveIntegerField(default=0)),
+                ('active_users', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['minute'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:49
+
+from django.db import migrations
+
+FIELDS = {'correct': 'solves', 'incorrect': 'wrong_attempts', 'lockout': 'lockouts'}
+
+
+def backfill(apps, schema_editor):
+    SubmissionEvent = apps.get_model('pages', 'SubmissionEvent')
+    ActivityBucket = apps.get_model('pages', 'ActivityBucket')
+
+    buckets = []
+    bucket, users = None, set()
+    events = SubmissionEvent.objects.order_by('timestamp', 'id').values_list('user_id', 'kind', 'timestamp')
+    for user_id, kind, timestamp in events.iterator(chunk_size=5000):
+        minute = timestamp.replace(second=0, microsecond=0)
+        if bucket is None or bucket.minute != minute:
+            bucket, users = ActivityBucket(minute=minute), set()
+            buckets.append(bucket)
+        setattr(bucket, FIELDS[kind], getattr(bucket, FIELDS[kind]) + 1)
+        if kind != 'lockout' and user_id not in users:
+            users.add(user_id)
+            bucket.active_users += 1
+    ActivityBucket.objects.bulk_create(buckets, batch_size=5000)
+
+
+def unfill(apps, schema_editor):
+    apps.get_model('pages', 'ActivityBucket').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0016_activity_bucket'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, unfill),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0017_backfill_activity_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challenge',
+            name='decay',
+            field=models.PositiveIntegerField(default=0, help_text='Solves until the value reaches the minimum'),
+        ),
+        migrations.AddField(
+            model_name='challenge',
+            name='dynamic',
+            field=models.BooleanField(default=False, help_text='Value decays as more users solve it'),
+        ),
+        migrations.AddField(
+            model_name='challenge',
+            name='initial_points',
+            field=models.IntegerField(default=100, help_text='Value before the first solve'),
+        ),
+        migrations.AddField(
+            model_name='challenge',
+            name='minimum_points',
+            field=models.PositiveIntegerField(default=0, help_text='Lowest value after decay'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:02
+
+from django.db import migrations
+from django.db.models import F
+
+
+def backfill(apps, schema_editor):
+    """Existing challenges are static: their starting value is their value."""
+    Challenge = apps.get_model('pages', 'Challenge')
+    Challenge.objects.update(initial_points=F('points'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0018_challenge_dynamic_scoring'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
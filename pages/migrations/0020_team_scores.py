@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0019_backfill_initial_points'),
+        ('users', '0003_team_user_team'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submissionevent',
+            name='team',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='users.team'),
+        ),
+        migrations.CreateModel(
+            name='TeamScore',
+            fields=[
+                ('team', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_total', serialize=False, to='users.team')),
+                ('points', models.IntegerField(default=0)),
+                ('solves', models.PositiveIntegerField(default=0)),
+                ('last_solve_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-points', '-solves'], name='pages_team_rank_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamSolve',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('solved_at', models.DateTimeField()),
+                ('challenge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_solves', to='pages.challenge')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_solves', to='users.team')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('team', 'challenge')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamTimeline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.IntegerField()),
+                ('solves', models.PositiveIntegerField()),
+                ('valid_from', models.DateTimeField()),
+                ('valid_to', models.DateTimeField(blank=True, null=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_timeline', to='users.team')),
+            ],
+            options={
+                'ordering': ['team', 'valid_from'],
+                'indexes': [models.Index(fields=['valid_from', 'valid_to'], name='pages_team_timeline_range_idx'), models.Index(fields=['team', 'valid_from'], name='pages_team_timeline_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0006_lessons'),
+        ('pages', '0020_team_scores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solve',
+            name='lesson',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='solves', to='mentors.lessonsettings'),
+        ),
+        migrations.AddIndex(
+            model_name='solve',
+            index=models.Index(fields=['lesson', 'challenge', '-date'], name='pages_solve_lesson_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solve',
+            index=models.Index(fields=['lesson', '-date'], name='pages_solve_lesson_recent_idx'),
+        ),
+    ]
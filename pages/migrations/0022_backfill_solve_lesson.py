@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:12
+
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    """Every solve so far was made in the default lesson."""
+    Solve = apps.get_model('pages', 'Solve')
+    Solve.objects.update(lesson_id=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0021_solve_lesson'),
+        ('mentors', '0007_backfill_lesson_memberships'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:17
+
+from django.db import migrations
+
+# Kept in step with pages/search.py
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE pages_challenge_fts USING fts5(
+        title, description, category, tokenize = 'unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER pages_challenge_fts_insert AFTER INSERT ON pages_challenge BEGIN
+        INSERT INTO pages_challenge_fts (rowid, title, description, category)
+        VALUES (new.id, new.title, new.description,
+                (SELECT name FROM pages_category WHERE id = new.category_id));
+    END""",
+    """CREATE TRIGGER pages_challenge_fts_update AFTER UPDATE OF title, description, category_id
+    ON pages_challenge BEGIN
+        DELETE FROM pages_challenge_fts WHERE rowid = old.id;
+        INSERT INTO pages_challenge_fts (rowid, title, description, category)
+        VALUES (new.id, new.title, new.description,
+                (SELECT name FROM pages_category WHERE id = new.category_id));
+    END""",
+    """CREATE TRIGGER pages_challenge_fts_delete AFTER DELETE ON pages_challenge BEGIN
+        DELETE FROM pages_challenge_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER pages_category_fts_rename AFTER UPDATE OF name ON pages_category BEGIN
+        UPDATE pages_challenge_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM pages_challenge WHERE category_id = new.id);
+    END""",
+    """INSERT INTO pages_challenge_fts (rowid, title, description, category)
+        SELECT c.id, c.title, c.description, k.name
+        FROM pages_challenge c LEFT JOIN pages_category k ON k.id = c.category_id""",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS pages_category_fts_rename',
+    'DROP TRIGGER IF EXISTS pages_challenge_fts_delete',
+    'DROP TRIGGER IF EXISTS pages_challenge_fts_update',
+    'DROP TRIGGER IF EXISTS pages_challenge_fts_insert',
+    'DROP TABLE IF EXISTS pages_challenge_fts',
+]
+
+POSTGRES_FORWARD = [
+    """CREATE INDEX pages_challenge_search_idx ON pages_challenge USING gin (
+        to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '')))""",
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS pages_challenge_search_idx',
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0022_backfill_solve_lesson'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
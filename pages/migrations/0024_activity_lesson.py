@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0011_backfill_lessontemplate_totals'),
+        ('pages', '0023_challenge_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitybucket',
+            name='lesson',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mentors.lessonsettings'),
+        ),
+        migrations.AddField(
+            model_name='submissionevent',
+            name='lesson',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mentors.lessonsettings'),
+        ),
+        migrations.AlterField(
+            model_name='activitybucket',
+            name='minute',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddConstraint(
+            model_name='activitybucket',
+            constraint=models.UniqueConstraint(fields=('lesson', 'minute'), name='pages_activity_lesson_minute_uniq'),
+        ),
+    ]
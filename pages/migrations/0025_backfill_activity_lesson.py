@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:34
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, TruncMinute
+
+
+def backfill(apps, schema_editor):
+    """
+    Past submissions count for the submitter's lesson (the default one
+    without a membership); the minute buckets are regrouped per lesson.
+    """
+    SubmissionEvent = apps.get_model('pages', 'SubmissionEvent')
+    ActivityBucket = apps.get_model('pages', 'ActivityBucket')
+    LessonMembership = apps.get_model('mentors', 'LessonMembership')
+
+    membership = LessonMembership.objects.filter(user_id=OuterRef('user_id')).values('lesson_id')[:1]
+    SubmissionEvent.objects.update(lesson_id=Coalesce(Subquery(membership), Value(1)))
+
+    ActivityBucket.objects.all().delete()
+    rows = SubmissionEvent.objects.annotate(minute=TruncMinute('timestamp')).order_by().values(
+        'lesson_id', 'minute').annotate(
+        solves=Count('id', filter=Q(kind='correct')),
+        wrong_attempts=Count('id', filter=Q(kind='incorrect')),
+        lockouts=Count('id', filter=Q(kind='lockout')),
+        active_users=Count('user_id', distinct=True, filter=~Q(kind='lockout')),
+    )
+    ActivityBucket.objects.bulk_create((ActivityBucket(**row) for row in rows.iterator(chunk_size=5000)),
+                                       batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0024_activity_lesson'),
+        ('mentors', '0007_backfill_lesson_memberships'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:51
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0025_backfill_activity_lesson'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='challengestats',
+            name='median_solve_at',
+        ),
+        migrations.RemoveField(
+            model_name='challengestats',
+            name='solve_times',
+        ),
+    ]
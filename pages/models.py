@@ -1,5 +1,8 @@
+import math
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -29,18 +32,45 @@ class Challenge(models.Model):
     max_attempts = models.PositiveIntegerField(default=0, help_text="0 = infinity")
     is_active = models.BooleanField(default=True)
 
+    # Dynamic scoring: `points` is the current value, recomputed on every solve (pages/scoring.py)
+    dynamic = models.BooleanField(default=False, help_text="Value decays as more users solve it")
+    initial_points = models.IntegerField(default=100, help_text="Value before the first solve")
+    minimum_points = models.PositiveIntegerField(default=0, help_text="Lowest value after decay")
+    decay = models.PositiveIntegerField(default=0, help_text="Solves until the value reaches the minimum")
+
     def __str__(self):
         return f"{self.title} ({self.points})"
 
+    def decayed_value(self, solves):
+        """
+        CTFd-style parabolic decay: the first solver sees initial_points, the
+        value reaches minimum_points after `decay` more solves.
+        """
+        if not self.dynamic:
+            return self.points
+        if not self.decay:
+            return self.initial_points
+        spent = max(solves - 1, 0)
+        value = self.initial_points - (self.initial_points - self.minimum_points) * spent * spent / self.decay ** 2
+        return max(math.ceil(value), self.minimum_points)
+
 
 class Solve(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='solves')
     challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE, related_name='solves')
+    # The lesson the solve was made in: solver lists and mentor feeds are per lesson
+    lesson = models.ForeignKey('mentors.LessonSettings', on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='solves')
     date = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ('user', 'challenge')
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['user', '-date'], name='pages_solve_recent_idx'),
+            models.Index(fields=['lesson', 'challenge', '-date'], name='pages_solve_lesson_idx'),
+            models.Index(fields=['lesson', '-date'], name='pages_solve_lesson_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} -> {self.challenge.title}"
@@ -54,4 +84,206 @@ class Attempt(models.Model):
     is_correct = models.BooleanField(default=False)
 
     class Meta:
-        ordering = ['-timestamp']
\ No newline at end of file
+        ordering = ['-timestamp']
+
+class SubmissionEvent(models.Model):
+    """
+    Append-only log of what submit_flag decided. Every derived table
+    (see pages/projections.py) can be rebuilt from it with `replay_events`.
+    """
+    CORRECT = 'correct'
+    INCORRECT = 'incorrect'
+    LOCKOUT = 'lockout'
+    KIND_CHOICES = [
+        (CORRECT, 'Correct flag'),
+        (INCORRECT, 'Incorrect flag'),
+        (LOCKOUT, 'Challenge locked'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='submission_events')
+    challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE, related_name='submission_events')
+    # The submitter's team at that moment; later team changes do not move past solves
+    team = models.ForeignKey('users.Team', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # The lesson the submission was made in, for per-lesson analytics
+    lesson = models.ForeignKey('mentors.LessonSettings', on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='+')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['timestamp', 'id']
+
+    def __str__(self):
+        return f"{self.timestamp:%Y-%m-%d %H:%M:%S} {self.user_id} {self.kind} {self.challenge_id}"
+
+
+class UserScore(models.Model):
+    """
+    Derived: running totals per user, maintained at submission time.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                related_name='score_total')
+    points = models.IntegerField(default=0)
+    solves = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    wrong_attempts = models.PositiveIntegerField(default=0)
+    last_solve_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['-points', '-solves'], name='pages_score_rank_idx')]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.points}"
+
+
+class ScoreTimeline(models.Model):
+    """
+    Derived: cumulative score per user as validity intervals. A user's score
+    at time t is the row with valid_from <= t < valid_to (valid_to is NULL
+    for the current row), so a past ranking is a single range scan.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='score_timeline')
+    points = models.IntegerField()
+    solves = models.PositiveIntegerField()
+    valid_from = models.DateTimeField()
+    valid_to = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['user', 'valid_from']
+        indexes = [
+            models.Index(fields=['valid_from', 'valid_to'], name='pages_timeline_range_idx'),
+            models.Index(fields=['user', 'valid_from'], name='pages_timeline_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.points} from {self.valid_from:%Y-%m-%d %H:%M:%S}"
+
+
+class Lockout(models.Model):
+    """
+    Derived: a challenge a user has locked by using up max_attempts,
+    with the time of the attempt that locked it.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='lockouts')
+    challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE, related_name='lockouts')
+    locked_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-locked_at']
+        constraints = [models.UniqueConstraint(fields=['user', 'challenge'], name='pages_lockout_unique')]
+        indexes = [models.Index(fields=['user', '-locked_at'], name='pages_lockout_recent_idx')]
+
+    def __str__(self):
+        return f"{self.user_id} locked {self.challenge_id} at {self.locked_at:%Y-%m-%d %H:%M:%S}"
+
+
+class ChallengeStats(models.Model):
+    """
+    Derived: per-challenge counters maintained at submission time with
+    F() updates. Median solve times are per lesson and read from Solve
+    (see mentors.activity.median_times_to_solve).
+    """
+    challenge = models.OneToOneField(Challenge, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    solves = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    wrong_attempts = models.PositiveIntegerField(default=0)
+    attempters = models.PositiveIntegerField(default=0)
+    first_blood_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                         related_name='first_bloods')
+    first_blood_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Challenge stats'
+
+    def __str__(self):
+        return f"{self.challenge_id}: {self.solves} solves"
+
+    @property
+    def wrong_ratio(self):
+        return self.wrong_attempts / self.attempts if self.attempts else 0.0
+
+    @property
+    def solve_rate(self):
+        """Share of the users who tried the challenge that solved it."""
+        return self.solves / self.attempters if self.attempters else 0.0
+
+
+class ActivityBucket(models.Model):
+    """
+    Derived: submission activity per lesson and minute (live dashboard
+    analytics). `active_users` counts distinct users who submitted during
+    the minute.
+    """
+    lesson = models.ForeignKey('mentors.LessonSettings', on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='+')
+    minute = models.DateTimeField()
+    solves = models.PositiveIntegerField(default=0)
+    wrong_attempts = models.PositiveIntegerField(default=0)
+    lockouts = models.PositiveIntegerField(default=0)
+    active_users = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['minute']
+        constraints = [
+            models.UniqueConstraint(fields=['lesson', 'minute'], name='pages_activity_lesson_minute_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.minute:%Y-%m-%d %H:%M}: {self.solves} solves, {self.active_users} active"
+
+
+class TeamSolve(models.Model):
+    """
+    Derived: the first solve of each challenge per team. Only these count
+    for the team, later solves by teammates add nothing.
+    """
+    team = models.ForeignKey('users.Team', on_delete=models.CASCADE, related_name='team_solves')
+    challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE, related_name='team_solves')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='+')
+    solved_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('team', 'challenge')
+
+    def __str__(self):
+        return f"{self.team_id} -> {self.challenge_id}"
+
+
+class TeamScore(models.Model):
+    """
+    Derived: running team totals, maintained at submission time.
+    """
+    team = models.OneToOneField('users.Team', on_delete=models.CASCADE, primary_key=True,
+                                related_name='score_total')
+    points = models.IntegerField(default=0)
+    solves = models.PositiveIntegerField(default=0)
+    last_solve_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['-points', '-solves'], name='pages_team_rank_idx')]
+
+    def __str__(self):
+        return f"{self.team_id}: {self.points}"
+
+
+class TeamTimeline(models.Model):
+    """
+    Derived: cumulative team score as validity intervals, same layout as
+    ScoreTimeline so the scoreboard pipeline can rank either.
+    """
+    team = models.ForeignKey('users.Team', on_delete=models.CASCADE, related_name='score_timeline')
+    points = models.IntegerField()
+    solves = models.PositiveIntegerField()
+    valid_from = models.DateTimeField()
+    valid_to = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['team', 'valid_from']
+        indexes = [
+            models.Index(fields=['valid_from', 'valid_to'], name='pages_team_timeline_range_idx'),
+            models.Index(fields=['team', 'valid_from'], name='pages_team_timeline_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.team_id}: {self.points} from {self.valid_from:%Y-%m-%d %H:%M:%S}"
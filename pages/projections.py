@@ -0,0 +1,413 @@
+"""
+Derived tables built from the submission event log.
+Imported by PagesConfig.ready() so every projection is registered.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, Exists, F, Max, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .events import EventRow, Projection, register
+from .models import (
+    ActivityBucket, Challenge, ChallengeStats, Lockout, ScoreTimeline, SubmissionEvent, TeamScore, TeamSolve,
+    TeamTimeline, UserScore,
+)
+
+
+def minute_of(timestamp):
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def _per_user(events, aggregate):
+    """Correlated subquery: `aggregate` over `events` for the outer UserScore's user."""
+    return Coalesce(Subquery(
+        events.filter(user_id=OuterRef('user_id')).order_by().values('user_id')
+        .annotate(value=aggregate).values('value')[:1]
+    ), Value(0))
+
+
+@register
+class UserScoreProjection(Projection):
+    models = (UserScore,)
+
+    def apply(self, event, challenge):
+        if event.kind == SubmissionEvent.LOCKOUT:
+            return
+        if event.kind == SubmissionEvent.CORRECT:
+            changes = dict(points=F('points') + challenge.points, solves=F('solves') + 1,
+                           attempts=F('attempts') + 1, last_solve_at=event.timestamp)
+        else:
+            changes = dict(attempts=F('attempts') + 1, wrong_attempts=F('wrong_attempts') + 1)
+
+        if not UserScore.objects.filter(user_id=event.user_id).update(**changes):
+            UserScore.objects.get_or_create(user_id=event.user_id)
+            UserScore.objects.filter(user_id=event.user_id).update(**changes)
+
+    def discard_challenges(self, challenge_ids):
+        events = SubmissionEvent.objects.filter(challenge_id__in=challenge_ids)
+        correct = events.filter(kind=SubmissionEvent.CORRECT)
+        attempts = events.exclude(kind=SubmissionEvent.LOCKOUT)
+        remaining = SubmissionEvent.objects.filter(
+            user_id=OuterRef('user_id'), kind=SubmissionEvent.CORRECT
+        ).exclude(challenge_id__in=challenge_ids).order_by('-timestamp')
+
+        UserScore.objects.filter(user__in=events.values('user_id')).update(
+            points=F('points') - _per_user(correct, Sum('challenge__points')),
+            solves=F('solves') - _per_user(correct, Count('id')),
+            attempts=F('attempts') - _per_user(attempts, Count('id')),
+            wrong_attempts=F('wrong_attempts') - _per_user(
+                attempts, Count('id', filter=Q(kind=SubmissionEvent.INCORRECT))),
+            last_solve_at=Subquery(remaining.values('timestamp')[:1]),
+        )
+
+    def rescore(self, challenge_id, delta):
+        # Solve is unique per (user, challenge), so each solver has exactly one correct event
+        solvers = SubmissionEvent.objects.filter(challenge_id=challenge_id, kind=SubmissionEvent.CORRECT)
+        UserScore.objects.filter(user__in=solvers.values('user_id')).update(points=F('points') + delta)
+
+    def replay_start(self):
+        # user_id -> [points, solves, attempts, wrong_attempts, last_solve_at]
+        self.totals = {}
+
+    def replay(self, event, challenge):
+        if event.kind == SubmissionEvent.LOCKOUT:
+            return
+        row = self.totals.setdefault(event.user_id, [0, 0, 0, 0, None])
+        row[2] += 1
+        if event.kind == SubmissionEvent.CORRECT:
+            row[0] += challenge.points
+            row[1] += 1
+            row[4] = event.timestamp
+        else:
+            row[3] += 1
+
+    def replay_finish(self):
+        UserScore.objects.bulk_create(
+            (UserScore(user_id=user_id, points=p, solves=s, attempts=a, wrong_attempts=w, last_solve_at=last)
+             for user_id, (p, s, a, w, last) in self.totals.items()),
+            batch_size=self.chunk_size,
+        )
+        self.totals = {}
+
+
+@register
+class ScoreTimelineProjection(Projection):
+    """
+    Cumulative score intervals per user, one row per solve. The open row
+    (valid_to IS NULL) is the current score.
+    """
+    models = (ScoreTimeline,)
+
+    def apply(self, event, challenge):
+        if event.kind != SubmissionEvent.CORRECT:
+            return
+        current = ScoreTimeline.objects.filter(user_id=event.user_id, valid_to__isnull=True)
+        points, solves = current.values_list('points', 'solves').first() or (0, 0)
+        current.update(valid_to=event.timestamp)
+        ScoreTimeline.objects.create(user_id=event.user_id, points=points + challenge.points,
+                                     solves=solves + 1, valid_from=event.timestamp)
+
+    def discard_challenges(self, challenge_ids):
+        # Every later interval of an affected user shifts, so rebuild those users
+        user_ids = list(SubmissionEvent.objects.filter(
+            challenge_id__in=challenge_ids, kind=SubmissionEvent.CORRECT
+        ).order_by().values_list('user_id', flat=True).distinct())
+        ScoreTimeline.objects.filter(user_id__in=user_ids).delete()
+
+        challenges = Challenge.objects.in_bulk()
+        rows = SubmissionEvent.objects.filter(
+            user_id__in=user_ids, kind=SubmissionEvent.CORRECT
+        ).exclude(challenge_id__in=challenge_ids).order_by('timestamp', 'id').values_list(*EventRow._fields)
+
+        self.replay_start()
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            event = EventRow(*row)
+            self.replay(event, challenges[event.challenge_id])
+        self.replay_finish()
+
+    def rescore(self, challenge_id, delta):
+        # Intervals are cumulative: every one starting at or after the solve includes it
+        correct = SubmissionEvent.objects.filter(challenge_id=challenge_id, kind=SubmissionEvent.CORRECT)
+        ScoreTimeline.objects.filter(user__in=correct.values('user_id')).filter(Exists(
+            correct.filter(user_id=OuterRef('user_id'), timestamp__lte=OuterRef('valid_from'))
+        )).update(points=F('points') + delta)
+
+    def replay_start(self):
+        # user_id -> (points, solves, valid_from) of the open interval
+        self.open = {}
+        self.closed = []
+
+    def replay(self, event, challenge):
+        if event.kind != SubmissionEvent.CORRECT:
+            return
+        points, solves, valid_from = self.open.get(event.user_id, (0, 0, None))
+        if valid_from is not None:
+            self.closed.append(ScoreTimeline(user_id=event.user_id, points=points, solves=solves,
+                                             valid_from=valid_from, valid_to=event.timestamp))
+            if len(self.closed) >= self.chunk_size:
+                ScoreTimeline.objects.bulk_create(self.closed)
+                self.closed = []
+        self.open[event.user_id] = (points + challenge.points, solves + 1, event.timestamp)
+
+    def replay_finish(self):
+        self.closed.extend(
+            ScoreTimeline(user_id=user_id, points=points, solves=solves, valid_from=valid_from)
+            for user_id, (points, solves, valid_from) in self.open.items()
+        )
+        ScoreTimeline.objects.bulk_create(self.closed, batch_size=self.chunk_size)
+        self.open, self.closed = {}, []
+
+
+@register
+class LockoutProjection(Projection):
+    models = (Lockout,)
+
+    def apply(self, event, challenge):
+        if event.kind == SubmissionEvent.LOCKOUT:
+            Lockout.objects.get_or_create(user_id=event.user_id, challenge_id=event.challenge_id,
+                                          defaults={'locked_at': event.timestamp})
+
+    def replay_start(self):
+        self.buffer = []
+
+    def replay(self, event, challenge):
+        if event.kind != SubmissionEvent.LOCKOUT:
+            return
+        self.buffer.append(Lockout(user_id=event.user_id, challenge_id=event.challenge_id,
+                                   locked_at=event.timestamp))
+        if len(self.buffer) >= self.chunk_size:
+            self.replay_finish()
+
+    def replay_finish(self):
+        # Events arrive in time order, so on a duplicate the earliest lock wins
+        Lockout.objects.bulk_create(self.buffer, ignore_conflicts=True)
+        self.buffer = []
+
+
+@register
+class ChallengeStatsProjection(Projection):
+    models = (ChallengeStats,)
+
+    def apply(self, event, challenge):
+        if event.kind == SubmissionEvent.LOCKOUT:
+            return
+        first_try = not SubmissionEvent.objects.filter(
+            user_id=event.user_id, challenge_id=event.challenge_id
+        ).exclude(pk=event.pk).exists()
+        field = 'solves' if event.kind == SubmissionEvent.CORRECT else 'wrong_attempts'
+        changes = {'attempts': F('attempts') + 1, field: F(field) + 1}
+        if first_try:
+            changes['attempters'] = F('attempters') + 1
+
+        stats = ChallengeStats.objects.filter(challenge_id=event.challenge_id)
+        if not stats.update(**changes):
+            ChallengeStats.objects.get_or_create(challenge_id=event.challenge_id)
+            stats.update(**changes)
+        if event.kind == SubmissionEvent.CORRECT:
+            # Only moves when this solve is earlier than the recorded one
+            stats.filter(Q(first_blood_at__isnull=True) | Q(first_blood_at__gt=event.timestamp)).update(
+                first_blood_user_id=event.user_id, first_blood_at=event.timestamp)
+
+    def _count(self, stats, event, first_try):
+        stats.attempts += 1
+        stats.attempters += first_try
+        if event.kind == SubmissionEvent.CORRECT:
+            stats.solves += 1
+            if stats.first_blood_at is None or event.timestamp < stats.first_blood_at:
+                stats.first_blood_user_id = event.user_id
+                stats.first_blood_at = event.timestamp
+        else:
+            stats.wrong_attempts += 1
+
+    def replay_start(self):
+        self.stats = {}
+        self.seen = set()
+
+    def replay(self, event, challenge):
+        if event.kind == SubmissionEvent.LOCKOUT:
+            return
+        stats = self.stats.get(event.challenge_id)
+        if stats is None:
+            stats = self.stats[event.challenge_id] = ChallengeStats(challenge_id=event.challenge_id)
+        pair = (event.user_id, event.challenge_id)
+        self._count(stats, event, pair not in self.seen)
+        self.seen.add(pair)
+
+    def replay_finish(self):
+        ChallengeStats.objects.bulk_create(self.stats.values(), batch_size=self.chunk_size)
+        self.stats, self.seen = {}, set()
+
+
+@register
+class ActivityProjection(Projection):
+    models = (ActivityBucket,)
+
+    FIELDS = {
+        SubmissionEvent.CORRECT: 'solves',
+        SubmissionEvent.INCORRECT: 'wrong_attempts',
+        SubmissionEvent.LOCKOUT: 'lockouts',
+    }
+
+    def apply(self, event, challenge):
+        minute = minute_of(event.timestamp)
+        field = self.FIELDS[event.kind]
+        changes = {field: F(field) + 1}
+        if event.kind != SubmissionEvent.LOCKOUT and not SubmissionEvent.objects.filter(
+                user_id=event.user_id, lesson_id=event.lesson_id, timestamp__gte=minute, timestamp__lte=event.timestamp
+        ).exclude(pk=event.pk).exists():
+            changes['active_users'] = F('active_users') + 1
+
+        bucket = ActivityBucket.objects.filter(lesson_id=event.lesson_id, minute=minute)
+        if not bucket.update(**changes):
+            ActivityBucket.objects.get_or_create(lesson_id=event.lesson_id, minute=minute)
+            bucket.update(**changes)
+
+    def discard_challenges(self, challenge_ids):
+        # Recount the affected minutes from the events that remain
+        window = SubmissionEvent.objects.filter(challenge_id__in=challenge_ids).aggregate(
+            first=Min('timestamp'), last=Max('timestamp'))
+        if window['first'] is None:
+            return
+        first = minute_of(window['first'])
+        ActivityBucket.objects.filter(minute__gte=first, minute__lte=window['last']).delete()
+
+        rows = SubmissionEvent.objects.filter(
+            timestamp__gte=first, timestamp__lt=minute_of(window['last']) + timedelta(minutes=1)
+        ).exclude(challenge_id__in=challenge_ids).order_by('timestamp', 'id').values_list(*EventRow._fields)
+        self.replay_start()
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            self.replay(EventRow(*row), None)
+        self.replay_finish()
+
+    def replay_start(self):
+        # Events come in time order: only the current minute is open, one bucket per lesson
+        self.minute = None
+        self.buckets = {}
+        self.users = {}
+        self.buffer = []
+
+    def replay(self, event, challenge):
+        minute = minute_of(event.timestamp)
+        if minute != self.minute:
+            self._close()
+            self.minute = minute
+        bucket = self.buckets.get(event.lesson_id)
+        if bucket is None:
+            bucket = self.buckets[event.lesson_id] = ActivityBucket(lesson_id=event.lesson_id, minute=minute)
+            self.users[event.lesson_id] = set()
+        field = self.FIELDS[event.kind]
+        setattr(bucket, field, getattr(bucket, field) + 1)
+        users = self.users[event.lesson_id]
+        if event.kind != SubmissionEvent.LOCKOUT and event.user_id not in users:
+            users.add(event.user_id)
+            bucket.active_users += 1
+
+    def _close(self):
+        self.buffer.extend(self.buckets.values())
+        self.buckets, self.users = {}, {}
+        if len(self.buffer) >= self.chunk_size:
+            ActivityBucket.objects.bulk_create(self.buffer)
+            self.buffer = []
+
+    def replay_finish(self):
+        self._close()
+        ActivityBucket.objects.bulk_create(self.buffer)
+        self.minute, self.buffer = None, []
+
+
+@register
+class TeamScoreProjection(Projection):
+    """
+    Team totals and score intervals. Only a team's first solve of a
+    challenge counts; the team is the one recorded on the event, so
+    switching teams later does not move points.
+    """
+    models = (TeamTimeline, TeamScore, TeamSolve)
+
+    def apply(self, event, challenge):
+        if event.kind != SubmissionEvent.CORRECT or event.team_id is None:
+            return
+        _, created = TeamSolve.objects.get_or_create(
+            team_id=event.team_id, challenge_id=event.challenge_id,
+            defaults={'user_id': event.user_id, 'solved_at': event.timestamp})
+        if not created:
+            return
+
+        changes = dict(points=F('points') + challenge.points, solves=F('solves') + 1, last_solve_at=event.timestamp)
+        if not TeamScore.objects.filter(team_id=event.team_id).update(**changes):
+            TeamScore.objects.get_or_create(team_id=event.team_id)
+            TeamScore.objects.filter(team_id=event.team_id).update(**changes)
+
+        current = TeamTimeline.objects.filter(team_id=event.team_id, valid_to__isnull=True)
+        points, solves = current.values_list('points', 'solves').first() or (0, 0)
+        current.update(valid_to=event.timestamp)
+        TeamTimeline.objects.create(team_id=event.team_id, points=points + challenge.points,
+                                    solves=solves + 1, valid_from=event.timestamp)
+
+    def discard_challenges(self, challenge_ids):
+        # A discarded first solve can't hand its place to a teammate's later solve of
+        # the same challenge (that is discarded too), so rebuild the affected teams
+        team_ids = list(TeamSolve.objects.filter(
+            challenge_id__in=challenge_ids).order_by().values_list('team_id', flat=True).distinct())
+        for model in self.models:
+            model.objects.filter(team_id__in=team_ids).delete()
+
+        challenges = Challenge.objects.in_bulk()
+        rows = SubmissionEvent.objects.filter(
+            team_id__in=team_ids, kind=SubmissionEvent.CORRECT
+        ).exclude(challenge_id__in=challenge_ids).order_by('timestamp', 'id').values_list(*EventRow._fields)
+
+        self.replay_start()
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            event = EventRow(*row)
+            self.replay(event, challenges[event.challenge_id])
+        self.replay_finish()
+
+    def rescore(self, challenge_id, delta):
+        solves = TeamSolve.objects.filter(challenge_id=challenge_id)
+        TeamScore.objects.filter(team__in=solves.values('team_id')).update(points=F('points') + delta)
+        TeamTimeline.objects.filter(team__in=solves.values('team_id')).filter(Exists(
+            solves.filter(team_id=OuterRef('team_id'), solved_at__lte=OuterRef('valid_from'))
+        )).update(points=F('points') + delta)
+
+    def replay_start(self):
+        # team_id -> (points, solves, valid_from) of the open interval
+        self.open = {}
+        self.closed = []
+        self.solves = []
+        self.seen = set()
+
+    def replay(self, event, challenge):
+        if event.kind != SubmissionEvent.CORRECT or event.team_id is None:
+            return
+        pair = (event.team_id, event.challenge_id)
+        if pair in self.seen:
+            return
+        self.seen.add(pair)
+        self.solves.append(TeamSolve(team_id=event.team_id, challenge_id=event.challenge_id,
+                                     user_id=event.user_id, solved_at=event.timestamp))
+
+        points, solves, valid_from = self.open.get(event.team_id, (0, 0, None))
+        if valid_from is not None:
+            self.closed.append(TeamTimeline(team_id=event.team_id, points=points, solves=solves,
+                                            valid_from=valid_from, valid_to=event.timestamp))
+        self.open[event.team_id] = (points + challenge.points, solves + 1, event.timestamp)
+
+        if len(self.solves) >= self.chunk_size:
+            TeamSolve.objects.bulk_create(self.solves)
+            TeamTimeline.objects.bulk_create(self.closed)
+            self.solves, self.closed = [], []
+
+    def replay_finish(self):
+        TeamSolve.objects.bulk_create(self.solves, batch_size=self.chunk_size)
+        self.closed.extend(
+            TeamTimeline(team_id=team_id, points=points, solves=solves, valid_from=valid_from)
+            for team_id, (points, solves, valid_from) in self.open.items()
+        )
+        TeamTimeline.objects.bulk_create(self.closed, batch_size=self.chunk_size)
+        TeamScore.objects.bulk_create(
+            (TeamScore(team_id=team_id, points=points, solves=solves, last_solve_at=valid_from)
+             for team_id, (points, solves, valid_from) in self.open.items()),
+            batch_size=self.chunk_size,
+        )
+        self.open, self.closed, self.solves, self.seen = {}, [], [], set()
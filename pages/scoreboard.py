@@ -0,0 +1,284 @@
+"""
+Scoreboard data built from the ScoreTimeline projection.
+
+`build_scoreboard(as_of)` returns the viewer-independent part (top 50 and
+the top 10 step series) and is cached per scoreboard version;
+`personalize` adds what depends on the viewer. With `as_of` every query
+becomes a range scan on the timeline, so a past ranking costs the same
+as the live one. A `Ranking` names the timeline and the competitors, so
+the team scoreboard (TeamTimeline) runs the same queries as the player one.
+With a `lesson` the competitors are narrowed through the lesson membership
+index, so every classroom gets its own board from the same tables.
+
+Chart series are step functions; `downsample_steps` caps each one at
+`resolution` points while keeping its first/last points and the exact
+values at every moment the chart's ranking changed.
+"""
+from bisect import bisect_right
+from datetime import datetime, time
+
+from django.db.models import Min, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from config.cache import SCOREBOARD, get_or_compute, versioned_key
+from mentors.models import LessonSettings
+from users.models import Team, User
+from .models import ScoreTimeline, TeamTimeline
+
+CHART_SIZE = 10
+LEADERBOARD_SIZE = 50
+
+# Points per chart series
+DEFAULT_RESOLUTION = 200
+MIN_RESOLUTION = 10
+MAX_RESOLUTION = 2000
+
+COLORS = [
+    '#9fef00', '#00d2ff', '#ff0055', '#ffe600', '#aa00ff',
+    '#ff6600', '#00ffaa', '#ff00aa', '#0066ff', '#ccff00'
+]
+
+
+def parse_as_of(value, lesson=None):
+    """
+    Parses the `as_of` query parameter: an ISO date/datetime (naive values
+    are in the current timezone) or `end` for the lesson's end_time.
+    Returns None for an empty value, raises ValueError if it can't be parsed.
+    """
+    if not value:
+        return None
+    if value == 'end':
+        end_time = (lesson or LessonSettings.get_settings()).end_time
+        if end_time is None:
+            raise ValueError('The lesson has no end time set.')
+        return end_time
+
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid as_of value: {value}')
+        moment = datetime.combine(day, time.max)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_resolution(value):
+    """`resolution` query parameter, clamped; the default for a missing or invalid value."""
+    try:
+        resolution = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_RESOLUTION
+    return min(max(resolution, MIN_RESOLUTION), MAX_RESOLUTION)
+
+
+def rank_changes(series):
+    """
+    x values at which the order of the given step series changes.
+    `series` maps a key to [(x, y), ...] sorted by x.
+    """
+    steps = sorted((x, key, y) for key, points in series.items() for x, y in points)
+    values = dict.fromkeys(series, 0)
+    order = list(series)
+    changes = []
+    i = 0
+    while i < len(steps):
+        x = steps[i][0]
+        while i < len(steps) and steps[i][0] == x:
+            values[steps[i][1]] = steps[i][2]
+            i += 1
+        new_order = sorted(series, key=lambda key: -values[key])
+        if new_order != order:
+            changes.append(x)
+            order = new_order
+    return changes
+
+
+def _evenly(items, count):
+    """`count` items spread over `items`, first and last included."""
+    if len(items) <= count:
+        return items
+    step = (len(items) - 1) / (count - 1)
+    return [items[round(i * step)] for i in range(count)]
+
+
+def downsample_steps(points, budget, keep_x=()):
+    """
+    Reduces a step series (drawn with stepped: 'after') to at most `budget`
+    points. Keeps the first and last points and, for every x in `keep_x`,
+    the point that defines the value at x. The rest of the budget goes to
+    equal-width x buckets, each represented by its last point, so the
+    value at every bucket boundary is exact and only intermediate steps
+    get merged.
+    """
+    if len(points) <= budget:
+        return points
+    xs = [x for x, _ in points]
+    protected = {0, len(points) - 1}
+    protected.update(max(bisect_right(xs, x) - 1, 0) for x in keep_x)
+    protected = sorted(protected)
+    if len(protected) >= budget:
+        return [points[i] for i in _evenly(protected, budget)]
+
+    buckets = budget - len(protected)
+    first, last = xs[0], xs[-1]
+    width = (last - first) / buckets or 1
+    picked = {}
+    for i, x in enumerate(xs):
+        picked[min(int((x - first) / width), buckets - 1)] = i
+    return [points[i] for i in sorted(set(protected) | set(picked.values()))]
+
+
+def students():
+    return User.objects.filter(is_superuser=False).exclude(groups__name='Mentors')
+
+
+def _is_student(user):
+    return user.is_authenticated and not user.is_superuser and not user.groups.filter(name='Mentors').exists()
+
+
+def _players(lesson=None):
+    if lesson is None:
+        return students()
+    return students().filter(lesson_memberships__lesson=lesson)
+
+
+def _teams(lesson=None):
+    if lesson is None:
+        return Team.objects.all()
+    return Team.objects.filter(members__lesson_memberships__lesson=lesson)
+
+
+class Ranking:
+    """
+    What a scoreboard ranks: `timeline` has one interval row per score
+    change of an `owner` (a FK name); `competitors(lesson)` is who may be
+    listed and `viewer(user)` is the owner id a visitor is highlighted as.
+    """
+    def __init__(self, name, timeline, owner, competitors, display, viewer):
+        self.name = name
+        self.timeline = timeline
+        self.owner = owner
+        self.key = f'{owner}_id'
+        self.competitors = competitors
+        self.display = display
+        self.viewer = viewer
+
+
+PLAYERS = Ranking('players', ScoreTimeline, 'user', _players, lambda user: user.username,
+                  lambda user: user.pk if _is_student(user) else None)
+TEAMS = Ranking('teams', TeamTimeline, 'team', _teams, lambda team: team.name,
+                lambda user: getattr(user, 'team_id', None))
+RANKINGS = {ranking.name: ranking for ranking in (PLAYERS, TEAMS)}
+
+
+def parse_ranking(value):
+    """`ranking` query parameter; players unless it names another ranking."""
+    return RANKINGS.get(value, PLAYERS)
+
+
+def timeline_at(as_of=None, ranking=PLAYERS):
+    """One timeline row per owner that had scored by `as_of` (None = now)."""
+    if as_of is None:
+        return ranking.timeline.objects.filter(valid_to__isnull=True)
+    return ranking.timeline.objects.filter(valid_from__lte=as_of).filter(
+        Q(valid_to__gt=as_of) | Q(valid_to__isnull=True)
+    )
+
+
+def _series(owner_ids, as_of, start, ranking=PLAYERS):
+    """Step series (seconds since `start`, points) per owner, up to `as_of`."""
+    rows = ranking.timeline.objects.filter(**{f'{ranking.key}__in': owner_ids})
+    if as_of is not None:
+        rows = rows.filter(valid_from__lte=as_of)
+    series = {owner_id: [(0, 0)] for owner_id in owner_ids}
+    for owner_id, valid_from, points in rows.order_by(ranking.key, 'valid_from').values_list(
+            ranking.key, 'valid_from', 'points'):
+        series[owner_id].append((max(int((valid_from - start).total_seconds()), 0), points))
+    return series
+
+
+def _compute(as_of, resolution, ranking, lesson):
+    competitors = {f'{ranking.owner}__in': ranking.competitors(lesson)}
+    standings = timeline_at(as_of, ranking).filter(points__gt=0, **competitors).select_related(
+        ranking.owner).order_by('-points', '-solves', 'valid_from')[:LEADERBOARD_SIZE]
+
+    leaderboard = []
+    for index, row in enumerate(standings, 1):
+        owner = getattr(row, ranking.owner)
+        leaderboard.append({
+            'rank': index,
+            ranking.key: owner.pk,
+            'user': ranking.display(owner),
+            'points': row.points,
+            'solved': row.solves,
+            'avatar': owner.avatar_url,
+        })
+
+    first = ranking.timeline.objects.filter(**competitors)
+    if as_of is not None:
+        first = first.filter(valid_from__lte=as_of)
+    start = first.aggregate(start=Min('valid_from'))['start'] or as_of or timezone.now()
+
+    chart_ids = [entry[ranking.key] for entry in leaderboard[:CHART_SIZE]]
+    series = _series(chart_ids, as_of, start, ranking)
+    changes = rank_changes(series)
+    return {
+        'leaderboard': leaderboard,
+        'chart': [(owner_id, downsample_steps(points, resolution, changes)) for owner_id, points in series.items()],
+        'start': start,
+        'resolution': resolution,
+    }
+
+
+def build_scoreboard(as_of=None, resolution=DEFAULT_RESOLUTION, ranking=PLAYERS, lesson=None):
+    """`lesson` None ranks the whole instance (the spectator snapshot does)."""
+    key = versioned_key(SCOREBOARD, 'board', ranking.name, lesson.pk if lesson else 'all',
+                        as_of.isoformat() if as_of else 'live', resolution)
+    return get_or_compute(key, lambda: _compute(as_of, resolution, ranking, lesson), timeout=300 if as_of else 30)
+
+
+def _dataset(label, points, color):
+    return {
+        'label': label,
+        'data': [{'x': x, 'y': y} for x, y in points],
+        'borderColor': color,
+        'backgroundColor': 'transparent',
+        'borderWidth': 2,
+        'tension': 0,
+        'pointRadius': 3,
+        'pointHoverRadius': 6,
+        'showLine': True,
+        'stepped': 'after'
+    }
+
+
+def personalize(board, user, as_of=None, ranking=PLAYERS):
+    """
+    Returns {'leaderboard': [...], 'graph': {...}} for `user`: marks their
+    row (their team's, on the team ranking) and adds its series to the
+    chart if it is outside the top 10.
+    """
+    own_id = ranking.viewer(user)
+    leaderboard = [dict(entry, isMe=own_id is not None and entry[ranking.key] == own_id)
+                   for entry in board['leaderboard']]
+    chart = list(board['chart'])
+    names = {entry[ranking.key]: entry['user'] for entry in leaderboard}
+    start = board['start']
+
+    if own_id is not None and own_id not in dict(chart):
+        own = timeline_at(as_of, ranking).filter(**{ranking.key: own_id, 'points__gt': 0}).select_related(
+            ranking.owner).first()
+        if own is not None:
+            points = _series([own_id], as_of, start, ranking)[own_id]
+            chart.append((own_id, downsample_steps(points, board['resolution'])))
+            names[own_id] = ranking.display(getattr(own, ranking.owner))
+
+    end = max(int(((as_of or timezone.now()) - start).total_seconds()), 0)
+    datasets = []
+    for i, (owner_id, points) in enumerate(chart):
+        datasets.append(_dataset(names[owner_id], points + [(end, points[-1][1])], COLORS[i % len(COLORS)]))
+
+    return {'leaderboard': leaderboard, 'graph': {'datasets': datasets}}
@@ -0,0 +1,81 @@
+"""
+Static and dynamic challenge values.
+
+A dynamic challenge stores its current value in `points`, like a static
+one, so every reader (projections, exports, max possible score) stays
+unchanged. After each solve `refresh` recomputes the value and, when it
+moved, shifts every solver's total with one UPDATE per derived table
+(events.rescore). Scoreboards keep reading precomputed rows.
+
+Corrections that take progress back (`revoke_solves`, `delete_users`)
+change the log and replay it, then give dynamic challenges their value
+back.
+"""
+from .events import replay, rescore
+from .models import Attempt, Challenge, ChallengeStats, SubmissionEvent
+
+
+def solve_count(challenge):
+    if challenge.pk is None:
+        return 0
+    return ChallengeStats.objects.filter(challenge=challenge).values_list('solves', flat=True).first() or 0
+
+
+def set_points(challenge, points):
+    """
+    Applies the Points value entered by a mentor: the value of a static
+    challenge or the starting value of a dynamic one. Does not save.
+    """
+    challenge.initial_points = points
+    challenge.points = challenge.decayed_value(solve_count(challenge)) if challenge.dynamic else points
+
+
+def refresh(challenge):
+    """
+    Recomputes a dynamic challenge's value after a solve. Call it inside
+    the submission transaction, with the challenge row locked, after the
+    solve was recorded. Returns the (possibly new) value.
+    """
+    if not challenge.dynamic:
+        return challenge.points
+    value = challenge.decayed_value(solve_count(challenge))
+    if value != challenge.points:
+        Challenge.objects.filter(pk=challenge.pk).update(points=value)
+        rescore({challenge.pk: value - challenge.points})
+        challenge.points = value
+    return value
+
+
+def _rebuild(challenge_ids):
+    replay()
+    for challenge in Challenge.objects.select_for_update().filter(pk__in=challenge_ids, dynamic=True):
+        refresh(challenge)
+
+
+def revoke_solves(solves):
+    """
+    Takes back wrongly credited solves (a Solve queryset): their correct
+    events and Attempts are turned into incorrect ones, the Solve rows are
+    deleted and every derived table is rebuilt from the corrected log.
+    Call it inside a transaction. Returns the number of solves revoked.
+    """
+    rows = list(solves.values_list('pk', 'user_id', 'challenge_id'))
+    for _, user_id, challenge_id in rows:
+        SubmissionEvent.objects.filter(user_id=user_id, challenge_id=challenge_id,
+                                       kind=SubmissionEvent.CORRECT).update(kind=SubmissionEvent.INCORRECT)
+        Attempt.objects.filter(user_id=user_id, challenge_id=challenge_id, is_correct=True).update(is_correct=False)
+    solves.model.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+    _rebuild({challenge_id for _, _, challenge_id in rows})
+    return len(rows)
+
+
+def delete_users(users):
+    """
+    Deletes `users` (a queryset) with their progress and events, then
+    rebuilds every derived table, team and challenge rows included, from
+    the remaining log. Call it inside a transaction.
+    """
+    solved = set(SubmissionEvent.objects.filter(user__in=users, kind=SubmissionEvent.CORRECT).values_list(
+        'challenge_id', flat=True))
+    users.delete()
+    _rebuild(solved)
@@ -0,0 +1,52 @@
+"""
+Full-text search over the challenge catalog (title, description, category).
+
+On SQLite the pages_challenge_fts FTS5 table is kept in step with
+pages_challenge and pages_category by triggers (migration 0023), so no
+Python code has to remember to reindex. On PostgreSQL the title and
+description go through a GIN expression index and the category name is
+matched directly. Other backends fall back to icontains. Every term must
+match; the last one also matches as a prefix, so results follow the
+mentor's typing.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TERM = re.compile(r'\w+', re.UNICODE)
+
+# At most this many terms reach the index
+MAX_TERMS = 8
+
+
+def terms(text):
+    return TERM.findall(text or '')[:MAX_TERMS]
+
+
+def _fts5_query(words):
+    # Quoted, so FTS5 operators (AND, NEAR, column filters) typed by a user stay plain words
+    quoted = ['"%s"' % word.replace('"', '""') for word in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search(queryset, text):
+    """Narrows a Challenge queryset to the rows matching `text`; blank text matches everything."""
+    words = terms(text)
+    if not words:
+        return queryset
+    if connection.vendor == 'sqlite':
+        return queryset.filter(pk__in=RawSQL(
+            'SELECT rowid FROM pages_challenge_fts WHERE pages_challenge_fts MATCH %s', [_fts5_query(words)]))
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(words[:-1] + [words[-1] + ':*'])
+        indexed = RawSQL(
+            "SELECT id FROM pages_challenge WHERE to_tsvector('simple', coalesce(title, '') || ' ' || "
+            "coalesce(description, '')) @@ to_tsquery('simple', %s)", [tsquery])
+        return queryset.filter(Q(pk__in=indexed) | Q(category__name__icontains=' '.join(words)))
+    condition = Q()
+    for word in words:
+        condition &= Q(title__icontains=word) | Q(description__icontains=word) | Q(category__name__icontains=word)
+    return queryset.filter(condition)
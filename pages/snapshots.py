@@ -0,0 +1,75 @@
+"""
+Static scoreboard snapshots for projectors and spectators.
+
+`run` checks the scoreboard version every few seconds and, only when it
+changed, writes scoreboard.json and index.html to SCOREBOARD_SNAPSHOT_DIR.
+The spectator views just stream those files, so spectator traffic never
+reaches the ORM no matter how many screens are open.
+"""
+import json
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from config.cache import SCOREBOARD, get_version
+from .scoreboard import build_scoreboard, personalize
+
+JSON_NAME = 'scoreboard.json'
+HTML_NAME = 'index.html'
+
+
+def _atomic_write(path, content):
+    """Readers see either the old or the new file, never a partial one."""
+    directory = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            fh.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_snapshot(directory=None, version=None):
+    directory = directory or settings.SCOREBOARD_SNAPSHOT_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    data = personalize(build_scoreboard(), AnonymousUser())
+    data['version'] = version if version is not None else get_version(SCOREBOARD)
+    data['generated_at'] = timezone.now()
+
+    _atomic_write(os.path.join(directory, JSON_NAME), json.dumps(data, cls=DjangoJSONEncoder))
+    _atomic_write(os.path.join(directory, HTML_NAME), render_to_string('spectator.html', {
+        'leaderboard_data': data['leaderboard'],
+        'graph_data': data['graph'],
+        'generated_at': data['generated_at'],
+        'interval': settings.SCOREBOARD_SNAPSHOT_INTERVAL,
+    }))
+    return data
+
+
+def run(interval=None, directory=None, once=False, log=None):
+    """Writes a snapshot whenever the scoreboard version changes."""
+    interval = interval or settings.SCOREBOARD_SNAPSHOT_INTERVAL
+    log = log or (lambda msg: None)
+    last_version = None
+
+    while True:
+        version = get_version(SCOREBOARD)
+        if version != last_version:
+            started = time.perf_counter()
+            data = write_snapshot(directory, version)
+            log(f"Snapshot v{version}: {len(data['leaderboard'])} players "
+                f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+            last_version = version
+        if once:
+            return
+        time.sleep(interval)
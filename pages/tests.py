@@ -1,3 +1,228 @@
-from django.test import TestCase
+import json
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users.models import Team, User
+from . import scoring
+from .events import discard_challenges, log_models, replay, rescore
+from .loadtest import percentile
+from .search import search
+from .models import (
+    Category, Challenge, ChallengeStats, Solve, SubmissionEvent, TeamScore, TeamSolve, TeamTimeline, UserScore,
+)
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'config.cache.TieredCache', 'OPTIONS': {'L2': 'shared'}},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'hacklabs-tests'},
+}
+
+
+def snapshot():
+    """Every derived row, without surrogate ids, in a stable order."""
+    tables = {}
+    for model in log_models():
+        if model is SubmissionEvent:
+            continue
+        fields = [f.attname for f in model._meta.concrete_fields if not f.primary_key]
+        tables[model._meta.label] = sorted(model.objects.values_list(*fields), key=repr)
+    return tables
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_ENABLED=False, JOBS_IN_PROCESS=False, SCHEDULER_IN_PROCESS=False)
+class ProjectionReplayTests(TestCase):
+    """The projections updated live must equal a rebuild from the event log."""
+
+    @classmethod
+    def setUpTestData(cls):
+        web = Category.objects.create(name='Web')
+        cls.static = Challenge.objects.create(title='Static', category=web, description='-', points=100, flag='s')
+        cls.limited = Challenge.objects.create(title='Limited', category=web, description='-', points=50, flag='l',
+                                               max_attempts=2)
+        cls.dynamic = Challenge.objects.create(title='Dynamic', category=web, description='-', flag='d',
+                                               dynamic=True, initial_points=500, points=500, minimum_points=100,
+                                               decay=3)
+        team = Team.objects.create(name='Red')
+        cls.users = [User.objects.create_user(f'student{i}', password='pw', team=team if i < 2 else None)
+                     for i in range(4)]
+
+    def submit(self, user, challenge, flag):
+        self.client.force_login(user)
+        response = self.client.post(reverse('submit_flag'), json.dumps({'challenge_id': challenge.pk, 'flag': flag}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def submit_all(self):
+        for user in self.users:
+            self.submit(user, self.static, 'wrong')
+            self.submit(user, self.static, 's')
+            self.submit(user, self.dynamic, 'd')
+        self.submit(self.users[0], self.limited, 'wrong')
+        self.submit(self.users[0], self.limited, 'wrong')
+        self.submit(self.users[1], self.limited, 'l')
+
+    def assertMatchesReplay(self):
+        live = snapshot()
+        replay()
+        self.assertEqual(live, snapshot())
+
+    def test_submissions(self):
+        self.submit_all()
+        self.assertTrue(UserScore.objects.exists())
+        self.assertMatchesReplay()
+
+    def test_dynamic_decay(self):
+        self.submit_all()
+        self.dynamic.refresh_from_db()
+        self.assertEqual(self.dynamic.points, 100)
+        # Every solver holds the decayed value, not the one they solved at
+        self.assertEqual(UserScore.objects.get(user=self.users[3]).points, 100 + 100)
+        self.assertMatchesReplay()
+
+    def test_team_counts_each_challenge_once(self):
+        self.submit_all()
+        red = self.users[0].team
+        self.dynamic.refresh_from_db()
+        # Both members solved Static and Dynamic, only the first solve of each counts
+        self.assertEqual(TeamSolve.objects.filter(team=red).count(), 3)
+        self.assertEqual(TeamSolve.objects.get(team=red, challenge=self.static).user, self.users[0])
+        score = TeamScore.objects.get(team=red)
+        self.assertEqual((score.points, score.solves), (100 + self.dynamic.points + 50, 3))
+        current = TeamTimeline.objects.get(team=red, valid_to__isnull=True)
+        self.assertEqual((current.points, current.solves), (score.points, score.solves))
+        self.assertMatchesReplay()
+
+    def test_team_change_keeps_past_solves(self):
+        red = self.users[0].team
+        self.submit(self.users[0], self.static, 's')
+        blue = Team.objects.create(name='Blue')
+        User.objects.filter(pk=self.users[0].pk).update(team=blue)
+        self.users[0].refresh_from_db()
+        self.submit(self.users[0], self.limited, 'l')
+        self.submit(self.users[1], self.static, 's')
+
+        self.assertEqual(set(TeamSolve.objects.filter(team=red).values_list('challenge', flat=True)),
+                         {self.static.pk})
+        self.assertEqual(TeamScore.objects.get(team=red).points, 100)
+        self.assertEqual(TeamScore.objects.get(team=blue).points, 50)
+        self.assertMatchesReplay()
+
+    def test_rescore(self):
+        self.submit_all()
+        with transaction.atomic():
+            old_points = self.static.points
+            scoring.set_points(self.static, 250)
+            self.static.save()
+            rescore({self.static.pk: self.static.points - old_points})
+        self.assertEqual(UserScore.objects.get(user=self.users[2]).points, 250 + 100)
+        self.assertMatchesReplay()
+
+    def test_discard_challenges(self):
+        self.submit_all()
+        with transaction.atomic():
+            discard_challenges([self.static.pk])
+            Challenge.objects.filter(pk=self.static.pk).delete()
+        self.assertEqual(UserScore.objects.get(user=self.users[2]).points, 100)
+        self.assertMatchesReplay()
+
+    def test_revoke_solves(self):
+        self.submit_all()
+        with transaction.atomic():
+            scoring.revoke_solves(Solve.objects.filter(user=self.users[3], challenge__in=[self.static, self.dynamic]))
+        self.assertFalse(Solve.objects.filter(user=self.users[3]).exists())
+        self.assertEqual(UserScore.objects.get(user=self.users[3]).points, 0)
+        self.assertEqual(ChallengeStats.objects.get(challenge=self.static).solves, 3)
+        # The dynamic challenge gets its value back for the remaining solvers
+        self.dynamic.refresh_from_db()
+        self.assertEqual(self.dynamic.points, self.dynamic.decayed_value(3))
+        self.assertEqual(UserScore.objects.get(user=self.users[2]).points, 100 + self.dynamic.points)
+        self.assertMatchesReplay()
+
+    def test_revoke_action(self):
+        self.submit_all()
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        solve = Solve.objects.get(user=self.users[1], challenge=self.limited)
+        self.client.post(reverse('admin:pages_solve_changelist'), {'action': 'revoke', '_selected_action': [solve.pk]})
+        self.assertFalse(Solve.objects.filter(pk=solve.pk).exists())
+        self.dynamic.refresh_from_db()
+        self.assertEqual(TeamScore.objects.get().points, 100 + self.dynamic.points)
+        self.assertMatchesReplay()
+
+    def test_delete_user_in_admin(self):
+        self.submit_all()
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        url = reverse('admin:users_user_delete', args=[self.users[1].pk])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.post(url, {'post': 'yes'})
+        self.assertFalse(User.objects.filter(pk=self.users[1].pk).exists())
+        self.assertEqual(ChallengeStats.objects.get(challenge=self.static).solves, 3)
+        self.assertFalse(ChallengeStats.objects.get(challenge=self.limited).solves)
+        self.assertMatchesReplay()
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_ENABLED=False)
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.web = Category.objects.create(name='Web')
+        crypto = Category.objects.create(name='Crypto')
+        cls.sqli = Challenge.objects.create(title='SQL injection', category=cls.web, points=100, flag='a',
+                                            description='Log in as admin without the password')
+        cls.cookies = Challenge.objects.create(title='Café cookies', category=cls.web, points=100, flag='b',
+                                               description='Session tampering')
+        cls.rsa = Challenge.objects.create(title='Small exponent', category=crypto, points=100, flag='c',
+                                           description='RSA with e = 3 and no padding')
+
+    def found(self, text):
+        return set(search(Challenge.objects.all(), text))
+
+    def test_terms(self):
+        self.assertEqual(self.found(''), {self.sqli, self.cookies, self.rsa})
+        self.assertEqual(self.found('admin password'), {self.sqli})
+        self.assertEqual(self.found('admin padding'), set())
+        # The last term matches as a prefix, the category name counts too
+        self.assertEqual(self.found('inj'), {self.sqli})
+        self.assertEqual(self.found('crypto'), {self.rsa})
+        self.assertEqual(self.found('web session'), {self.cookies})
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 only')
+    def test_fts5_syntax_is_plain_text(self):
+        self.assertEqual(self.found('cafe'), {self.cookies})
+        self.assertEqual(self.found('title: "admin" OR NEAR'), set())
+        self.assertEqual(self.found('AND'), {self.rsa})
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 triggers')
+    def test_index_follows_the_catalog(self):
+        self.sqli.title = 'Blind injection'
+        self.sqli.save()
+        self.assertEqual(self.found('blind'), {self.sqli})
+        self.assertEqual(self.found('sql'), set())
+
+        Category.objects.filter(pk=self.web.pk).update(name='Exploitation')
+        self.assertEqual(self.found('exploitation'), {self.sqli, self.cookies})
+        self.assertEqual(self.found('web'), set())
+
+        Challenge.objects.filter(pk=self.rsa.pk).update(category=self.web)
+        self.assertEqual(self.found('exploitation'), {self.sqli, self.cookies, self.rsa})
+
+        self.cookies.delete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM pages_challenge_fts')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+
+class PercentileTests(TestCase):
+    def test_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 95), 95)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile(samples, 100), 100)
+
+    def test_small_samples(self):
+        self.assertEqual(percentile(list(range(1, 11)), 50), 5)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertEqual(percentile([1, 2], 1), 1)
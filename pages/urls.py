@@ -6,10 +6,12 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
     path('challenges/', views.challenges_view, name='challenges'),
     path('scoreboard/', views.scoreboard, name='scoreboard'),
+    path('spectate/', views.spectator, name='spectator'),
+    path('spectate/scoreboard.json', views.spectator_data, name='spectator_data'),
 
     # APIs
     path('api/submit_flag/', views.submit_flag, name='submit_flag'),
     path('api/challenge/<int:challenge_id>/solves/', views.challenge_solves_api, name='challenge_solves_api'),
-    path('api/scoreboard/', views.scoreboard, name='scoreboard_api'),  # Новый
+    path('api/scoreboard/', views.scoreboard_api, name='scoreboard_api'),
     path('api/lesson/status/', views.lesson_status_api, name='lesson_status_api'),
 ]
\ No newline at end of file
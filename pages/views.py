@@ -1,16 +1,28 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.contrib import messages
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, JsonResponse
 from django.views.decorators.http import require_POST
-from django.db.models import Sum, Count, Min, Q
-from django.db.models.functions import TruncDate, Coalesce
-from .models import Challenge, Category, Solve, Attempt
-from users.models import User
-from mentors.models import LessonSettings
+from django.db import transaction
+from django.db.models import Count
+from .models import Challenge, Category, Solve, Attempt, Lockout
+from .events import record_submission
+from .scoreboard import PLAYERS, build_scoreboard, parse_as_of, parse_ranking, parse_resolution, personalize
+from . import scoring, snapshots
+from mentors import schedule
+from mentors.lessons import current_lesson
+from users.models import Team
+import heapq
 import json
-from collections import defaultdict
-from django.utils import timezone
+import os
+from django.conf import settings
+from django.utils.http import http_date, parse_etags
 from django.core.serializers.json import DjangoJSONEncoder
+from config import metrics
+from config.cache import SCOREBOARD, bump_version
+
+ACTIVITY_LOG_SIZE = 10
 
 
 def home(request):
@@ -24,61 +36,33 @@ def home(request):
 
 @login_required
 def dashboard(request):
-    user_solves = Solve.objects.filter(user=request.user)
-    owned_flags = user_solves.count()
-
-    # Only active challenges
-    total_flags = Challenge.objects.filter(is_active=True).count()
+    # Only the challenges open in the user's lesson, on both sides of the percentage
+    open_challenges = current_lesson(request).open_challenges()
+    owned_flags = Solve.objects.filter(user=request.user, challenge__in=open_challenges).count()
+    total_flags = open_challenges.count()
 
-    # 1. Personal Solves
+    # Activity feed: the latest solves and lockouts, both read from (user, -date) indexes
     solves_qs = Solve.objects.filter(user=request.user).select_related(
-        'user', 'challenge', 'challenge__category'
-    ).order_by('-date')[:20]
-
-    # 2. Personal Attempts
-    attempts_qs = Attempt.objects.filter(
-        user=request.user,
-        is_correct=False,
-        challenge__max_attempts__gt=0
-    ).select_related('challenge', 'challenge__category').order_by('timestamp')
-
-    grouped_attempts = defaultdict(list)
-    for att in attempts_qs:
-        grouped_attempts[att.challenge_id].append(att)
-
-    fail_events = []
-    for ch_id, attempts in grouped_attempts.items():
-        if not attempts: continue
-
-        challenge = attempts[0].challenge
-        limit = challenge.max_attempts
-
-        if len(attempts) >= limit:
-            locking_attempt = attempts[limit - 1]
-            fail_events.append(locking_attempt)
-
-    # 3. Combine lists
-    activity_list = []
-
-    for s in solves_qs:
-        activity_list.append({
-            'type': 'solve',
-            'user': s.user,
-            'challenge': s.challenge,
-            'date': s.date,
-            'sort_date': s.date
-        })
-
-    for f in fail_events:
-        activity_list.append({
-            'type': 'fail',
-            'user': f.user,
-            'challenge': f.challenge,
-            'date': f.timestamp,
-            'sort_date': f.timestamp
-        })
-
-    activity_log = sorted(activity_list, key=lambda x: x['sort_date'], reverse=True)[:10]
+        'challenge', 'challenge__category'
+    ).order_by('-date')[:ACTIVITY_LOG_SIZE]
+    lockouts_qs = Lockout.objects.filter(user=request.user).select_related(
+        'challenge', 'challenge__category'
+    ).order_by('-locked_at')[:ACTIVITY_LOG_SIZE]
+
+    activity_list = [{
+        'type': 'solve',
+        'user': request.user,
+        'challenge': s.challenge,
+        'date': s.date,
+    } for s in solves_qs]
+    activity_list += [{
+        'type': 'fail',
+        'user': request.user,
+        'challenge': lock.challenge,
+        'date': lock.locked_at,
+    } for lock in lockouts_qs]
+
+    activity_log = heapq.nlargest(ACTIVITY_LOG_SIZE, activity_list, key=lambda x: x['date'])
 
     # Check for mentor/admin
     is_mentor = request.user.is_superuser or request.user.groups.filter(name='Mentors').exists()
@@ -95,22 +79,16 @@ def dashboard(request):
 
 @login_required
 def challenges_view(request):
-    challenges = Challenge.objects.filter(is_active=True).select_related('category')
-    categories_qs = Category.objects.filter(challenges__is_active=True).distinct()
-
-    # Check Timer
-    lesson_settings = LessonSettings.get_settings()
-    is_hard_deadline = lesson_settings.is_hard_deadline_passed()
-
-    # Pass deadline timestamps for JS countdown
-    hard_deadline_iso = None
-    if lesson_settings.hard_deadline:
-        hard_deadline_iso = lesson_settings.hard_deadline.isoformat()
+    lesson_settings = current_lesson(request)
+    challenges = lesson_settings.open_challenges().select_related('category')
+    categories_qs = Category.objects.filter(challenges__in=challenges).distinct()
 
-    soft_deadline_iso = None
-    # FIX: Use end_time (model field) instead of soft_deadline
-    if lesson_settings.end_time:
-        soft_deadline_iso = lesson_settings.end_time.isoformat()
+    # Check Timer: the scheduler keeps the state current, deadlines feed the JS countdown
+    lesson_state = schedule.state(lesson_settings)
+    is_hard_deadline = lesson_state == schedule.CLOSED
+    lesson_status = schedule.status(lesson_settings)
+    hard_deadline_iso = lesson_status['hard_deadline']
+    soft_deadline_iso = lesson_status['soft_deadline']
 
     categories_data = {}
     for cat in categories_qs:
@@ -133,7 +111,7 @@ def challenges_view(request):
             'user': s.user.username,
             'avatar': s.user.avatar_url,
             'date': s.date.strftime('%Y-%m-%d %H:%M')
-        } for s in c.solves.select_related('user').order_by('-date')]
+        } for s in c.solves.filter(lesson=lesson_settings).select_related('user').order_by('-date')]
 
         is_solved = c.id in user_solves_ids
         attempts_count = user_attempts_map.get(c.id, 0)
@@ -174,107 +152,102 @@ def challenges_view(request):
     return render(request, 'challenges.html', context)
 
 
+def _scoreboard_as_of(request, lesson):
+    """Parsed `as_of` parameter (None = live) and an error message if it was invalid."""
+    try:
+        return parse_as_of(request.GET.get('as_of'), lesson), None
+    except ValueError as e:
+        return None, str(e)
+
+
 @login_required
 def scoreboard(request):
-    # Filter: exclude superusers and mentors
-    student_users = User.objects.filter(is_superuser=False).exclude(groups__name='Mentors')
-
-    # 1. Top 10 for chart
-    top_users_qs = student_users.annotate(
-        total_points=Coalesce(Sum('solves__challenge__points'), 0),
-        flags_count=Count('solves')
-    ).filter(total_points__gt=0).order_by('-total_points', '-flags_count')[:10]
-
-    top_users_list = list(top_users_qs)
-
-    # Add current user to chart if not in top 10
-    is_current_user_student = not request.user.is_superuser and not request.user.groups.filter(name='Mentors').exists()
-
-    if is_current_user_student and request.user.is_authenticated and request.user not in top_users_list:
-        current_user_points = Solve.objects.filter(user=request.user).aggregate(
-            total=Coalesce(Sum('challenge__points'), 0)
-        )['total']
-
-        if current_user_points > 0:
-            top_users_list.append(request.user)
-
-    # 2. Top 50 list
-    all_users_qs = student_users.annotate(
-        total_points=Coalesce(Sum('solves__challenge__points'), 0),
-        flags_count=Count('solves')
-    ).filter(total_points__gt=0).order_by('-total_points', '-flags_count')[:50]
-
-    leaderboard_data = []
-    for index, u in enumerate(all_users_qs, 1):
-        leaderboard_data.append({
-            'rank': index,
-            'user': u.username,
-            'points': u.total_points,
-            'solved': u.flags_count,
-            'isMe': u == request.user,
-            'avatar': u.avatar_url
-        })
-
-    graph_data = {'datasets': []}
-
-    first_solve_ever = Solve.objects.filter(user__in=student_users).aggregate(Min('date'))['date__min']
-    global_start_time = first_solve_ever if first_solve_ever else timezone.now()
-
-    colors = [
-        '#9fef00', '#00d2ff', '#ff0055', '#ffe600', '#aa00ff',
-        '#ff6600', '#00ffaa', '#ff00aa', '#0066ff', '#ccff00'
-    ]
-
-    for i, user in enumerate(top_users_list):
-        solves = Solve.objects.filter(user=user).select_related('challenge').order_by('date')
-        if not solves.exists():
-            continue
-
-        color = colors[i % len(colors)]
-        data_points = [{'x': 0, 'y': 0}]
-        current_score = 0
-
-        for solve in solves:
-            current_score += solve.challenge.points
-            time_delta = solve.date - global_start_time
-            seconds_elapsed = int(time_delta.total_seconds())
-            if seconds_elapsed < 0: seconds_elapsed = 0
-            data_points.append({'x': seconds_elapsed, 'y': current_score})
-
-        now_delta = timezone.now() - global_start_time
-        now_seconds = int(now_delta.total_seconds())
-        data_points.append({'x': now_seconds, 'y': current_score})
-
-        graph_data['datasets'].append({
-            'label': user.username,
-            'data': data_points,
-            'borderColor': color,
-            'backgroundColor': 'transparent',
-            'borderWidth': 2,
-            'tension': 0,
-            'pointRadius': 3,
-            'pointHoverRadius': 6,
-            'showLine': True,
-            'stepped': 'after'
-        })
+    lesson = current_lesson(request)
+    as_of, error = _scoreboard_as_of(request, lesson)
+    if error:
+        messages.warning(request, error)
+
+    resolution = parse_resolution(request.GET.get('resolution'))
+    ranking = parse_ranking(request.GET.get('ranking'))
+    data = personalize(build_scoreboard(as_of, resolution, ranking, lesson), request.user, as_of, ranking)
+    is_mentor = request.user.is_superuser or request.user.groups.filter(name='Mentors').exists()
 
     context = {
-        'leaderboard_data': leaderboard_data,
-        'graph_data': graph_data
+        'leaderboard_data': data['leaderboard'],
+        'graph_data': data['graph'],
+        'as_of': as_of,
+        'ranking': ranking.name,
+        'teams_enabled': ranking is not PLAYERS or Team.objects.exists(),
+        'is_mentor': is_mentor,
+        'lesson': lesson,
+        'lesson_end': lesson.end_time,
+        'api_url': f"{reverse('scoreboard_api')}?{request.GET.urlencode()}",
     }
     return render(request, 'scoreboard.html', context)
 
 
+@login_required
+def scoreboard_api(request):
+    """
+    Polled by the scoreboard page: {'leaderboard': [...], 'graph': {...}}.
+    `resolution` caps the points per chart series (see pages/scoreboard.py),
+    `ranking=teams` ranks teams instead of players.
+    """
+    lesson = current_lesson(request)
+    as_of, error = _scoreboard_as_of(request, lesson)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+    resolution = parse_resolution(request.GET.get('resolution'))
+    ranking = parse_ranking(request.GET.get('ranking'))
+    return JsonResponse(personalize(build_scoreboard(as_of, resolution, ranking, lesson), request.user, as_of,
+                                    ranking))
+
+
+def _serve_snapshot(request, name, content_type):
+    """
+    Streams a file written by `snapshot_scoreboard`. Conditional requests
+    are answered from the file's mtime/size, no database access at all.
+    """
+    path = os.path.join(settings.SCOREBOARD_SNAPSHOT_DIR, name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return HttpResponse('Scoreboard snapshot not available yet (is snapshot_scoreboard running?)',
+                            status=503, content_type='text/plain')
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = f'public, max-age={settings.SCOREBOARD_SNAPSHOT_INTERVAL}'
+    return response
+
+
+def spectator(request):
+    """
+    Read-only scoreboard for projectors and spectators.
+    """
+    return _serve_snapshot(request, snapshots.HTML_NAME, 'text/html; charset=utf-8')
+
+
+def spectator_data(request):
+    return _serve_snapshot(request, snapshots.JSON_NAME, 'application/json')
+
+
 @login_required
 def challenge_solves_api(request, challenge_id):
     """
     API for live updates.
     """
+    lesson = current_lesson(request)
     challenge = get_object_or_404(Challenge, id=challenge_id)
-    if not challenge.is_active:
+    if not lesson.open_challenges().filter(pk=challenge.pk).exists():
         return JsonResponse({'solves': []})
 
-    solves = challenge.solves.select_related('user').order_by('-date')
+    solves = challenge.solves.filter(lesson=lesson).select_related('user').order_by('-date')
     data = [{
         'user': s.user.username,
         'avatar': s.user.avatar_url,
@@ -289,23 +262,9 @@ def lesson_status_api(request):
     """
     API для проверки статуса урока (таймера) в реальном времени.
     """
-    lesson_settings = LessonSettings.get_settings()
-    is_hard_deadline = lesson_settings.is_hard_deadline_passed()
-
-    hard_deadline_iso = None
-    if lesson_settings.hard_deadline:
-        hard_deadline_iso = lesson_settings.hard_deadline.isoformat()
-
-    soft_deadline_iso = None
-    # FIX: Use end_time (model field) instead of soft_deadline
-    if lesson_settings.end_time:
-        soft_deadline_iso = lesson_settings.end_time.isoformat()
-
-    return JsonResponse({
-        'is_hard_deadline': is_hard_deadline,
-        'hard_deadline': hard_deadline_iso,
-        'soft_deadline': soft_deadline_iso  # Correctly populated
-    })
+    lesson_settings = current_lesson(request)
+    schedule.state(lesson_settings)
+    return JsonResponse(schedule.status(lesson_settings))
 
 
 @require_POST
@@ -316,42 +275,60 @@ def submit_flag(request):
         challenge_id = data.get('challenge_id')
         flag_input = data.get('flag')
 
-        challenge = get_object_or_404(Challenge, id=challenge_id, is_active=True)
+        lesson_settings = current_lesson(request)
+        challenge = get_object_or_404(lesson_settings.open_challenges(), id=challenge_id)
 
         # Check Timer
-        lesson_settings = LessonSettings.get_settings()
-        if lesson_settings.is_hard_deadline_passed():
+        lesson_state = schedule.state(lesson_settings)
+        if lesson_state == schedule.CLOSED:
+            metrics.inc('hacklabs_submissions_total', result='closed')
             return JsonResponse(
                 {'status': 'error', 'message': 'Lesson time is over! Submissions closed.', 'challenge_failed': True})
+        if lesson_state == schedule.SCHEDULED:
+            metrics.inc('hacklabs_submissions_total', result='not_started')
+            return JsonResponse({'status': 'error', 'message': 'The lesson has not started yet.'})
 
         attempts_count = Attempt.objects.filter(user=request.user, challenge=challenge).count()
 
         if challenge.max_attempts > 0 and attempts_count >= challenge.max_attempts:
+            metrics.inc('hacklabs_submissions_total', result='locked')
             return JsonResponse(
                 {'status': 'error', 'message': 'Max attempts reached! Task locked.', 'challenge_failed': True})
 
         if Solve.objects.filter(user=request.user, challenge=challenge).exists():
+            metrics.inc('hacklabs_submissions_total', result='already_solved')
             return JsonResponse({'status': 'error', 'message': 'Already solved!'})
 
         is_correct = (flag_input == challenge.flag)
-
-        Attempt.objects.create(
-            user=request.user,
-            challenge=challenge,
-            flag_input=flag_input,
-            is_correct=is_correct
-        )
+        challenge_failed = (not is_correct and challenge.max_attempts > 0
+                            and attempts_count + 1 >= challenge.max_attempts)
+
+        with transaction.atomic():
+            if is_correct and challenge.dynamic:
+                # Solves of a dynamic challenge are serialized so each one sees the current value
+                challenge = Challenge.objects.select_for_update().get(pk=challenge.pk)
+            Attempt.objects.create(
+                user=request.user,
+                challenge=challenge,
+                flag_input=flag_input,
+                is_correct=is_correct
+            )
+            if is_correct:
+                Solve.objects.create(user=request.user, challenge=challenge, lesson=lesson_settings)
+            record_submission(request.user, challenge, is_correct, locked=challenge_failed, lesson=lesson_settings)
+            if is_correct:
+                scoring.refresh(challenge)
 
         if is_correct:
-            Solve.objects.create(user=request.user, challenge=challenge)
+            bump_version(SCOREBOARD)
+            metrics.inc('hacklabs_submissions_total', result='correct')
+            metrics.inc('hacklabs_solves_total', challenge=challenge.id)
             return JsonResponse({'status': 'success', 'message': 'Correct flag!'})
         else:
-            new_attempts_count = attempts_count + 1
-            challenge_failed = False
+            metrics.inc('hacklabs_submissions_total', result='incorrect')
             message = 'Incorrect flag'
 
-            if challenge.max_attempts > 0 and new_attempts_count >= challenge.max_attempts:
-                challenge_failed = True
+            if challenge_failed:
                 message = 'Incorrect flag. Max attempts reached. Task locked.'
 
             return JsonResponse({
@@ -361,4 +338,5 @@ def submit_flag(request):
             })
 
     except Exception as e:
+        metrics.inc('hacklabs_submissions_total', result='error')
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
\ No newline at end of file
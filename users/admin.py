@@ -1,12 +1,17 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from django.db import transaction
 
+from config.cache import CATALOG, SCOREBOARD, bump_version
+from pages import scoring
+from pages.admin import ProgressDeleteMixin
+from .models import Team, User
 
-class CustomUserAdmin(UserAdmin):
+
+class CustomUserAdmin(ProgressDeleteMixin, UserAdmin):
     # Добавляем кастомные поля в форму редактирования
     fieldsets = UserAdmin.fieldsets + (
-        (None, {'fields': ('bio', 'country', 'avatar_url')}),
+        (None, {'fields': ('bio', 'country', 'avatar_url', 'team')}),
     )
     add_fieldsets = UserAdmin.add_fieldsets + (
         (None, {'fields': ('bio', 'country', 'avatar_url')}),
@@ -20,5 +25,19 @@ class CustomUserAdmin(UserAdmin):
 
     get_score.short_description = 'Score'
 
+    # Team and challenge stats are rebuilt without the deleted users' events
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, User.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            scoring.delete_users(queryset)
+        bump_version(CATALOG, SCOREBOARD)
+
+
+admin.site.register(User, CustomUserAdmin)
 
-admin.site.register(User, CustomUserAdmin)
\ No newline at end of file
+@admin.register(Team)
+class TeamAdmin(admin.ModelAdmin):
+    list_display = ('name', 'invite_code', 'created_at')
+    search_fields = ('name', 'invite_code')
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:06
+
+import django.db.models.deletion
+import users.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_bio_user_country'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Team',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Название')),
+                ('invite_code', models.CharField(default=users.models._invite_code, max_length=16, unique=True, verbose_name='Код приглашения')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Команда',
+                'verbose_name_plural': 'Команды',
+            },
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='team',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='members', to='users.team', verbose_name='Команда'),
+        ),
+    ]
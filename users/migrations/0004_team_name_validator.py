@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:30
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_team_user_team'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='team',
+            name='name',
+            field=models.CharField(max_length=50, unique=True, validators=[django.core.validators.RegexValidator('^\\w[\\w .-]*\\Z', 'Team names may only contain letters, digits, spaces and . _ -')], verbose_name='Название'),
+        ),
+    ]
@@ -1,8 +1,38 @@
+import secrets
+from urllib.parse import quote
+
+from django.core.validators import RegexValidator
 from django.db import models
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.db.models import Sum
 
 
+def _invite_code():
+    return secrets.token_hex(4)
+
+
+# Letters, digits, spaces and . _ - only: team names are shown on public boards
+validate_team_name = RegexValidator(
+    r'^\w[\w .-]*\Z', 'Team names may only contain letters, digits, spaces and . _ -')
+
+
+class Team(models.Model):
+    name = models.CharField(max_length=50, unique=True, validators=[validate_team_name], verbose_name="Название")
+    invite_code = models.CharField(max_length=16, unique=True, default=_invite_code, verbose_name="Код приглашения")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Команда"
+        verbose_name_plural = "Команды"
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def avatar_url(self):
+        return f"https://api.dicebear.com/7.x/identicon/svg?seed={quote(self.name)}"
+
+
 class User(AbstractUser):
     avatar_url = models.CharField(
         max_length=255,
@@ -12,6 +42,9 @@ class User(AbstractUser):
     # Эти поля используются в admin.py, их нужно добавить в модель
     bio = models.TextField(verbose_name="О себе", blank=True, null=True)
     country = models.CharField(max_length=50, verbose_name="Страна", blank=True, null=True)
+    # Командный режим: очки команды считаются по первому решению каждой задачи (pages/projections.py)
+    team = models.ForeignKey(Team, on_delete=models.SET_NULL, null=True, blank=True, related_name='members',
+                             verbose_name="Команда")
 
     # Исправление конфликтов reverse accessors
     groups = models.ManyToManyField(
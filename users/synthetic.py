@@ -0,0 +1,276 @@
+"""
+Synthetic classroom generator used by `populate_db` and the benchmarks.
+
+Everything is written with `bulk_create` and a single precomputed password
+hash, so a 10k-user / 1M-attempt classroom can be built in seconds.
+Every Attempt gets its SubmissionEvent (plus lockouts) and the derived
+tables are rebuilt with a replay at the end.
+The output is fully determined by `seed`.
+"""
+import random
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from config.cache import CATALOG, SCOREBOARD, bump_version
+from pages import events
+from pages.models import Category, Challenge, Solve, Attempt, SubmissionEvent
+
+User = get_user_model()
+
+DEFAULT_PASSWORD = 'password123'
+
+CATEGORY_NAMES = ['Web', 'Crypto', 'Pwn', 'Forensics', 'Reverse', 'OSINT']
+
+USERNAME_BASES = [
+    'Neo', 'Morpheus', 'Trinity', 'Cipher', 'Tank', 'Dozer', 'Mouse', 'Switch', 'Apoc',
+    'Smith', 'Brown', 'Jones', 'Oracle', 'Seraph', 'Merovingian', 'Persephone',
+    'Keymaker', 'Architect', 'Ghost', 'Niobe', 'Lock', 'Sora', 'Freya', 'Bane',
+    'Axel', 'Maggie', 'Kali', 'Sparks', 'Vector', 'Binary', 'Hex', 'Glitch', 'Daemon',
+    'Root', 'Admin', 'User', 'Guest', 'System', 'Null', 'Void', 'Shadow', 'Phantom',
+    'Cyber', 'Punk', 'Net', 'Runner', 'Blade', 'Zero', 'Cool', 'Hacker'
+]
+
+AVATAR_SEEDS = ['Felix', 'Aneka', 'Zack', 'Midnight', 'Shadow', 'Cyber', 'Glitch', 'Neo', 'Flux', 'Echo', 'Byte',
+                'Pixel', 'Vortex', 'Spark', 'Nova']
+
+
+@dataclass
+class ClassroomSpec:
+    users: int = 50
+    challenges: int = 25
+    categories: int = 6
+    solves: int = 375
+    attempts: int = 450
+    templates: int = 0
+    seed: int = 0
+    hours: int = 48
+    limited_ratio: float = 0.2
+    batch_size: int = 5000
+    password: str = DEFAULT_PASSWORD
+
+
+@contextmanager
+def _preserve_timestamps(*fields):
+    """
+    Temporarily disable auto_now_add so bulk_create keeps the backdated values.
+    """
+    previous = [f.auto_now_add for f in fields]
+    for f in fields:
+        f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, value in zip(fields, previous):
+            f.auto_now_add = value
+
+
+def _unique_usernames(rng, count):
+    existing = set(User.objects.values_list('username', flat=True))
+    names = []
+    index = 0
+    while len(names) < count:
+        index += 1
+        name = f"{rng.choice(USERNAME_BASES)}_{index}"
+        if name not in existing:
+            names.append(name)
+    return names
+
+
+def generate_classroom(spec, log=None):
+    """
+    Populates the database according to `spec`.
+    Returns a dict with the number of created rows per model.
+    """
+    rng = random.Random(spec.seed)
+    log = log or (lambda msg: None)
+    now = timezone.now()
+    start_time = now - timedelta(hours=spec.hours)
+    window = int(timedelta(hours=spec.hours).total_seconds())
+    created = {}
+
+    with transaction.atomic():
+        # 1. Categories
+        names = CATEGORY_NAMES[:spec.categories]
+        names += [f'Category {i + 1}' for i in range(len(names), spec.categories)]
+        categories = [Category.objects.get_or_create(name=name)[0] for name in names]
+        created['categories'] = len(categories)
+        log(f'Categories: {len(categories)}')
+
+        # 2. Challenges
+        challenges = []
+        for i in range(spec.challenges):
+            cat = rng.choice(categories)
+            points = rng.choice([100, 200, 300, 400, 500])
+            diff = 'Easy'
+            if points > 200: diff = 'Medium'
+            if points > 400: diff = 'Hard'
+            limited = rng.random() < spec.limited_ratio
+            challenges.append(Challenge(
+                title=f'{cat.name} Quest {i + 1}',
+                category=cat,
+                description=f'This is a generated challenge for {cat.name}. Find the flag!',
+                points=points,
+                initial_points=points,
+                difficulty=diff,
+                flag=f'CTF{{fake_flag_{i}_{uuid.UUID(int=rng.getrandbits(128)).hex[:4]}}}',
+                max_attempts=rng.randint(3, 10) if limited else 0,
+            ))
+        challenges = Challenge.objects.bulk_create(challenges, batch_size=spec.batch_size)
+        created['challenges'] = len(challenges)
+        log(f'Challenges: {len(challenges)}')
+
+        # 3. Users (one shared hash instead of PBKDF2 per user)
+        password_hash = make_password(spec.password)
+        users = []
+        for username in _unique_usernames(rng, spec.users):
+            seed = rng.choice(AVATAR_SEEDS) + str(rng.randint(1, 100))
+            users.append(User(
+                username=username,
+                email=f"{username.lower()}@hacklabs.local",
+                password=password_hash,
+                avatar_url=f"https://api.dicebear.com/7.x/bottts/svg?seed={seed}",
+                date_joined=start_time,
+            ))
+        users = User.objects.bulk_create(users, batch_size=spec.batch_size)
+        created['users'] = len(users)
+        log(f'Users: {len(users)}')
+        lesson = _enroll(spec, users)
+
+        if users and challenges:
+            created.update(_generate_activity(spec, rng, users, challenges, start_time, window, log, lesson))
+        else:
+            created['solves'] = created['attempts'] = 0
+
+        created['templates'] = _generate_templates(spec, rng, challenges)
+
+    created['events'], seconds = events.replay(chunk_size=spec.batch_size)
+    log(f'Replayed {created["events"]} events in {seconds:.1f}s')
+    bump_version(CATALOG, SCOREBOARD)
+    return created
+
+
+def _event(attempt, lesson):
+    kind = SubmissionEvent.CORRECT if attempt.is_correct else SubmissionEvent.INCORRECT
+    return SubmissionEvent(user_id=attempt.user_id, challenge_id=attempt.challenge_id, lesson_id=lesson.pk, kind=kind,
+                           timestamp=attempt.timestamp)
+
+
+def _save_attempts(attempts, lesson):
+    Attempt.objects.bulk_create(attempts)
+    SubmissionEvent.objects.bulk_create([_event(a, lesson) for a in attempts])
+
+
+def _enroll(spec, users):
+    """Everyone joins the default lesson."""
+    from mentors.models import LessonMembership, LessonSettings
+
+    lesson = LessonSettings.get_settings()
+    LessonMembership.objects.bulk_create(
+        [LessonMembership(lesson=lesson, user_id=user.pk) for user in users], batch_size=spec.batch_size)
+    return lesson
+
+
+def _generate_activity(spec, rng, users, challenges, start_time, window, log, lesson):
+    """
+    Solves are unique (user, challenge) pairs, each backed by a correct Attempt.
+    Wrong attempts never exceed max_attempts and precede the solve if there is one.
+    A pair that used up all its attempts gets a lockout event after the last one.
+    """
+    pairs_total = len(users) * len(challenges)
+    solves_count = min(spec.solves, pairs_total)
+    solve_times = {}
+
+    solve_field = Solve._meta.get_field('date')
+    attempt_field = Attempt._meta.get_field('timestamp')
+
+    with _preserve_timestamps(solve_field, attempt_field):
+        solves, correct = [], []
+        for pair in rng.sample(range(pairs_total), solves_count):
+            user = users[pair // len(challenges)]
+            challenge = challenges[pair % len(challenges)]
+            date = start_time + timedelta(seconds=rng.randint(60, window))
+            solve_times[(user.pk, challenge.pk)] = date
+            solves.append(Solve(user_id=user.pk, challenge_id=challenge.pk, lesson_id=lesson.pk, date=date))
+            correct.append(Attempt(user_id=user.pk, challenge_id=challenge.pk, flag_input=challenge.flag,
+                                   timestamp=date, is_correct=True))
+            if len(solves) >= spec.batch_size:
+                Solve.objects.bulk_create(solves)
+                _save_attempts(correct, lesson)
+                solves, correct = [], []
+        Solve.objects.bulk_create(solves)
+        _save_attempts(correct, lesson)
+        log(f'Solves: {solves_count}')
+
+        wrong_target = max(spec.attempts - solves_count, 0)
+        wrong_counts = {}
+        last_wrong = {}
+        batch = []
+        wrong_created = 0
+        tries = 0
+        while wrong_created < wrong_target and tries < wrong_target * 3:
+            tries += 1
+            user = rng.choice(users)
+            challenge = rng.choice(challenges)
+            key = (user.pk, challenge.pk)
+            solved_at = solve_times.get(key)
+
+            if challenge.max_attempts:
+                count = wrong_counts.get(key, 0)
+                # A solved pair keeps one attempt for the correct flag
+                limit = challenge.max_attempts - 1 if solved_at else challenge.max_attempts
+                if count >= limit:
+                    continue
+                wrong_counts[key] = count + 1
+
+            upper = int((solved_at - start_time).total_seconds()) if solved_at else window
+            timestamp = start_time + timedelta(seconds=rng.randint(0, max(upper - 1, 0)))
+            if challenge.max_attempts:
+                last_wrong[key] = max(timestamp, last_wrong.get(key, timestamp))
+            batch.append(Attempt(user_id=user.pk, challenge_id=challenge.pk, flag_input='CTF{wrong_flag}',
+                                 timestamp=timestamp, is_correct=False))
+            wrong_created += 1
+            if len(batch) >= spec.batch_size:
+                _save_attempts(batch, lesson)
+                batch = []
+        _save_attempts(batch, lesson)
+        log(f'Attempts: {solves_count + wrong_created}')
+
+        max_attempts = {c.pk: c.max_attempts for c in challenges}
+        SubmissionEvent.objects.bulk_create([
+            SubmissionEvent(user_id=user_id, challenge_id=challenge_id, lesson_id=lesson.pk,
+                            kind=SubmissionEvent.LOCKOUT, timestamp=last_wrong[(user_id, challenge_id)])
+            for (user_id, challenge_id), count in wrong_counts.items()
+            if count >= max_attempts[challenge_id] and (user_id, challenge_id) not in solve_times
+        ], batch_size=spec.batch_size)
+
+    return {'solves': solves_count, 'attempts': solves_count + wrong_created}
+
+
+def _generate_templates(spec, rng, challenges):
+    from mentors import totals
+    from mentors.models import LessonTemplate
+
+    if not spec.templates or not challenges:
+        return 0
+
+    templates = LessonTemplate.objects.bulk_create([
+        LessonTemplate(title=f'Lesson {i + 1}', description='Generated lesson template')
+        for i in range(spec.templates)
+    ])
+    Through = LessonTemplate.challenges.through
+    links = []
+    for template in templates:
+        size = rng.randint(1, min(len(challenges), 15))
+        for challenge in rng.sample(challenges, size):
+            links.append(Through(lessontemplate_id=template.pk, challenge_id=challenge.pk))
+    Through.objects.bulk_create(links, batch_size=spec.batch_size)
+    # bulk_create sends no m2m_changed, so the stored totals are filled in here
+    totals.refresh(LessonTemplate.objects.filter(pk__in=[template.pk for template in templates]))
+    return len(templates)
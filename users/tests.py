@@ -1,3 +1,25 @@
-from django.test import TestCase
+from django.db.models import Count, Sum
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from mentors.models import LessonTemplate
+from pages.models import SubmissionEvent
+from pages.tests import TEST_CACHES
+from .synthetic import ClassroomSpec, generate_classroom
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_ENABLED=False)
+class SyntheticClassroomTests(TestCase):
+    def test_template_totals_after_bulk_create(self):
+        created = generate_classroom(ClassroomSpec(users=6, challenges=12, solves=10, attempts=15, templates=4))
+        self.assertEqual(created['templates'], 4)
+        templates = LessonTemplate.objects.annotate(count=Count('challenges'), points=Sum('challenges__points'))
+        self.assertEqual(len(templates), 4)
+        for template in templates:
+            self.assertGreater(template.task_count, 0)
+            self.assertEqual(template.task_count, template.count)
+            self.assertEqual(template.total_points, template.points)
+
+    def test_every_event_belongs_to_the_lesson(self):
+        generate_classroom(ClassroomSpec(users=8, challenges=6, solves=10, attempts=60, limited_ratio=1.0))
+        self.assertTrue(SubmissionEvent.objects.filter(kind=SubmissionEvent.LOCKOUT).exists())
+        self.assertFalse(SubmissionEvent.objects.filter(lesson__isnull=True).exists())
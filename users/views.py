@@ -2,10 +2,16 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import update_session_auth_hash, login
 from django.contrib import messages
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.db.models import Sum
-from .models import User
+from .models import Team, User, validate_team_name
 from .forms import CustomUserCreationForm
 from pages.models import Attempt
+from mentors import lessons
+from mentors.models import LessonSettings
+from config.cache import SCOREBOARD, bump_version
 
 
 def register(request):
@@ -16,6 +22,7 @@ def register(request):
         form = CustomUserCreationForm(request.POST)
         if form.is_valid():
             user = form.save()
+            lessons.enroll(user, lessons.default_lesson())
             login(request, user)
             messages.success(request, 'Registration successful! Welcome to HACKLABS.')
             return redirect('avatar_setup')
@@ -35,6 +42,7 @@ def avatar_setup(request):
             if avatar_url:
                 request.user.avatar_url = avatar_url
                 request.user.save()
+                bump_version(SCOREBOARD)
                 messages.success(request, 'Avatar setup complete!')
         else:
             messages.info(request, 'Avatar setup skipped. Default avatar applied.')
@@ -49,6 +57,64 @@ def avatar_setup(request):
     return render(request, 'users/avatar_setup.html', {'avatars': avatars})
 
 
+def _team_action(request, action):
+    """
+    Create / join (by invite code) / leave a team. Past solves stay with the
+    team they were made for, so switching teams never moves points.
+    """
+    user = request.user
+    if action == 'leave_team':
+        team = user.team
+        if team is None:
+            return
+        user.team = None
+        user.save(update_fields=['team'])
+        # A team that never scored disappears with its last member
+        if not team.members.exists() and not team.team_solves.exists():
+            team.delete()
+        messages.success(request, f'You left {team.name}.')
+        return
+
+    if user.team_id:
+        messages.error(request, 'Leave your current team first.')
+        return
+
+    if action == 'create_team':
+        name = request.POST.get('team_name', '').strip()
+        if not name:
+            messages.error(request, 'Team name is required.')
+            return
+        name = name[:50]
+        try:
+            validate_team_name(name)
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return
+        try:
+            with transaction.atomic():
+                user.team = Team.objects.create(name=name)
+                user.save(update_fields=['team'])
+        except IntegrityError:
+            messages.error(request, 'That team name is taken.')
+            return
+        messages.success(request, f'Team {name} created. Share the invite code with your teammates.')
+        return
+
+    code = request.POST.get('invite_code', '').strip()
+    with transaction.atomic():
+        # The row lock serialises joins, so the size limit holds
+        team = Team.objects.select_for_update().filter(invite_code=code).first() if code else None
+        if team is None:
+            messages.error(request, 'Invalid invite code.')
+            return
+        if team.members.count() >= settings.TEAM_MAX_MEMBERS:
+            messages.error(request, f'{team.name} is full.')
+            return
+        user.team = team
+        user.save(update_fields=['team'])
+    messages.success(request, f'You joined {team.name}.')
+
+
 @login_required
 def profile(request):
     if request.method == 'POST':
@@ -73,6 +139,7 @@ def profile(request):
             if avatar_url:
                 request.user.avatar_url = avatar_url
                 request.user.save()
+                bump_version(SCOREBOARD)
                 messages.success(request, 'Avatar updated!')
 
         elif action == 'update_email':
@@ -82,6 +149,19 @@ def profile(request):
                 request.user.save()
                 messages.success(request, 'Email updated!')
 
+        elif action in ('create_team', 'join_team', 'leave_team'):
+            _team_action(request, action)
+
+        elif action == 'join_lesson':
+            code = request.POST.get('join_code', '').strip()
+            lesson = LessonSettings.objects.filter(join_code=code).first() if code else None
+            if lesson is None:
+                messages.error(request, 'Invalid lesson code.')
+            else:
+                lessons.enroll(request.user, lesson)
+                bump_version(SCOREBOARD)
+                messages.success(request, f'You joined {lesson.title}.')
+
         return redirect('profile')
 
     score = request.user.score
@@ -121,6 +201,10 @@ def profile(request):
         'rank': rank,
         'accuracy': accuracy,
         'role': role,
-        'role_class': role_class
+        'role_class': role_class,
+        'team': request.user.team,
+        'team_members': request.user.team.members.order_by('username') if request.user.team_id else [],
+        'team_max_members': settings.TEAM_MAX_MEMBERS,
+        'lesson': lessons.lesson_for(request.user),
     }
     return render(request, 'users/profile.html', context)
\ No newline at end of file